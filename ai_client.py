@@ -0,0 +1,91 @@
+# ai_client.py
+# Gemini model for app.py, imported and initialized off the startup path.
+# Importing vertexai (google-cloud-aiplatform) takes a couple of seconds, so by default
+# it happens in a background thread while the app already serves requests; until the
+# model is ready get_model() returns None and callers use the local/pattern parser
+# and template responses instead.
+# Calls that overlap other work (the query parse) use the model's async API on one
+# shared event loop thread, so waiting on Gemini does not hold a thread per request.
+import asyncio
+import threading
+import time
+
+# AI_INIT modes: "background" starts at startup without blocking it, "lazy" waits for
+# the first request that wants the model, "eager" blocks startup (the old behaviour)
+INIT_MODES = ('background', 'lazy', 'eager')
+
+_state = {
+    'status': 'not configured',  # -> configured -> initializing -> ready / failed
+    'model': None,
+    'config': None,
+    'init_ms': None
+}
+_lock = threading.Lock()
+_loop = None
+
+def _initialize():
+    project_id, location, model_name = _state['config']
+    started = time.perf_counter()
+    try:
+        import vertexai
+        try:
+            from vertexai.generative_models import GenerativeModel
+        except ImportError:
+            from vertexai.preview.generative_models import GenerativeModel
+        vertexai.init(project=project_id, location=location)
+        # This model name might need to be adjusted based on availability
+        _state['model'] = GenerativeModel(model_name)
+        _state['status'] = 'ready'
+        _state['init_ms'] = (time.perf_counter() - started) * 1000
+        print(f"✅ Vertex AI initialized successfully! ({_state['init_ms']:.0f} ms)")
+    except Exception as e:
+        _state['status'] = 'failed'
+        print(f"❌ Vertex AI initialization failed: {e}")
+
+def _start(background=True):
+    with _lock:
+        if _state['status'] != 'configured':
+            return
+        _state['status'] = 'initializing'
+    if background:
+        threading.Thread(target=_initialize, name='vertexai-init', daemon=True).start()
+    else:
+        _initialize()
+
+def configure_ai(project_id, location='us-central1', model_name='gemini-2.0-flash', mode='background'):
+    """Set up the Gemini model according to mode (see INIT_MODES)"""
+    if mode not in INIT_MODES:
+        print(f"⚠️  Unknown AI_INIT mode {mode!r} - using background")
+        mode = 'background'
+    _state['config'] = (project_id, location, model_name)
+    _state['status'] = 'configured'
+    if mode != 'lazy':
+        _start(background=mode == 'background')
+
+def get_model():
+    """The Gemini model, or None while it is loading (or if it failed to)
+
+    The first call in lazy mode starts loading it in the background.
+    """
+    if _state['status'] == 'configured':
+        _start()
+    return _state['model']
+
+def ai_status():
+    """Initialization status and how long it took, for /cache-stats"""
+    return {'status': _state['status'], 'init_ms': round(_state['init_ms']) if _state['init_ms'] else None}
+
+def _event_loop():
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name='vertexai-loop', daemon=True).start()
+    return _loop
+
+def run_async(coroutine):
+    """Run a coroutine (e.g. one awaiting generate_content_async) on the shared AI event loop
+
+    Returns a concurrent.futures.Future for its result.
+    """
+    return asyncio.run_coroutine_threadsafe(coroutine, _event_loop())
@@ -1,25 +1,50 @@
-from flask import Flask, request, jsonify, render_template_string
+# Startup is timed from here (see startup_phase) so cold starts can be compared
+import time
+STARTUP_STARTED = time.perf_counter()
+
+from flask import Flask, Response, request, jsonify, render_template_string, stream_with_context
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 import pymongo
 from pymongo import MongoClient
-import vertexai
-try:
-    from vertexai.generative_models import GenerativeModel
-except ImportError:
-    try:
-        from vertexai.preview.generative_models import GenerativeModel
-    except ImportError:
-        from google.cloud import aiplatform
-        from google.cloud.aiplatform import gapic
-        GenerativeModel = None
-        print("❌ Could not import GenerativeModel - check google-cloud-aiplatform version")
 
+import base64
+import copy
+import hashlib
 import json
+import math
 import re
 import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dotenv import load_dotenv
 from typing import Dict, List, Any
+from school_indexes import INDICATOR_VALUE_KEYS, LOWER_IS_BETTER, print_index_report
+from search_keys import build_name_filter
+from school_catalog import load_catalog, install_catalog, get_catalog, find_district_schools
+from school_store import SchoolStore
+from warm_start import fetch_school_store, load_warm_start
+from data_version import get_data_version
+from query_cache import TTLCache, DiskBackedCache, normalize_query_text
+from local_parser import parse_query_locally, install_matcher
+from rollups import find_rollup
+from equity_gaps import GAP_PAIRS, find_largest_gaps, wants_largest_gaps
+from compression import COMPRESSIBLE_MIMETYPES, MIN_COMPRESS_SIZE, choose_encoding, compress, precompress
+from wire_format import COLUMNAR_FORMAT, MSGPACK_MIMETYPE, encode_schools_columnar, wants_msgpack, pack_msgpack
+from build_assets import DIST_DIR, load_or_build_manifest
+from ai_client import configure_ai, get_model, ai_status, run_async
+
+# Milliseconds spent in each module-level startup step, reported once the app is ready
+startup_timings = {"imports": (time.perf_counter() - STARTUP_STARTED) * 1000}
+
+@contextmanager
+def startup_phase(name):
+    """Time one step of module-level startup for the startup report"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_timings[name] = (time.perf_counter() - started) * 1000
 
 app = Flask(__name__)
 # Rate limiting to prevent abuse  
@@ -30,31 +55,151 @@ limiter = Limiter(
 )
 # Load environment variables
 load_dotenv()
+# School data backend: "mongo" (default), or "local" to answer school queries from the
+# memory-mapped store written by data_import_improved.py --store (see school_store.py)
+DATA_BACKEND = os.getenv("DATA_BACKEND", "mongo")
+SCHOOL_STORE_PATH = os.getenv("SCHOOL_STORE_PATH", "school_store")
+# Optional .tar.gz of a store directory, downloaded once at boot if SCHOOL_STORE_PATH has no store
+SCHOOL_STORE_URL = os.getenv("SCHOOL_STORE_URL")
+
 # MongoDB connection - SECURE VERSION
 MONGODB_URI = os.getenv("MONGODB_URI")
-if not MONGODB_URI:
+if MONGODB_URI:
+    client = MongoClient(MONGODB_URI)
+    db = client.ca_schools
+    schools_collection = db.schools
+elif DATA_BACKEND == "local":
+    # Rollups and equity gaps are only kept in MongoDB
+    db = None
+    schools_collection = None
+    print("⚠️  MONGODB_URI not set - aggregate and equity gap questions fall back to school searches")
+else:
     raise ValueError("MONGODB_URI environment variable is not set")
 
-client = MongoClient(MONGODB_URI)
-db = client.ca_schools
-schools_collection = db.schools
+class MongoSchoolData:
+    """School queries against the schools collection - the interface school_store.SchoolStore also implements"""
+    
+    def __init__(self, collection):
+        self.collection = collection
+    
+    def data_version(self):
+        return get_data_version(self.collection.database)
+    
+    def catalog_rows(self):
+        return self.collection.find({}, {'cds_code': 1, 'school_name': 1, 'county_name': 1, 'district_name': 1, '_id': 0})
+    
+    def search(self, parsed_query: Dict, page_size: int, after: Dict = None, projection: Dict = None, sort: Dict = None):
+        return fetch_school_page(self.collection, build_mongodb_query(parsed_query), after=after,
+                                 page_size=page_size, projection=projection, sort=sort)
+    
+    def count(self, parsed_query: Dict, sort: Dict = None):
+        # build_mongodb_query already restricts ranked questions to rated results
+        return self.collection.count_documents(build_mongodb_query(parsed_query), limit=COUNT_LIMIT)
+    
+    def find_by_cds(self, cds_codes: List[str], projection: Dict = None):
+        docs = list(self.collection.find({"cds_code": {"$in": list(cds_codes)}}, projection))
+        for doc in docs:
+            if '_id' in doc:
+                doc['_id'] = str(doc['_id'])
+        return docs
+
+with startup_phase("school store"):
+    if SCHOOL_STORE_URL:
+        try:
+            fetch_school_store(SCHOOL_STORE_URL, SCHOOL_STORE_PATH)
+        except Exception as e:
+            print(f"❌ School store download failed: {e}")
+    # Catalog, parser trie and name indexes prebuilt by the importer (see warm_start.py)
+    warm_start = load_warm_start(SCHOOL_STORE_PATH)
+    name_indexes = warm_start["name_indexes"] if warm_start else None
+    if DATA_BACKEND == "local":
+        school_store = school_data = SchoolStore(SCHOOL_STORE_PATH, name_indexes)
+    else:
+        school_data = MongoSchoolData(schools_collection)
+        # A store next to a Mongo backend still answers counts from its bitmaps
+        # (see count_matches), as long as it holds the same data version
+        school_store = None
+        if os.path.exists(os.path.join(SCHOOL_STORE_PATH, "meta.json")):
+            try:
+                school_store = SchoolStore(SCHOOL_STORE_PATH, name_indexes)
+            except Exception as e:
+                print(f"❌ School store load failed: {e}")
+
+if DATA_BACKEND != "local":
+    with startup_phase("index check"):
+        # Verify the indexes the query builder relies on (created by data_import_improved.py)
+        try:
+            if not print_index_report(schools_collection):
+                print("⚠️  Some query shapes are not indexed - run data_import_improved.py to create indexes")
+        except Exception as e:
+            print(f"❌ Index check failed: {e}")
+
+# District/school catalog served from memory by /districts and /school-list
+def warm_start_is_current(snapshot) -> bool:
+    """Whether a warm-start snapshot holds the data version school_data serves"""
+    if snapshot is None or school_store is None:
+        return False
+    if school_data is school_store:
+        # load_warm_start already matched it against the store
+        return True
+    try:
+        current = school_data.data_version()
+    except Exception as e:
+        print(f"❌ Data version check failed: {e}")
+        return False
+    if snapshot["version"] != current:
+        print(f"⚠️  Warm-start snapshot is data version {snapshot['version']}, MongoDB has {current} - rebuilding the catalog")
+        return False
+    return True
+
+with startup_phase("catalog"):
+    if warm_start_is_current(warm_start):
+        install_catalog(warm_start["catalog"])
+        install_matcher(warm_start["trie"], warm_start["version"])
+        print(f"🔥 Catalog and parser restored from the warm-start snapshot (data version {warm_start['version']})")
+    else:
+        try:
+            load_catalog(school_data)
+        except Exception as e:
+            print(f"❌ Catalog load failed: {e}")
+
+# Browsers may reuse catalog responses this long before revalidating with the ETag
+CATALOG_MAX_AGE = 300
 
 # Google Cloud AI setup - SECURE VERSION
+# vertexai is imported off the startup path (AI_INIT=background|lazy|eager, see ai_client.py);
+# until Gemini is ready, questions are answered by the local parser and templates
 PROJECT_ID = os.getenv("PROJECT_ID", "ca-schools-ai-dashboard")
-try:
-    vertexai.init(project=PROJECT_ID, location="us-central1")
-    # This model name might need to be adjusted based on availability
-    model = GenerativeModel("gemini-2.0-flash") 
-    AI_ENABLED = True
-    print("✅ Vertex AI initialized successfully!")
-except Exception as e:
-    print(f"❌ Vertex AI initialization failed: {e}")
-    AI_ENABLED = False
-
-def analyze_query_with_gemini(user_query: str) -> Dict[str, Any]:
-    """Use Gemini to intelligently understand the user's question"""
-    
-    system_prompt = """
+with startup_phase("vertex ai"):
+    configure_ai(PROJECT_ID, location="us-central1", model_name="gemini-2.0-flash",
+                 mode=os.getenv("AI_INIT", "background"))
+
+# Parsed query structures from Gemini, keyed on the normalized question text
+parsed_query_cache = TTLCache(
+    max_size=int(os.getenv("QUERY_CACHE_SIZE", 1000)),
+    ttl_seconds=int(os.getenv("QUERY_CACHE_TTL", 3600))
+)
+
+# Generated AI analyses keyed by data version + parsed query + result CDS codes.
+# Set ANALYSIS_CACHE_DIR to keep them on disk across instance restarts.
+analysis_cache = DiskBackedCache(
+    directory=os.getenv("ANALYSIS_CACHE_DIR") or None,
+    max_size=int(os.getenv("ANALYSIS_CACHE_SIZE", 500)),
+    ttl_seconds=int(os.getenv("ANALYSIS_CACHE_TTL", 86400))
+)
+analysis_cache_version = None
+
+# Local parses at or above this confidence are used without calling Gemini
+LOCAL_PARSER_CONFIDENCE = float(os.getenv("LOCAL_PARSER_CONFIDENCE", 0.8))
+
+# Shared pool for the independent steps of a request (count queries), so a gunicorn
+# thread waiting on one step is not also blocking the others. Gemini parses run on
+# ai_client's event loop instead and hold no thread while they wait
+query_executor = ThreadPoolExecutor(max_workers=int(os.getenv("QUERY_WORKERS", 32)), thread_name_prefix="query")
+
+def build_query_parse_prompt(user_query: str) -> str:
+    """Prompt asking Gemini to turn the user's question into a parsed query"""
+    return """
 You are an expert in California School Dashboard data analysis. Parse the user's natural language query and extract structured information.
 
 AVAILABLE DATA INDICATORS (all 7 indicators in the database):
@@ -99,43 +244,76 @@ Parse this query and return ONLY a JSON object with this exact structure:
     "colors": ["Red", "Orange"] (performance levels user is interested in),
     "indicators": ["chronic_absenteeism"] (only from available list above),
     "student_groups": ["HI", "EL"] (codes from available list above),
+    "aggregate": true if the user asks about a district or county as a whole (averages, gaps, distributions) rather than for a list of schools, else false,
+    "gap": true if the user asks about differences (gaps) between student groups, else false,
+    "ranking": "best" or "worst" for the best/worst performers, "desc" for the highest/largest values, "asc" for the lowest/smallest, else null,
+    "rank_by": "change" if the ranking is about improvement or decline since last year, else "value",
     "data_availability": "available" or "not_available",
     "explanation": "brief explanation of what data is available vs requested"
 }
 
 Query: """ + user_query
 
+def extract_parsed_query(response_text: str) -> Dict[str, Any]:
+    """The JSON object in Gemini's reply to build_query_parse_prompt, or None"""
+    response_text = response_text.strip()
+    
+    # Extract JSON from response
+    json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+    if json_match:
+        parsed_json = json.loads(json_match.group())
+        return parsed_json
+    else:
+        print(f"No JSON found in AI response: {response_text}")
+        return None
+
+async def analyze_query_with_gemini(user_query: str) -> Dict[str, Any]:
+    """Use Gemini to intelligently understand the user's question (a coroutine for ai_client.run_async)"""
     try:
-        response = model.generate_content(system_prompt)
-        response_text = response.text.strip()
-        
-        # Extract JSON from response
-        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-        if json_match:
-            parsed_json = json.loads(json_match.group())
-            return parsed_json
-        else:
-            print(f"No JSON found in AI response: {response_text}")
-            return None
-            
+        response = await get_model().generate_content_async(build_query_parse_prompt(user_query))
+        return extract_parsed_query(response.text)
     except Exception as e:
         print(f"Gemini API error: {e}")
         return None
 
-def parse_query_with_real_ai(user_query: str) -> Dict[str, Any]:
-    """Use Vertex AI to intelligently parse user queries about CA Dashboard data"""
-    
-    # First, try AI-powered analysis if available
-    if AI_ENABLED:
-        try:
-            ai_parsed = analyze_query_with_gemini(user_query)
-            if ai_parsed:
-                print(f"DEBUG - AI parsed query: {ai_parsed}")
-                return ai_parsed
-        except Exception as e:
-            print(f"AI parsing failed, falling back to pattern matching: {e}")
-    
-    # Fallback to pattern matching
+def parse_query_locally_first(user_query: str) -> Dict[str, Any]:
+    """Local catalog parse of the question, or None if the local parser failed"""
+    try:
+        local_parsed = parse_query_locally(user_query, get_catalog(school_data))
+        print(f"DEBUG - Local parse (confidence {local_parsed['confidence']}): {local_parsed}")
+        return local_parsed
+    except Exception as e:
+        print(f"Local parsing failed: {e}")
+        return None
+
+def get_cached_ai_parse(cache_key: str) -> Dict[str, Any]:
+    """Gemini parse cached under a normalized question, or None"""
+    cached = parsed_query_cache.get(cache_key)
+    if cached:
+        print(f"DEBUG - Parsed query cache hit: {cache_key}")
+        return copy.deepcopy(cached)
+    return None
+
+def cache_ai_parse(cache_key: str, ai_parsed: Dict[str, Any]) -> Dict[str, Any]:
+    """Store a Gemini parse under cache_key and return it; None if Gemini gave none"""
+    if not ai_parsed:
+        return None
+    print(f"DEBUG - AI parsed query: {ai_parsed}")
+    try:
+        # Only AI results are cached - a pattern fallback after a Gemini error should be retried
+        parsed_query_cache.set(cache_key, copy.deepcopy(ai_parsed))
+    except Exception as e:
+        print(f"Parsed query cache write failed: {e}")
+    return ai_parsed
+
+async def parse_query_with_gemini_and_cache(user_query: str, cache_key: str) -> Dict[str, Any]:
+    """Gemini parse of the question, stored under cache_key; None on failure"""
+    return cache_ai_parse(cache_key, await analyze_query_with_gemini(user_query))
+
+def parse_query_fallback(user_query: str, local_parsed: Dict[str, Any]) -> Dict[str, Any]:
+    """The local parse if it understood anything, else pattern matching"""
+    if local_parsed and local_parsed["confidence"] > 0:
+        return local_parsed
     return parse_query_with_patterns(user_query)
 
 def parse_query_with_patterns(user_query: str) -> Dict[str, Any]:
@@ -214,10 +392,29 @@ def parse_query_with_patterns(user_query: str) -> Dict[str, Any]:
         parsed["indicators"].append("english_learner_progress")
     
     
-    # Context-based color inference
+    # Questions about a district as a whole are answered from the rollups collection
+    aggregate_phrases = ["gap", "overall", "average", "median", "distribution", "breakdown", "district-wide", "districtwide", "how many"]
+    parsed["aggregate"] = any(phrase in query_lower for phrase in aggregate_phrases)
+    parsed["gap"] = any(phrase in query_lower for phrase in ["gap", "disparit"])
+    parsed["ranking"] = None
+    parsed["rank_by"] = "value"
+    if any(word in query_lower for word in ["improved", "improving", "improvement", "gains"]):
+        parsed["ranking"], parsed["rank_by"] = "best", "change"
+    elif any(word in query_lower for word in ["declined", "declining", "dropped", "worsened"]):
+        parsed["ranking"], parsed["rank_by"] = "worst", "change"
+    elif any(word in query_lower for word in ["best", "strongest"]):
+        parsed["ranking"] = "best"
+    elif any(word in query_lower for word in ["worst", "weakest"]):
+        parsed["ranking"] = "worst"
+    elif any(word in query_lower for word in ["largest", "biggest", "widest", "greatest", "most", "top", "highest"]):
+        parsed["ranking"] = "desc"
+    elif any(word in query_lower for word in ["smallest", "narrowest", "least", "lowest"]):
+        parsed["ranking"] = "asc"
+    
+    # Context-based color inference (a ranked indicator is sorted instead)
     problem_phrases = ["lowest", "worst", "struggling", "red", "problem", "concerning"]
     if any(phrase in query_lower for phrase in problem_phrases):
-        if not parsed["colors"]:
+        if not parsed["colors"] and not (parsed["ranking"] and parsed["indicators"]):
             parsed["colors"] = ["Red", "Orange"]
     
     return parsed
@@ -228,15 +425,18 @@ def build_mongodb_query(parsed_query):
     
     print(f"DEBUG - Building query from: {parsed_query}")
     
-    # District filter with case-insensitive regex
+    # District filter on the normalized name tokens (index-backed, no user regex)
     if parsed_query.get("district_name"):
-        district_pattern = parsed_query["district_name"]
-        query_filter["district_name"] = {"$regex": district_pattern, "$options": "i"}
-        print(f"DEBUG - District filter: {query_filter['district_name']}")
+        query_filter.update(build_name_filter("district", parsed_query["district_name"]))
+        print(f"DEBUG - District filter: {query_filter.get('district_tokens')}")
     
     # School filter
     if parsed_query.get("school_name"):
-        query_filter["school_name"] = {"$regex": parsed_query["school_name"], "$options": "i"}
+        query_filter.update(build_name_filter("school", parsed_query["school_name"]))
+    
+    # County filter (exact catalog name, set by the local parser)
+    if parsed_query.get("county_name"):
+        query_filter["county_name"] = parsed_query["county_name"]
     
     # Color-based filters
     if parsed_query.get("colors"):
@@ -282,12 +482,13 @@ def build_mongodb_query(parsed_query):
         # NEW: Handle case where indicators are specified but no colors
         print("DEBUG - No colors specified, but indicators found - showing all schools with these indicators")
         indicator_conditions = []
+        # Every indicator entry has a status, so test that leaf path - it is what the indexes cover
         
         if parsed_query.get("student_groups"):
             # Look for indicators in specific student groups
             for student_group in parsed_query["student_groups"]:
                 for indicator in parsed_query["indicators"]:
-                    condition = {f"student_groups.{student_group}.{indicator}": {"$exists": True}}
+                    condition = {f"student_groups.{student_group}.{indicator}.status": {"$exists": True}}
                     indicator_conditions.append(condition)
                     print(f"DEBUG - Added student group existence condition: {condition}")
         else:
@@ -295,11 +496,11 @@ def build_mongodb_query(parsed_query):
             for indicator in parsed_query["indicators"]:
                 if indicator == "english_learner_progress":
                     # ELPI data is only in the EL student group, not dashboard_indicators
-                    condition = {f"student_groups.EL.{indicator}": {"$exists": True}}
+                    condition = {f"student_groups.EL.{indicator}.status": {"$exists": True}}
                     indicator_conditions.append(condition)
                     print(f"DEBUG - Added EL group existence condition: {condition}")
                 else:
-                    condition = {f"dashboard_indicators.{indicator}": {"$exists": True}}
+                    condition = {f"dashboard_indicators.{indicator}.status": {"$exists": True}}
                     indicator_conditions.append(condition)
                     print(f"DEBUG - Added dashboard existence condition: {condition}")
 
@@ -311,9 +512,262 @@ def build_mongodb_query(parsed_query):
                 query_filter["$or"] = indicator_conditions
             print(f"DEBUG - Added indicator existence filters: {len(indicator_conditions)} conditions")
 
+    # Ranked questions only consider rated results that have the sort field, which
+    # also lets MongoDB use the partial value/change indexes for the ordering
+    sort = build_sort(parsed_query)
+    if sort:
+        query_filter[sort["field"]] = {"$exists": True}
+        query_filter[sort["status_field"]] = {"$in": RATED_COLORS}
+        print(f"DEBUG - Ranking by {sort['field']} ({'ascending' if sort['direction'] == 1 else 'descending'})")
+
     print(f"DEBUG - Final MongoDB query: {query_filter}")
     return query_filter
 
+# Pagination: every school list is returned in cds_code order (unique and indexed),
+# and the client passes back an opaque cursor to fetch the next page
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# count_documents stops here - larger totals are reported as "at least"
+COUNT_LIMIT = 5000
+
+VALID_STUDENT_GROUPS = {'ALL', 'AA', 'AI', 'AS', 'FI', 'HI', 'PI', 'WH', 'MR', 'EL', 'LTEL', 'RFEP', 'SED', 'SWD', 'HOM', 'FOS'}
+VALID_INDICATORS = {"chronic_absenteeism", "ela_performance", "math_performance", "suspension_rate", "college_career", "graduation_rate", "english_learner_progress"}
+VALID_COLORS = {"Red", "Orange", "Yellow", "Green", "Blue", "No Data"}
+VALID_RANKINGS = {"asc", "desc", "best", "worst"}
+RATED_COLORS = ["Red", "Orange", "Yellow", "Green", "Blue"]
+
+# Schools returned for a ranked equity gap question
+GAP_TOP_K = 10
+
+# Fields every school result carries; student_groups are added only for the groups a query asks about
+RESULT_FIELDS = ["cds_code", "county_name", "district_name", "school_name", "year", "dashboard_indicators", "student_group_codes"]
+
+def build_projection(parsed_query: Dict) -> Dict:
+    """Projection with the identity fields, overall indicators and only the requested student groups"""
+    projection = {field: 1 for field in RESULT_FIELDS}
+    groups = [g for g in (parsed_query.get("student_groups") or []) if g in VALID_STUDENT_GROUPS]
+    # English Learner Progress only exists under the EL group
+    if "english_learner_progress" in (parsed_query.get("indicators") or []) and "EL" not in groups:
+        groups.append("EL")
+    for group in groups:
+        projection[f"student_groups.{group}"] = 1
+    return projection
+
+# CDE county-district-school codes are 14 digits (13 where the leading zero was dropped)
+CDS_CODE_PATTERN = re.compile(r'\d{1,14}')
+
+def encode_cursor(state: Dict) -> str:
+    """Opaque, URL-safe cursor string"""
+    raw = json.dumps(state, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_cursor(cursor: str) -> Dict:
+    """Decode a cursor from encode_cursor (raises ValueError if it is malformed)"""
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    # Cursor fields end up in MongoDB filters, so only plain values of the expected type pass
+    if not isinstance(state, dict) or not isinstance(state.get("after"), str) \
+            or not CDS_CODE_PATTERN.fullmatch(state["after"]):
+        raise ValueError("Invalid cursor")
+    after_value = state.get("after_value")
+    if after_value is not None and (isinstance(after_value, bool) or not isinstance(after_value, (int, float))
+                                    or not math.isfinite(after_value)):
+        raise ValueError("Invalid cursor")
+    if state.get("district") is not None and not isinstance(state["district"], str):
+        raise ValueError("Invalid cursor")
+    if state.get("query") is not None and not isinstance(state["query"], dict):
+        raise ValueError("Invalid cursor")
+    size = state.get("size")
+    if size is not None and (isinstance(size, bool) or not isinstance(size, int) or size < 1):
+        raise ValueError("Invalid cursor")
+    return state
+
+def sanitize_parsed_query(parsed_query: Dict) -> Dict:
+    """Keep only the known filter fields and values of a parsed query sent back by a client"""
+    def text(value):
+        return value if isinstance(value, str) else None
+    def allowed(values, valid):
+        return [v for v in values if v in valid] if isinstance(values, list) else []
+    return {
+        "district_name": text(parsed_query.get("district_name")),
+        "school_name": text(parsed_query.get("school_name")),
+        "county_name": text(parsed_query.get("county_name")),
+        "colors": allowed(parsed_query.get("colors"), VALID_COLORS),
+        "indicators": allowed(parsed_query.get("indicators"), VALID_INDICATORS),
+        "student_groups": allowed(parsed_query.get("student_groups"), VALID_STUDENT_GROUPS),
+        "ranking": parsed_query.get("ranking") if parsed_query.get("ranking") in VALID_RANKINGS else None,
+        "rank_by": "change" if parsed_query.get("rank_by") == "change" else "value"
+    }
+
+def get_page_size(value, default=DEFAULT_PAGE_SIZE) -> int:
+    """Page size from a request, clamped to 1..MAX_PAGE_SIZE"""
+    try:
+        return max(1, min(int(value), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return default
+
+def build_sort(parsed_query: Dict) -> Dict:
+    """Sort for a ranked question about one indicator, or None for cds_code order
+    
+    Returns {"field", "status_field", "direction"}: the value (or, with
+    rank_by "change", the change) of the first indicator, for the first named
+    student group or overall. "best"/"worst" become a direction per indicator.
+    """
+    ranking = parsed_query.get("ranking")
+    indicators = [i for i in (parsed_query.get("indicators") or []) if i in VALID_INDICATORS]
+    if ranking not in VALID_RANKINGS or not indicators:
+        return None
+    indicator = indicators[0]
+    
+    groups = [g for g in (parsed_query.get("student_groups") or []) if g in VALID_STUDENT_GROUPS and g != "ALL"]
+    if groups:
+        prefix = f"student_groups.{groups[0]}.{indicator}"
+    elif indicator == "english_learner_progress":
+        # ELPI data is only in the EL student group, not dashboard_indicators
+        prefix = f"student_groups.EL.{indicator}"
+    else:
+        prefix = f"dashboard_indicators.{indicator}"
+    
+    value_key = "change" if parsed_query.get("rank_by") == "change" else INDICATOR_VALUE_KEYS[indicator]
+    field = f"{prefix}.{value_key}"
+    
+    if ranking in ("asc", "desc"):
+        direction = 1 if ranking == "asc" else -1
+    else:
+        # A rising value (and so a positive change) is good unless lower is better
+        higher_is_better = indicator not in LOWER_IS_BETTER
+        direction = -1 if (ranking == "best") == higher_is_better else 1
+    return {"field": field, "status_field": f"{prefix}.status", "direction": direction}
+
+def get_field(doc: Dict, path: str):
+    """Value at a dotted path in a document (None if any part is missing)"""
+    for key in path.split('.'):
+        if not isinstance(doc, dict):
+            return None
+        doc = doc.get(key)
+    return doc
+
+def fetch_school_page(collection, mongo_query: Dict, after: Dict = None, page_size: int = DEFAULT_PAGE_SIZE,
+                      projection: Dict = None, sort: Dict = None):
+    """One page of the schools in collection matching mongo_query plus the position to continue after (or None)
+    
+    Schools come in cds_code order, or with a sort from build_sort in that
+    field's order with cds_code breaking ties. Positions are {"after": cds_code}
+    plus "after_value" (the sort field's value) for sorted pages.
+    """
+    direction = sort["direction"] if sort else 1
+    sort_keys = [(sort["field"], direction), ("cds_code", direction)] if sort else [("cds_code", 1)]
+    
+    page_filter = mongo_query
+    if after:
+        op = "$gt" if direction == 1 else "$lt"
+        if sort:
+            after_filter = {"$or": [
+                {sort["field"]: {op: after.get("after_value")}},
+                {sort["field"]: after.get("after_value"), "cds_code": {op: after["after"]}}
+            ]}
+        else:
+            after_filter = {"cds_code": {op: after["after"]}}
+        page_filter = {"$and": [mongo_query, after_filter]}
+    
+    # Fetch one extra document to know whether another page exists
+    results = list(collection.find(page_filter, projection).sort(sort_keys).limit(page_size + 1))
+    has_more = len(results) > page_size
+    results = results[:page_size]
+    
+    # Convert ObjectId to string for JSON serialization
+    for item in results:
+        item['_id'] = str(item['_id'])
+    
+    if not has_more or not results:
+        return results, None
+    next_after = {"after": results[-1]['cds_code']}
+    if sort:
+        next_after["after_value"] = get_field(results[-1], sort["field"])
+    return results, next_after
+
+def encode_schools_payload(payload: Dict, columnar: bool = False) -> Dict:
+    """Encode payload's "schools" list as columns if asked to or the request body has {"format": "columnar"}"""
+    requested_format = (request.get_json(silent=True) or {}).get('format')
+    if columnar or requested_format == COLUMNAR_FORMAT:
+        payload["schools"] = encode_schools_columnar(payload.get("schools") or [])
+    return payload
+
+def schools_response(payload: Dict):
+    """Respond with payload, encoding its "schools" list compactly if the client opted in
+    
+    {"format": "columnar"} in the request body gives columnar JSON;
+    Accept: application/x-msgpack gives the same structure as MessagePack.
+    """
+    use_msgpack = wants_msgpack(request.headers.get('Accept'))
+    encode_schools_payload(payload, columnar=use_msgpack)
+    if use_msgpack:
+        return Response(pack_msgpack(payload), mimetype=MSGPACK_MIMETYPE)
+    return jsonify(payload)
+
+def count_matches(parsed_query: Dict):
+    """Number of matching schools and whether it was capped at COUNT_LIMIT
+    
+    When the school store holds the same data as school_data, its bitmaps give
+    an exact count with no count query against MongoDB.
+    """
+    sort = build_sort(parsed_query)
+    if school_store is not None and school_store.data_version() == get_catalog(school_data)['version']:
+        return school_store.count(parsed_query, sort=sort), False
+    total = min(school_data.count(parsed_query, sort=sort), COUNT_LIMIT)
+    return total, total >= COUNT_LIMIT
+
+def run_school_search(parsed_query: Dict, page_size: int):
+    """First page of results and the capped total for a parsed query
+    
+    The count runs on query_executor while this thread fetches the page.
+    Returns (results, next_after, total, total_capped).
+    """
+    count_future = query_executor.submit(count_matches, parsed_query)
+    results, next_after = school_data.search(parsed_query, page_size, projection=build_projection(parsed_query),
+                                             sort=build_sort(parsed_query))
+    total, total_capped = count_future.result()
+    return results, next_after, total, total_capped
+
+def parse_query_with_speculative_search(user_query: str, page_size: int):
+    """Parse a question, searching with the fallback parse while Gemini works
+    
+    Returns (parsed_query, search), where search is run_school_search's result
+    for parsed_query if the speculative search matched it, else None.
+    """
+    local_parsed = parse_query_locally_first(user_query)
+    if local_parsed and local_parsed["confidence"] >= LOCAL_PARSER_CONFIDENCE:
+        return local_parsed, None
+    
+    fallback = parse_query_fallback(user_query, local_parsed)
+    if get_model() is None:
+        return fallback, None
+    cache_key = normalize_query_text(user_query)
+    cached = get_cached_ai_parse(cache_key)
+    if cached:
+        return cached, None
+    
+    # Gemini takes seconds; in the meantime run the query the fallback parse would give,
+    # if it names a place or school - without one it would read the whole collection
+    ai_future = run_async(parse_query_with_gemini_and_cache(user_query, cache_key))
+    speculative = None
+    if any(fallback.get(field) for field in ("district_name", "school_name", "county_name")):
+        try:
+            speculative = run_school_search(fallback, page_size)
+        except Exception as e:
+            print(f"Speculative search failed: {e}")
+    
+    ai_parsed = ai_future.result()
+    if not ai_parsed:
+        return fallback, speculative
+    if ai_parsed.get("data_availability") != "not_available" and \
+            sanitize_parsed_query(ai_parsed) == sanitize_parsed_query(fallback):
+        print("DEBUG - Speculative search matches the AI parse")
+        return ai_parsed, speculative
+    return ai_parsed, None
+
 def generate_intelligent_response(user_query: str, results: List[Dict], parsed_query: Dict) -> str:
     """Generate AI-powered response using Gemini for analysis"""
     
@@ -325,10 +779,17 @@ def generate_intelligent_response(user_query: str, results: List[Dict], parsed_q
         return "I didn't find any schools matching your criteria. Try adjusting your search terms."
     
     # Use AI to generate intelligent response if available
-    if AI_ENABLED and len(results) <= 10:  # Use AI for smaller result sets
+    if get_model() is not None and len(results) <= 10:  # Use AI for smaller result sets
+        cache_key = get_analysis_cache_key(results, parsed_query)
+        cached = analysis_cache.get(cache_key)
+        if cached:
+            print(f"DEBUG - Analysis cache hit: {cache_key}")
+            return cached
+        
         try:
             ai_response = generate_ai_analysis(user_query, results, parsed_query)
             if ai_response:
+                analysis_cache.set(cache_key, ai_response)
                 return ai_response
         except Exception as e:
             print(f"AI response generation failed: {e}")
@@ -336,8 +797,28 @@ def generate_intelligent_response(user_query: str, results: List[Dict], parsed_q
     # Fallback to template-based response
     return generate_template_response(user_query, results, parsed_query)
 
-def generate_ai_analysis(user_query: str, results: List[Dict], parsed_query: Dict) -> str:
-    """Use Gemini to generate concise, fact-focused analysis"""
+def get_analysis_cache_key(results: List[Dict], parsed_query: Dict) -> str:
+    """Cache key for an AI analysis: data version, parsed query and the result CDS codes"""
+    global analysis_cache_version
+    
+    try:
+        version = get_catalog(school_data)['version'] or 'unversioned'
+    except Exception:
+        version = 'unversioned'
+    
+    # A new import invalidates every analysis generated from the old data
+    if version != analysis_cache_version:
+        analysis_cache.prune(f"{version}-")
+        analysis_cache_version = version
+    
+    key_data = json.dumps({
+        "query": parsed_query,
+        "cds_codes": [school.get("cds_code") for school in results]
+    }, sort_keys=True, default=str)
+    return f"{version}-{hashlib.sha256(key_data.encode('utf-8')).hexdigest()}"
+
+def build_analysis_prompt(user_query: str, results: List[Dict], parsed_query: Dict) -> str:
+    """Gemini prompt asking for a concise, fact-focused analysis of the results"""
     
     # Prepare data summary for AI
     data_summary = []
@@ -384,14 +865,280 @@ RESPONSE REQUIREMENTS:
 
 Format your response with proper markdown formatting but be concise and factual only.
 """
+    return analysis_prompt
 
+def generate_ai_analysis(user_query: str, results: List[Dict], parsed_query: Dict) -> str:
+    """Use Gemini to generate concise, fact-focused analysis"""
+    analysis_prompt = build_analysis_prompt(user_query, results, parsed_query)
     try:
-        response = model.generate_content(analysis_prompt)
+        response = get_model().generate_content(analysis_prompt)
         return response.text.strip()
     except Exception as e:
         print(f"AI analysis failed: {e}")
         return None
 
+def stream_intelligent_response(user_query: str, results: List[Dict], parsed_query: Dict):
+    """generate_intelligent_response, yielding the AI analysis in pieces as Gemini produces them"""
+    if parsed_query.get("data_availability") == "not_available" or not results \
+            or get_model() is None or len(results) > 10:
+        yield generate_intelligent_response(user_query, results, parsed_query)
+        return
+    
+    cache_key = get_analysis_cache_key(results, parsed_query)
+    cached = analysis_cache.get(cache_key)
+    if cached:
+        print(f"DEBUG - Analysis cache hit: {cache_key}")
+        yield cached
+        return
+    
+    chunks = []
+    try:
+        for chunk in get_model().generate_content(build_analysis_prompt(user_query, results, parsed_query), stream=True):
+            text = chunk.text
+            if text:
+                chunks.append(text)
+                yield text
+    except Exception as e:
+        print(f"AI analysis stream failed: {e}")
+        if not chunks:
+            yield generate_template_response(user_query, results, parsed_query)
+        return
+    
+    if chunks:
+        analysis_cache.set(cache_key, ''.join(chunks).strip())
+    else:
+        yield generate_template_response(user_query, results, parsed_query)
+
+def find_query_rollup(parsed_query: Dict) -> Dict:
+    """Rollup document answering an aggregate question about one district or county, or None
+    
+    Rollups summarize every school, so questions that also filter by color or
+    school or ask for a ranking ("how many schools in Oakland have red math")
+    go through the normal search, whose total comes from count_matches.
+    """
+    if not parsed_query.get("aggregate") or parsed_query.get("school_name") \
+            or parsed_query.get("colors") or parsed_query.get("ranking") \
+            or parsed_query.get("data_availability") == "not_available":
+        return None
+    if parsed_query.get("district_name"):
+        level, name = "district", parsed_query["district_name"]
+    elif parsed_query.get("county_name"):
+        level, name = "county", parsed_query["county_name"]
+    else:
+        return None
+    
+    groups = [g for g in (parsed_query.get("student_groups") or []) if g in VALID_STUDENT_GROUPS]
+    # Gaps are measured against All Students, so keep it alongside any requested group
+    if groups and "ALL" not in groups:
+        groups.append("ALL")
+    try:
+        return find_rollup(db, level, name, groups)
+    except Exception as e:
+        print(f"Rollup lookup failed: {e}")
+        return None
+
+def select_rollup_entries(rollup: Dict, parsed_query: Dict) -> Dict:
+    """{group: {indicator: summary}} limited to the groups and indicators the question names"""
+    indicators = parsed_query.get("indicators") or []
+    groups = parsed_query.get("student_groups") or []
+    selected = {}
+    for group, entries in rollup.get("groups", {}).items():
+        if groups and group not in groups and group != "ALL":
+            continue
+        entries = {ind: summary for ind, summary in entries.items() if not indicators or ind in indicators}
+        if entries:
+            selected[group] = entries
+    return selected
+
+def format_rollup_value(summary: Dict, value) -> str:
+    if value is None:
+        return "n/a"
+    if summary.get("value_key") == "points_below_standard":
+        return f"{value:+.1f} pts"
+    return f"{value:.1f}%"
+
+def generate_rollup_template_response(rollup: Dict, parsed_query: Dict) -> str:
+    """Concise district/county overview from a rollup document (fallback)"""
+    response_parts = [f"**{rollup['name']}** ({rollup['level']} overview, {rollup['school_count']} schools)"]
+    selected = select_rollup_entries(rollup, parsed_query)
+    if not selected:
+        response_parts.append("No aggregate data for the requested student groups and indicators.")
+        return "\n".join(response_parts)
+    
+    all_students = selected.get("ALL", {})
+    # Requested groups first, All Students last as the baseline
+    for group in sorted(selected, key=lambda g: g == "ALL"):
+        response_parts.append(f"\n**{get_student_group_name(group)}:**")
+        for indicator, summary in selected[group].items():
+            line = (f"• {indicator.replace('_', ' ').title()}: mean {format_rollup_value(summary, summary['mean'])}"
+                    f" (median {format_rollup_value(summary, summary['median'])}) across {summary['schools']} schools")
+            baseline = all_students.get(indicator)
+            if group != "ALL" and baseline and summary["mean"] is not None and baseline["mean"] is not None:
+                line += f", gap vs All Students {summary['mean'] - baseline['mean']:+.1f}"
+            colors = ", ".join(f"{count} {color}" for color, count in summary["colors"].items())
+            if colors:
+                line += f" - {colors}"
+            official = rollup.get("official", {}).get(group, {}).get(indicator)
+            if official and official.get("status") not in (None, "No Data"):
+                line += f"; {rollup['level']} rating **{official['status']}**"
+            response_parts.append(line)
+    return "\n".join(response_parts)
+
+def generate_rollup_response(user_query: str, rollup: Dict, parsed_query: Dict) -> str:
+    """AI (or template) answer to an aggregate question from a rollup document"""
+    if get_model() is not None:
+        # Cached like school analyses, with the rollup standing in for the result list
+        cache_key = get_analysis_cache_key([{"cds_code": f"{rollup['level']}:{rollup['name']}"}], parsed_query)
+        cached = analysis_cache.get(cache_key)
+        if cached:
+            print(f"DEBUG - Analysis cache hit: {cache_key}")
+            return cached
+        
+        rollup_summary = {
+            "name": rollup["name"],
+            "level": rollup["level"],
+            "school_count": rollup["school_count"],
+            "student_groups": select_rollup_entries(rollup, parsed_query),
+            "official_ratings": rollup.get("official", {})
+        }
+        rollup_prompt = f"""
+You are a California School Dashboard data analyst. Answer the question from these {rollup['level']}-wide aggregates
+with a CONCISE, FACT-BASED analysis and NO implementation suggestions.
+
+USER QUERY: {user_query}
+AGGREGATES: {json.dumps(rollup_summary, indent=2)}
+
+DATA CONTEXT:
+- For each student group and indicator: number of schools, color distribution, mean and median status
+  (rate in % or points from standard) over rated schools, and mean change from last year
+- Gaps are differences between a group's mean and the All Students (ALL) mean
+- official_ratings are the Dashboard's own {rollup['level']}-level results where available
+
+Keep the response under 200 words, starting with a summary sentence followed by bullet points.
+"""
+        ai_response = generate_cached_ai_text(cache_key, rollup_prompt)
+        if ai_response:
+            return ai_response
+    
+    return generate_rollup_template_response(rollup, parsed_query)
+
+def generate_cached_ai_text(cache_key: str, prompt: str) -> str:
+    """Gemini's answer to prompt, stored in analysis_cache under cache_key; None on failure"""
+    try:
+        response = get_model().generate_content(prompt)
+        ai_response = response.text.strip()
+        if ai_response:
+            analysis_cache.set(cache_key, ai_response)
+            return ai_response
+    except Exception as e:
+        print(f"AI analysis failed: {e}")
+    return None
+
+def find_query_gaps(parsed_query: Dict) -> Dict:
+    """Top-K equity gap rows for a ranked gap question about one indicator, or None
+    
+    One named group is compared with All Students; two groups forming one of
+    GAP_PAIRS (e.g. HI and WH) are compared with each other.
+    """
+    if not parsed_query.get("gap") or not parsed_query.get("ranking") or parsed_query.get("school_name") \
+            or parsed_query.get("data_availability") == "not_available":
+        return None
+    indicators = [i for i in (parsed_query.get("indicators") or []) if i in VALID_INDICATORS]
+    if len(indicators) != 1:
+        return None
+    
+    groups = [g for g in (parsed_query.get("student_groups") or []) if g in VALID_STUDENT_GROUPS and g != "ALL"]
+    group, baseline = (groups[0] if groups else None), "ALL"
+    pair = next(((a, b) for a, b in GAP_PAIRS if a in groups and b in groups), None)
+    if pair:
+        group, baseline = pair
+    try:
+        rows = find_largest_gaps(db, indicators[0], group=group, baseline=baseline,
+                                 district_name=parsed_query.get("district_name"),
+                                 county_name=parsed_query.get("county_name"),
+                                 limit=GAP_TOP_K, largest=wants_largest_gaps(parsed_query["ranking"]))
+    except Exception as e:
+        print(f"Equity gap lookup failed: {e}")
+        return None
+    return {"indicator": indicators[0], "group": group, "baseline": baseline, "rows": rows}
+
+def fetch_gap_schools(gaps: Dict, parsed_query: Dict) -> List[Dict]:
+    """School documents for the gap rows, in gap order, with the compared groups projected"""
+    groups = list(dict.fromkeys([row["group"] for row in gaps["rows"]] + [gaps["baseline"]]))
+    projection = build_projection(dict(parsed_query, student_groups=groups))
+    docs = school_data.find_by_cds([row["cds_code"] for row in gaps["rows"]], projection)
+    by_code = {doc["cds_code"]: doc for doc in docs}
+    return [by_code[row["cds_code"]] for row in gaps["rows"] if row["cds_code"] in by_code]
+
+def generate_gap_template_response(gaps: Dict, parsed_query: Dict) -> str:
+    """Numbered list of the schools with the largest (or smallest) gaps (fallback)"""
+    largest = wants_largest_gaps(parsed_query.get("ranking"))
+    against = get_student_group_name(gaps["baseline"])
+    title = f"{'Largest' if largest else 'Smallest'} {gaps['indicator'].replace('_', ' ').title()} gaps"
+    title += f": {get_student_group_name(gaps['group'])} vs {against}" if gaps["group"] else f" vs {against}"
+    response_parts = [f"**{title}**"]
+    for rank, row in enumerate(gaps["rows"], 1):
+        response_parts.append(
+            f"{rank}. **{row['school_name']}** ({row['district_name']}): "
+            f"{get_student_group_name(row['group'])} {format_rollup_value(row, row['group_value'])} vs "
+            f"{format_rollup_value(row, row['baseline_value'])} - gap {row['gap']:.1f} points")
+    response_parts.append("\n*A positive gap means the group is doing worse than the comparison group.*")
+    return "\n".join(response_parts)
+
+def generate_gap_response(user_query: str, gaps: Dict, parsed_query: Dict) -> str:
+    """AI (or template) answer to a ranked equity gap question"""
+    if get_model() is not None:
+        cache_key = get_analysis_cache_key(gaps["rows"], parsed_query)
+        cached = analysis_cache.get(cache_key)
+        if cached:
+            print(f"DEBUG - Analysis cache hit: {cache_key}")
+            return cached
+        
+        gap_prompt = f"""
+You are a California School Dashboard data analyst. Provide a CONCISE, FACT-BASED analysis of these
+student group gaps with NO implementation suggestions.
+
+USER QUERY: {user_query}
+GAPS: {json.dumps(gaps["rows"], indent=2, default=str)}
+
+DATA CONTEXT:
+- group_value and baseline_value are the indicator status for the group and the comparison group
+- gap is in the indicator's units, oriented so a positive gap means the group is doing worse
+
+Keep the response under 200 words, starting with a summary sentence followed by bullet points.
+"""
+        ai_response = generate_cached_ai_text(cache_key, gap_prompt)
+        if ai_response:
+            return ai_response
+    
+    return generate_gap_template_response(gaps, parsed_query)
+
+def find_precomputed_answer(parsed_query: Dict) -> Dict:
+    """Payload for questions answered from the equity gap index or the rollups, or None
+    
+    Pass the payload to generate_precomputed_response for its answer text.
+    """
+    # Both collections are built by the importer in MongoDB only
+    if db is None:
+        return None
+    
+    gaps = find_query_gaps(parsed_query)
+    if gaps and gaps["rows"]:
+        schools = fetch_gap_schools(gaps, parsed_query)
+        return {"schools": schools, "gaps": gaps, "next_cursor": None,
+                "total": len(schools), "total_capped": False}
+    
+    # Aggregate questions about a whole district or county come from one rollup document
+    rollup = find_query_rollup(parsed_query)
+    if rollup:
+        return {"schools": [], "rollup": rollup}
+    return None
+
+def generate_precomputed_response(user_query: str, payload: Dict, parsed_query: Dict) -> str:
+    if "gaps" in payload:
+        return generate_gap_response(user_query, payload["gaps"], parsed_query)
+    return generate_rollup_response(user_query, payload["rollup"], parsed_query)
+
 def generate_template_response(user_query: str, results: List[Dict], parsed_query: Dict) -> str:
     """Generate concise template-based response (fallback)"""
     
@@ -490,2077 +1237,230 @@ HTML_TEMPLATE = '''
 <head>
     <title>CA Schools AI Dashboard</title>
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <style>
-       /* Modern Dashboard CSS - Replace existing styles with these updated versions */
+    <link rel="stylesheet" href="{{ css_url }}">
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>🏫 California Schools AI Dashboard</h1>
+            <p>Explore CA Dashboard data using natural language. Powered by MongoDB and Gemini</p>
+        </div>
+        
+        <!-- Tab Navigation -->
+        <div class="tab-navigation">
+            <div class="tab-buttons">
+                <button class="tab-button active" data-tab="chat">
+                    💬 Chat
+                    <span class="tab-badge" id="chatBadge">1</span>
+                </button>
+                <button class="tab-button" data-tab="results" id="resultsButton">
+    📊 Results
+    <span class="tab-badge" id="resultsBadge" style="display: none;">0</span>
+</button>
+            </div>
+        </div>
 
-/* Import Google Fonts for modern typography */
-@import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
+        <!-- Tab Content Area -->
+        <div class="tab-content-area">
+            <!-- Chat Tab -->
+            <div class="tab-content active" id="chatTab">
+                <div class="chat-container" id="chatContainer">
+                    <div class="message ai-message">
+                        <span>👋 Hi! I can help you explore California school dashboard data. Ask me about school performance, student groups, or specific districts!</span>
+                    </div>
+                </div>
+                
+                <div class="examples">
+                    <h3>💡 Try an example:</h3>
+                    <div class="example-grid">
+                        <div class="example-query" data-query="Which schools in Sunnyvale have red or orange math performance for English Learner students?">Schools in Sunnyvale with red or orange performance for English Learners</div>
+                        <div class="example-query" data-query="Show me chronic absenteeism data for English Learners in Oakland">Absenteeism for English Learners in Oakland</div>
+                        <div class="example-query" data-query="Find schools in San Francisco with Blue or Green ELA performance">High-performing ELA schools in San Francisco</div>
+                    </div>
+                </div>
+            </div>
 
-* { 
-    box-sizing: border-box; 
-}
+            <!-- Results Tab -->
+<div class="tab-content" id="resultsTab">
+    <div class="results-content" id="resultsContent">
+        <div class="results-header">
+            <h3>📊 School Performance Results</h3>
+            <div class="dropdown-controls">
+                <div class="dropdown-group">
+                    <label for="districtSelect">District:</label>
+                    <select id="districtSelect" onchange="handleDistrictChange()">
+                        <option value="">All Districts</option>
+                    </select>
+                </div>
+                <div class="dropdown-group">
+                    <label for="schoolSelect">School:</label>
+                    <select id="schoolSelect" onchange="filterByDropdowns()">
+                        <option value="">All Schools</option>
+                    </select>
+                </div>
+            </div>
+        </div>
+        <div class="empty-state" id="emptyResults">
+            <h3>🔍 Select a District and School</h3>
+            <p>Choose from the dropdowns above to explore California school dashboard data</p>
+        </div>
+        <div id="dynamicContent" style="display: none;"></div>
+    </div>
+</div>
+        </div>
 
-body { 
-    font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; 
-    max-width: 1400px; 
-    margin: 0 auto; 
-    padding: 20px; 
-    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-    min-height: 100vh;
-    font-weight: 400;
-    letter-spacing: -0.01em;
-}
+        <!-- Input Section - Always Visible -->
+        <div class="input-section">
+            <div class="input-container">
+                  <input id="queryInput" type="text" placeholder="What California school or district do you want to learn about...">
+                <button id="sendQueryBtn">Ask</button>
+                 <button id="popupChatBtn" title="Open Chat">💬</button>
+            </div>
+        </div>
+    </div>
 
-.container {
-    background: white;
-    border-radius: 20px;
-    box-shadow: 0 25px 50px rgba(0,0,0,0.15);
-    overflow: hidden;
-    display: flex;
-    flex-direction: column;
-    height: calc(100vh - 40px);
-    backdrop-filter: blur(10px);
-    position: relative;
-}
+    <script src="{{ js_url }}"></script>
+    
+    <!-- Pop-up Chat Overlay -->
+    <div class="popup-chat-overlay" id="popupChatOverlay">
+        <div class="popup-chat-window" onclick="event.stopPropagation()">
+            <div class="popup-chat-header">
+    <div class="popup-chat-title">
+        💬 Chat
+    </div>
+    <button class="popup-close-btn" id="popupCloseBtn">×</button>
+</div>
+            <div class="popup-chat-content" id="popupChatContent">
+                <!-- Chat messages will be synced here -->
+            </div>
+            <div class="popup-chat-input">
+                <div class="popup-input-container">
+                    <input id="popupQueryInput" type="text" placeholder="Ask a question...">
+                    <button id="popupSendBtn">Ask</button>
+                </div>
+            </div>
+        </div>
+    </div>
+</body>
+</html>
+'''
 
-.header { 
-    text-align: center; 
-    color: white; 
-    padding: 32px; 
-    background: linear-gradient(135deg, #2196F3 0%, #1976D2 50%, #1565C0 100%);
-    position: relative;
-    overflow: hidden;
-    flex-shrink: 0;
-    min-height: 120px;
-}
+# Fingerprinted CSS/JS from build_assets.py, held pre-compressed in memory.
+# The file names change with the content, so browsers may cache them forever.
+with startup_phase("assets"):
+    ASSET_MANIFEST = load_or_build_manifest()
+    ASSET_VARIANTS = {}
+    for dist_name in ASSET_MANIFEST.values():
+        with open(os.path.join(DIST_DIR, dist_name), 'rb') as asset_file:
+            ASSET_VARIANTS[dist_name] = precompress(asset_file.read())
+    ASSET_MAX_AGE = 31536000
+
+    # Render the page once at startup - the template never changes between requests -
+    # and keep pre-compressed copies so each hit is just a dictionary lookup
+    with app.app_context():
+        INDEX_HTML = render_template_string(
+            HTML_TEMPLATE,
+            css_url=f"/assets/{ASSET_MANIFEST['dashboard.css']}",
+            js_url=f"/assets/{ASSET_MANIFEST['dashboard.js']}"
+        ).encode('utf-8')
+    INDEX_ETAG = hashlib.sha256(INDEX_HTML).hexdigest()[:16]
+    INDEX_VARIANTS = precompress(INDEX_HTML)
+# The page names the current asset fingerprints, so by default browsers revalidate it
+# on every load (a cheap 304) rather than holding on to links to old assets
+HTML_MAX_AGE = int(os.getenv("HTML_MAX_AGE", 0))
+
+def precompressed_response(variants, etag, mimetype):
+    """Serve the best pre-compressed variant for the client, or a 304 if its copy is current"""
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    # Each encoding is a different representation, so it gets its own strong ETag
+    etag = f"{etag}-{encoding}" if encoding else etag
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(variants[encoding], mimetype=mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    return response
 
-.header::before {
-    content: '';
-    position: absolute;
-    top: 0;
-    left: 0;
-    right: 0;
-    bottom: 0;
-    background: url('data:image/svg+xml,<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 100 100"><circle cx="20" cy="20" r="2" fill="rgba(255,255,255,0.1)"/><circle cx="80" cy="30" r="1.5" fill="rgba(255,255,255,0.1)"/><circle cx="40" cy="70" r="1" fill="rgba(255,255,255,0.1)"/><circle cx="90" cy="80" r="2.5" fill="rgba(255,255,255,0.1)"/></svg>');
-    pointer-events: none;
-}
+@app.route('/')
+def index():
+    response = precompressed_response(INDEX_VARIANTS, INDEX_ETAG, 'text/html')
+    if HTML_MAX_AGE:
+        response.cache_control.max_age = HTML_MAX_AGE
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+@app.route('/assets/<path:filename>')
+def serve_asset(filename):
+    variants = ASSET_VARIANTS.get(filename)
+    if variants is None:
+        return jsonify({"error": "Asset not found"}), 404
+
+    mimetype = 'text/css' if filename.endswith('.css') else 'application/javascript'
+    # The content hash is already in the file name, so it doubles as the ETag
+    response = precompressed_response(variants, filename.split('.')[1], mimetype)
+    response.cache_control.max_age = ASSET_MAX_AGE
+    response.cache_control.immutable = True
+    return response
+
+@app.after_request
+def compress_response(response):
+    """gzip/brotli-compress JSON and other text responses for clients that accept it"""
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    data = response.get_data()
+    if not encoding or len(data) < MIN_COMPRESS_SIZE:
+        return response
+    
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    # The compressed body is a different representation, so demote a strong ETag to weak
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
 
-.header h1 { 
-    margin: 0 0 8px 0; 
-    font-size: 2.2em; 
-    font-weight: 700; 
-    position: relative;
-    z-index: 1;
-}
+@app.route('/query', methods=['POST'])
+@limiter.limit("10 per minute")  # Max 10 queries per minute per IP
 
-.header p { 
-    margin: 0; 
-    opacity: 0.9; 
-    font-size: 1.1em; 
-    font-weight: 400;
-    position: relative;
-    z-index: 1;
-}
+def handle_query():
+    user_query = request.json.get('query')
+    if not user_query:
+        return jsonify({"error": "No query provided"}), 400
 
-/* Modern Tab Navigation */
-.tab-navigation {
-    background: linear-gradient(to right, #f8fafc, #f1f5f9);
-    border-bottom: 1px solid #e2e8f0;
-    padding: 0;
-    flex-shrink: 0;
-}
+    # Parse the question (overlapping any Gemini call with a speculative search)
+    page_size = get_page_size(request.json.get('page_size'))
+    parsed_query, search = parse_query_with_speculative_search(user_query, page_size)
+    
+    # Store the searched district for frontend dropdown selection
+    searched_district = parsed_query.get("district_name") if parsed_query else None
+    
+    # If AI determined data is unavailable, return early
+    if parsed_query and parsed_query.get("data_availability") == "not_available":
+        response_text = generate_intelligent_response(user_query, [], parsed_query)
+        return jsonify({"response": response_text, "schools": []})
 
-.tab-buttons {
-    display: flex;
-    margin: 0;
-    padding: 8px;
-    gap: 4px;
-}
+    # Gap rankings and district/county aggregates come from precomputed collections
+    precomputed = find_precomputed_answer(parsed_query)
+    if precomputed:
+        precomputed["response"] = generate_precomputed_response(user_query, precomputed, parsed_query)
+        precomputed["searched_district"] = searched_district
+        return schools_response(precomputed)
 
-.tab-button {
-    background: none;
-    border: none;
-    padding: 16px 24px;
-    cursor: pointer;
-    font-size: 15px;
-    font-weight: 500;
-    color: #64748b;
-    border-radius: 12px;
-    transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-    display: flex;
-    align-items: center;
-    gap: 10px;
-    position: relative;
-    font-family: 'Inter', sans-serif;
-}
-
-.tab-button:hover {
-    background: rgba(59, 130, 246, 0.08);
-    color: #1e40af;
-    transform: translateY(-1px);
-}
-
-.tab-button.active {
-    color: #1e40af;
-    background: white;
-    box-shadow: 0 4px 12px rgba(59, 130, 246, 0.15);
-    transform: translateY(-1px);
-}
-
-.tab-badge {
-    background: linear-gradient(135deg, #3b82f6, #1d4ed8);
-    color: white;
-    border-radius: 10px;
-    padding: 3px 8px;
-    font-size: 11px;
-    font-weight: 600;
-    min-width: 20px;
-    text-align: center;
-    box-shadow: 0 2px 4px rgba(59, 130, 246, 0.3);
-}
-
-.tab-button:not(.active) .tab-badge {
-    background: linear-gradient(135deg, #94a3b8, #64748b);
-    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-}
-
-/* Tab Content Area */
-.tab-content-area {
-    flex-grow: 1;
-    overflow: hidden;
-    display: flex;
-    flex-direction: column;
-}
-
-.tab-content {
-    flex-grow: 2;
-    overflow-y: auto;
-    padding: 32px;
-    padding-top: 32px;
-    display: none;
-    overflow-x: hidden;
-}
-
-.tab-content.active {
-    display: flex;
-    flex-direction: column;
-}
-
-/* Modern Chat Styles */
-.chat-container { 
-    flex-grow: 1;
-    overflow-y: auto;
-    padding-right: 8px;
-}
-
-.message { 
-    margin-bottom: 24px; 
-    display: flex; 
-}
-
-.user-message { 
-    justify-content: flex-end; 
-}
-
-.user-message span { 
-    background: linear-gradient(135deg, #3b82f6, #1d4ed8); 
-    color: white; 
-    padding: 16px 20px; 
-    border-radius: 20px 20px 6px 20px; 
-    max-width: 75%; 
-    box-shadow: 0 4px 16px rgba(59, 130, 246, 0.3);
-    font-weight: 500;
-    line-height: 1.5;
-}
-
-.ai-message { 
-    justify-content: flex-start; 
-}
-
-.ai-message span { 
-    background: white;
-    border: 1px solid #e2e8f0; 
-    padding: 16px 20px; 
-    border-radius: 20px 20px 20px 6px; 
-    max-width: 85%;
-    line-height: 1.6;
-    box-shadow: 0 2px 8px rgba(0,0,0,0.04);
-    color: #334155;
-}
-
-/* Modern Examples Section */
-.examples { 
-    background: linear-gradient(135deg, #f8fafc, #f1f5f9);
-    padding: 24px; 
-    border-top: 1px solid #e2e8f0;
-    margin-top: auto;
-    flex-shrink: 0;
-    border-radius: 16px 16px 0 0;
-}
-
-.examples h3 { 
-    margin: 0 0 16px 0; 
-    color: #1e293b; 
-    font-weight: 600; 
-    font-size: 1.1em; 
-}
-
-.example-grid { 
-    display: flex; 
-    flex-wrap: wrap; 
-    gap: 12px; 
-}
-
-.example-query { 
-    background: white;
-    color: #475569; 
-    padding: 12px 16px; 
-    border-radius: 12px; 
-    cursor: pointer; 
-    border: 1px solid #e2e8f0; 
-    transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-    font-size: 14px;
-    font-weight: 500;
-    box-shadow: 0 1px 3px rgba(0,0,0,0.04);
-}
-
-.example-query:hover { 
-    background: #3b82f6;
-    border-color: #3b82f6; 
-    color: white;
-    transform: translateY(-2px);
-    box-shadow: 0 8px 20px rgba(59, 130, 246, 0.3);
-}
-
-/* Modern Results Styles */
-.results-content {
-    flex-grow: 1;
-    overflow-y: auto;
-}
-
-.results-header { 
-    margin-bottom: 24px; 
-    padding: 24px;
-    background: linear-gradient(135deg, #f8fafc, #f1f5f9);
-    border-radius: 16px;
-    border: 1px solid #e2e8f0;
-}
-
-.results-header h3 { 
-    margin: 0; 
-    font-weight: 600; 
-    color: #1e293b;
-    font-size: 1.3em;
-}
-/* Dropdown Controls CSS */
-.dropdown-controls {
-    display: flex;
-    gap: 24px;
-    margin-top: 16px;
-    flex-wrap: wrap;
-}
-
-.dropdown-group {
-    display: flex;
-    flex-direction: column;
-    gap: 6px;
-    min-width: 200px;
-}
-
-.dropdown-group label {
-    font-weight: 600;
-    color: #1e293b;
-    font-size: 13px;
-    text-transform: uppercase;
-    letter-spacing: 0.5px;
-}
-
-.dropdown-group select {
-    padding: 12px 16px;
-    border: 2px solid #e2e8f0;
-    border-radius: 10px;
-    background: white;
-    font-size: 14px;
-    font-weight: 500;
-    color: #1e293b;
-    cursor: pointer;
-    transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-    font-family: 'Inter', sans-serif;
-}
-
-.dropdown-group select:focus {
-    outline: none;
-    border-color: #3b82f6;
-    box-shadow: 0 0 0 4px rgba(59, 130, 246, 0.1);
-    transform: translateY(-1px);
-}
-
-.dropdown-group select:hover {
-    border-color: #94a3b8;
-    background: #f8fafc;
-}
-
-/* Modern Filter System */
-.filter-system {
-    background: white;
-    border: 1px solid #e2e8f0;
-    border-radius: 16px;
-    margin-bottom: 24px;
-    overflow: hidden;
-    box-shadow: 0 4px 12px rgba(0,0,0,0.05);
-}
-
-.filter-section {
-    border-bottom: 1px solid #f1f5f9;
-}
-
-.filter-section:last-child {
-    border-bottom: none;
-}
-
-.filter-header {
-    display: flex;
-    justify-content: space-between;
-    align-items: center;
-    padding: 16px 20px;
-    background: #ffffff;
-    cursor: pointer;
-    transition: all 0.2s ease;
-    user-select: none;
-}
-
-.filter-header:hover {
-    background: #f8fafc;
-}
-
-.filter-title {
-    font-weight: 600;
-    color: #1e293b;
-    font-size: 15px;
-}
-
-.filter-arrow {
-    color: #64748b;
-    font-size: 14px;
-    transition: transform 0.3s ease;
-}
-
-.filter-content {
-    padding: 20px;
-    background: #ffffff;
-    border-top: 1px solid #f1f5f9;
-    display: block;
-}
-
-.filter-content.collapsed {
-    display: none;
-}
-
-/* Student Group Grid - Fixed Layout */
-.student-group-grid {
-    display: grid;
-    grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-    gap: 12px;
-}
-
-.student-group-grid label {
-    display: flex;
-    align-items: center;
-    gap: 8px;
-    padding: 8px 12px;
-    border: 1px solid #f1f5f9;
-    border-radius: 8px;
-    cursor: pointer;
-    transition: all 0.2s ease;
-    font-size: 14px;
-    font-weight: 500;
-}
-
-.student-group-grid label:hover {
-    background: #f8fafc;
-    border-color: #3b82f6;
-}
-
-.student-group-grid input[type="radio"] {
-    margin: 0;
-}
-
-/* Modern Color Filter Grid */
-.color-filter-grid {
-    display: grid;
-    grid-template-columns: repeat(auto-fit, minmax(300px, 1fr));
-    gap: 12px;
-    margin-bottom: 20px;
-}
-
-.color-filter-item {
-    display: flex;
-    align-items: center;
-    gap: 12px;
-    padding: 12px 16px;
-    border: 2px solid #f1f5f9;
-    border-radius: 12px;
-    cursor: pointer;
-    transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-    background: #ffffff;
-}
-
-.color-filter-item:hover {
-    border-color: #3b82f6;
-    background: #f8fafc;
-    transform: translateY(-1px);
-    box-shadow: 0 4px 12px rgba(59, 130, 246, 0.1);
-}
-
-.color-filter-item input[type="checkbox"] {
-    margin: 0;
-    transform: scale(1.2);
-}
-
-.color-sample {
-    font-size: 13px;
-    font-weight: 600;
-    min-width: 80px;
-    display: inline-block;
-    padding: 4px 12px;
-    border-radius: 6px;
-    text-align: center;
-}
-
-/* Color samples matching table style */
-.color-sample.blue-sample {
-    background: linear-gradient(135deg, #1e88e5, #1565c0);
-    color: white;
-}
-
-.color-sample.green-sample {
-    background: linear-gradient(135deg, #43a047, #2e7d32);
-    color: white;
-}
-
-.color-sample.yellow-sample {
-    background: linear-gradient(135deg, #ffd54f, #ffb300);
-    color: #1a1a1a;
-}
-
-.color-sample.orange-sample {
-    background: linear-gradient(135deg, #ff9800, #f57c00);
-    color: white;
-}
-
-.color-sample.red-sample {
-    background: linear-gradient(135deg, #f44336, #d32f2f);
-    color: white;
-}
-
-.color-description {
-    font-size: 13px;
-    color: #64748b;
-    flex-grow: 1;
-    font-weight: 500;
-}
-
-/* Filter Action Buttons */
-.color-filter-actions {
-    display: flex;
-    gap: 12px;
-    flex-wrap: wrap;
-    padding-top: 16px;
-    border-top: 1px solid #f1f5f9;
-    justify-content: flex-end;
-}
-
-.filter-action-btn {
-    padding: 10px 16px;
-    border: 2px solid #e2e8f0;
-    background: #fff;
-    border-radius: 10px;
-    cursor: pointer;
-    font-size: 13px;
-    font-weight: 600;
-    transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-    font-family: 'Inter', sans-serif;
-}
-
-.filter-action-btn:hover {
-    background: #f8fafc;
-    border-color: #3b82f6;
-    transform: translateY(-1px);
-    box-shadow: 0 4px 12px rgba(59, 130, 246, 0.15);
-}
-
-.problems-btn {
-    background: #fff;
-    border-color: #e2e8f0;
-    color: #1e293b;
-}
-
-.problems-btn.active {
-    background: linear-gradient(135deg, #fef3c7, #fde68a);
-    border-color: #f59e0b;
-    color: #92400e;
-}
-
-.problems-btn:hover {
-    background: #f8fafc;
-    border-color: #3b82f6;
-    box-shadow: 0 4px 12px rgba(59, 130, 246, 0.25);
-}
-
-.problems-btn.active:hover {
-    background: linear-gradient(135deg, #fde68a, #fcd34d);
-    border-color: #d97706;
-    box-shadow: 0 4px 12px rgba(245, 158, 11, 0.25);
-}
-
-/* Modern Table Styles */
-.performance-table {
-    background: white;
-    border-radius: 16px;
-    overflow: hidden;
-    box-shadow: 0 4px 12px rgba(0,0,0,0.05);
-    border: 1px solid #e2e8f0;
-}
-
-.performance-table table { 
-    width: 100%; 
-    border-collapse: collapse; 
-    font-size: 14px; 
-}
-
-.performance-table th, .performance-table td { 
-    padding: 16px 12px; 
-    border: none;
-    text-align: left; 
-    border-bottom: 1px solid #f1f5f9;
-}
-
-.performance-table th { 
-    background: linear-gradient(135deg, #f8fafc, #f1f5f9);
-    font-weight: 600; 
-    color: #1e293b;
-    font-size: 13px;
-    text-transform: uppercase;
-    letter-spacing: 0.5px;
-}
-
-.performance-table tbody tr:hover {
-    background: #f8fafc;
-}
-
-.school-name-cell { 
-    font-weight: 600; 
-    color: #1e293b;
-}
-
-/* Modern Performance Cell */
-.performance-cell {
-    display: flex;
-    flex-direction: column;
-    align-items: center;
-    gap: 4px;
-}
-
-
-.color-cell {
-    text-align: center; 
-    font-weight: 600; 
-    border-radius: 8px; 
-    padding: 8px 12px; 
-    color: white;
-    min-width: 80px;
-    font-size: 12px;
-    text-transform: uppercase;
-    letter-spacing: 0.5px;
-    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-}
-
-/* Color-specific styles for performance pills */
-.color-cell.Blue { 
-    background: linear-gradient(135deg, #1e88e5, #1565c0); 
-    color: white;
-}
-
-.color-cell.Green { 
-    background: linear-gradient(135deg, #43a047, #2e7d32); 
-    color: white;
-}
-
-.color-cell.Yellow { 
-    background: linear-gradient(135deg, #ffd54f, #ffb300); 
-    color: #1a1a1a;
-}
-
-.color-cell.Orange { 
-    background: linear-gradient(135deg, #ff9800, #f57c00); 
-    color: white;
-}
-
-.color-cell.Red { 
-    background: linear-gradient(135deg, #f44336, #d32f2f); 
-    color: white;
-}
-
-.color-cell.No-Data { 
-    background: linear-gradient(135deg, #bdbdbd, #9e9e9e); 
-    color: white;
-}
-
-.performance-value {
-    font-size: 11px;
-    font-weight: 600;
-    text-align: center;
-    min-height: 16px;
-    line-height: 1.3;
-}
-
-.performance-above {
-    color: #059669;
-}
-
-.performance-below {
-    color: #dc2626;
-}
-
-.performance-rate {
-    color: #2563eb;
-}
-
-.performance-na {
-    color: #9ca3af;
-}
-
-.trend-info {
-    font-size: 11px;
-    font-weight: 600;
-    text-align: center;
-    min-height: 16px;
-    display: flex;
-    align-items: center;
-    justify-content: center;
-}
-
-.trend-good {
-    color: #059669 !important;
-}
-
-.trend-bad {
-    color: #dc2626 !important;
-}
-
-.trend-stable {
-    color: #6b7280 !important;
-}
-
-/* Empty States */
-.empty-state {
-    text-align: center;
-    color: #64748b;
-    padding: 80px 32px;
-    background: linear-gradient(135deg, #f8fafc, #f1f5f9);
-    border-radius: 16px;
-    margin: 24px 0;
-    border: 1px solid #e2e8f0;
-}
-
-.empty-state h3 {
-    margin: 0 0 12px 0;
-    color: #1e293b;
-    font-weight: 600;
-    font-size: 1.2em;
-}
-
-.empty-state p {
-    margin: 0;
-    font-size: 15px;
-}
-
-/* Modern Input Section */
-.input-section { 
-    padding: 24px 32px; 
-    background: linear-gradient(135deg, #f8fafc, #ffffff); 
-    border-top: 1px solid #e2e8f0;
-    flex-shrink: 0;
-}
-
-.input-container { 
-    display: flex; 
-    gap: 16px; 
-    max-width: 800px;
-    margin: 0 auto;
-}
-
-.input-container input { 
-    flex: 1; 
-    padding: 16px 20px; 
-    border: 2px solid #e2e8f0; 
-    border-radius: 12px; 
-    font-size: 15px; 
-    transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-    font-family: 'Inter', sans-serif;
-    background: white;
-}
-
-.input-container input:focus { 
-    outline: none; 
-    border-color: #3b82f6; 
-    box-shadow: 0 0 0 4px rgba(59, 130, 246, 0.1);
-    transform: translateY(-1px);
-}
-
-.input-container button { 
-    padding: 16px 32px; 
-    background: linear-gradient(135deg, #3b82f6, #1d4ed8); 
-    color: white; 
-    border: none; 
-    border-radius: 12px; 
-    cursor: pointer; 
-    font-size: 15px; 
-    font-weight: 600; 
-    transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-    box-shadow: 0 4px 12px rgba(59, 130, 246, 0.3);
-    font-family: 'Inter', sans-serif;
-}
-
-.input-container button:hover { 
-    transform: translateY(-2px);
-    box-shadow: 0 8px 20px rgba(59, 130, 246, 0.4);
-}
-
-/* Pop-up Chat Button */
-#popupChatBtn {
-    padding: 16px 20px; 
-    background: linear-gradient(135deg, #3b82f6, #1d4ed8); 
-    color: white; 
-    border: none; 
-    border-radius: 12px; 
-    cursor: pointer; 
-    font-size: 18px; 
-    font-weight: 600; 
-    transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-    box-shadow: 0 4px 12px rgba(59, 130, 246, 0.3);
-    font-family: 'Inter', sans-serif;
-    min-width: 60px;
-}
-
-#popupChatBtn:hover { 
-    transform: translateY(-2px);
-    box-shadow: 0 8px 20px rgba(59, 130, 246, 0.4);
-}
-
-/* Pop-up Chat Window */
-.popup-chat-overlay {
-    position: fixed;
-    top: 0;
-    left: 0;
-    right: 0;
-    bottom: 0;
-    z-index: 1000;
-    display: none;
-    pointer-events: none; /* Allow clicking through the overlay */
-
-}
-
-.popup-chat-window {
-    position: fixed;
-    bottom: 20px;
-    right: 20px;
-    width: 400px;
-    height: 600px;
-    background: white;
-    border-radius: 20px;
-    box-shadow: 0 25px 50px rgba(0,0,0,0.25);
-    display: flex;
-    flex-direction: column;
-    z-index: 1001;
-    overflow: hidden;
-    border: 1px solid #e2e8f0;
-    pointer-events: auto; /* Re-enable clicking on the chat window */
-}
-
-.popup-chat-header {
-    background: linear-gradient(135deg, #2196F3 0%, #1976D2 50%, #1565C0 100%);
-    color: white;
-    padding: 16px 20px;
-    display: flex;
-    justify-content: space-between;
-    align-items: center;
-    flex-shrink: 0;
-}
-
-.popup-chat-title {
-    font-weight: 600;
-    font-size: 16px;
-    display: flex;
-    align-items: center;
-    gap: 8px;
-}
-
-.popup-close-btn {
-    background: none;
-    border: none;
-    color: white;
-    font-size: 20px;
-    cursor: pointer;
-    padding: 4px 8px;
-    border-radius: 6px;
-    transition: background 0.2s ease;
-}
-
-.popup-close-btn:hover {
-    background: rgba(255, 255, 255, 0.2);
-}
-
-
-.popup-minimize-btn:hover {
-    background: rgba(255, 255, 255, 0.2);
-}
-
-.popup-chat-content {
-    flex-grow: 1;
-    overflow-y: auto;
-    padding: 20px;
-    display: flex;
-    flex-direction: column;
-    gap: 16px;
-}
-
-.popup-chat-input {
-    padding: 16px 20px;
-    background: linear-gradient(135deg, #f8fafc, #ffffff);
-    border-top: 1px solid #e2e8f0;
-    flex-shrink: 0;
-}
-
-.popup-input-container {
-    display: flex;
-    gap: 12px;
-}
-
-.popup-input-container input {
-    flex: 1;
-    padding: 12px 16px;
-    border: 2px solid #e2e8f0;
-    border-radius: 10px;
-    font-size: 14px;
-    transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-    font-family: 'Inter', sans-serif;
-    background: white;
-}
-
-.popup-input-container input:focus {
-    outline: none;
-    border-color: #3b82f6;
-    box-shadow: 0 0 0 3px rgba(59, 130, 246, 0.1);
-}
-
-.popup-input-container button {
-    padding: 12px 20px;
-    background: linear-gradient(135deg, #3b82f6, #1d4ed8);
-    color: white;
-    border: none;
-    border-radius: 10px;
-    cursor: pointer;
-    font-size: 14px;
-    font-weight: 600;
-    transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-    box-shadow: 0 2px 8px rgba(59, 130, 246, 0.3);
-    font-family: 'Inter', sans-serif;
-}
-
-.popup-input-container button:hover {
-    transform: translateY(-1px);
-    box-shadow: 0 4px 12px rgba(59, 130, 246, 0.4);
-}
-
-/* Responsive Design */
-@media (max-width: 768px) {
-    body {
-        padding: 10px;
-    }
-    
-    .dropdown-controls {
-        flex-direction: column;
-        gap: 16px;
-    }
-    
-    .dropdown-group {
-        min-width: unset;
-        width: 100%;
-    }
-    
-    .container {
-        height: calc(100vh - 20px);
-        border-radius: 16px;
-    }
-    
-    .header {
-        padding: 24px 20px;
-    }
-    
-    .header h1 {
-        font-size: 1.8em;
-    }
-    
-    .tab-content {
-        padding: 20px;
-    }
-    
-    .input-container {
-        flex-direction: column;
-    }
-    
-    .input-container button {
-        padding: 14px 24px;
-    }
-    
-    .color-filter-grid {
-        grid-template-columns: 1fr;
-    }
-    
-    .student-group-grid {
-        grid-template-columns: 1fr;
-    }
-    
-    .color-filter-actions {
-        flex-direction: column;
-    }
-    
-    .filter-action-btn {
-        width: 100%;
-        text-align: center;
-    }
-    
-    .performance-table th, .performance-table td {
-        padding: 12px 8px;
-        font-size: 13px;
-    }
-    
-    .popup-chat-window {
-        width: calc(100vw - 40px);
-        height: calc(100vh - 40px);
-        bottom: 20px;
-        right: 20px;
-        left: 20px;
-    }
-    
-    #popupChatBtn {
-        padding: 14px 16px;
-        font-size: 16px;
-        min-width: 50px;
-    }
-}
-
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>🏫 California Schools AI Dashboard</h1>
-            <p>Explore CA Dashboard data using natural language. Powered by MongoDB and Gemini</p>
-        </div>
-        
-        <!-- Tab Navigation -->
-        <div class="tab-navigation">
-            <div class="tab-buttons">
-                <button class="tab-button active" data-tab="chat">
-                    💬 Chat
-                    <span class="tab-badge" id="chatBadge">1</span>
-                </button>
-                <button class="tab-button" data-tab="results" id="resultsButton">
-    📊 Results
-    <span class="tab-badge" id="resultsBadge" style="display: none;">0</span>
-</button>
-            </div>
-        </div>
-
-        <!-- Tab Content Area -->
-        <div class="tab-content-area">
-            <!-- Chat Tab -->
-            <div class="tab-content active" id="chatTab">
-                <div class="chat-container" id="chatContainer">
-                    <div class="message ai-message">
-                        <span>👋 Hi! I can help you explore California school dashboard data. Ask me about school performance, student groups, or specific districts!</span>
-                    </div>
-                </div>
-                
-                <div class="examples">
-                    <h3>💡 Try an example:</h3>
-                    <div class="example-grid">
-                        <div class="example-query" data-query="Which schools in Sunnyvale have red or orange math performance for English Learner students?">Schools in Sunnyvale with red or orange performance for English Learners</div>
-                        <div class="example-query" data-query="Show me chronic absenteeism data for English Learners in Oakland">Absenteeism for English Learners in Oakland</div>
-                        <div class="example-query" data-query="Find schools in San Francisco with Blue or Green ELA performance">High-performing ELA schools in San Francisco</div>
-                    </div>
-                </div>
-            </div>
-
-            <!-- Results Tab -->
-<div class="tab-content" id="resultsTab">
-    <div class="results-content" id="resultsContent">
-        <div class="results-header">
-            <h3>📊 School Performance Results</h3>
-            <div class="dropdown-controls">
-                <div class="dropdown-group">
-                    <label for="districtSelect">District:</label>
-                    <select id="districtSelect" onchange="handleDistrictChange()">
-                        <option value="">All Districts</option>
-                    </select>
-                </div>
-                <div class="dropdown-group">
-                    <label for="schoolSelect">School:</label>
-                    <select id="schoolSelect" onchange="filterByDropdowns()">
-                        <option value="">All Schools</option>
-                    </select>
-                </div>
-            </div>
-        </div>
-        <div class="empty-state" id="emptyResults">
-            <h3>🔍 Select a District and School</h3>
-            <p>Choose from the dropdowns above to explore California school dashboard data</p>
-        </div>
-        <div id="dynamicContent" style="display: none;"></div>
-    </div>
-</div>
-        </div>
-
-        <!-- Input Section - Always Visible -->
-        <div class="input-section">
-            <div class="input-container">
-                  <input id="queryInput" type="text" placeholder="What California school or district do you want to learn about...">
-                <button id="sendQueryBtn">Ask</button>
-                 <button id="popupChatBtn" title="Open Chat">💬</button>
-            </div>
-        </div>
-    </div>
-
-    <script>
-    // ==============================================================================
-    // ===                           JAVASCRIPT - TABBED VERSION                ===
-    // ==============================================================================
-    
-    let messageCount = 1;
-    let currentSchoolCount = 0;
-
-    document.addEventListener('DOMContentLoaded', function() {
-        console.log("DOM fully loaded. Setting up event listeners.");
-
-        const queryInput = document.getElementById('queryInput');
-        const sendQueryBtn = document.getElementById('sendQueryBtn');
-        const chatTab = document.getElementById('chatTab');
-        const resultsTab = document.getElementById('resultsTab');
-        
-
-        // Tab switching
-        document.querySelectorAll('.tab-button').forEach(button => {
-            button.addEventListener('click', function() {
-                const targetTab = this.dataset.tab;
-                switchTab(targetTab);
-            });
-        });
-
-        // Send query functionality
-        if (sendQueryBtn) {
-            sendQueryBtn.addEventListener('click', sendQuery);
-        }
-
-        if (queryInput) {
-            queryInput.addEventListener('keypress', function(event) {
-                if (event.key === 'Enter') {
-                    event.preventDefault();
-                    sendQuery();
-                }
-            });
-        }
-
-        // Example query clicks
-        chatTab.addEventListener('click', function(event) {
-            if (event.target && event.target.matches('.example-query')) {
-                const queryText = event.target.dataset.query;
-                if (queryText) {
-                    setQuery(queryText);
-                    sendQuery();
-                }
-            }
-        });
-
-        // Event delegation for dynamically created results content
-        const resultsContent = document.getElementById('resultsContent');
-        if(resultsContent) {
-            resultsContent.addEventListener('click', function(event) {
-                const target = event.target;
-                if (target.matches('.view-toggle button')) {
-                    const viewType = target.dataset.view;
-                    if(viewType) toggleView(viewType, target);
-                }
-            });
-            resultsContent.addEventListener('change', function(event) {
-                const target = event.target;
-                if(target.matches('input[name="studentGroup"]')) {
-                    updateTableView();
-                }
-            });
-        }
-        
-        // Pop-up chat event listeners
-        const popupChatBtn = document.getElementById('popupChatBtn');
-        if (popupChatBtn) {
-            popupChatBtn.addEventListener('click', openPopupChat);
-        }
-        
-        const popupCloseBtn = document.getElementById('popupCloseBtn');
-        if (popupCloseBtn) {
-            popupCloseBtn.addEventListener('click', closePopupChat);
-        }
-        
-        // Remove the overlay click listener - we don't want to close on background click
-        
-        const popupSendBtn = document.getElementById('popupSendBtn');
-        if (popupSendBtn) {
-            popupSendBtn.addEventListener('click', sendPopupQuery);
-        }
-        
-        const popupQueryInput = document.getElementById('popupQueryInput');
-        if (popupQueryInput) {
-            popupQueryInput.addEventListener('keypress', function(event) {
-                if (event.key === 'Enter') {
-                    event.preventDefault();
-                    sendPopupQuery();
-                }
-            });
-        }
-        
-        // Close popup with Escape key
-        document.addEventListener('keydown', function(event) {
-            if (event.key === 'Escape') {
-                closePopupChat();
-            }
-        });
-        
-        // Initialize dropdowns on page load
-        initializeDefaultDropdowns();
- 
-    });
-
-
-    function switchTab(tabName) {
-    // Update tab buttons
-    document.querySelectorAll('.tab-button').forEach(btn => {
-        btn.classList.remove('active');
-    });
-    document.querySelector(`[data-tab="${tabName}"]`).classList.add('active');
-
-    // Update tab content - use correct mapping
-    document.querySelectorAll('.tab-content').forEach(content => {
-        content.classList.remove('active');
-    });
-    
-    if (tabName === 'chat') {
-        document.getElementById('chatTab').classList.add('active');
-    } else if (tabName === 'results') {
-        document.getElementById('resultsTab').classList.add('active');
-    }
-}
-
-    function updateTabBadges() {
-        // Update chat badge with message count
-        const chatBadge = document.getElementById('chatBadge');
-        chatBadge.textContent = Math.floor(messageCount / 2); // Divide by 2 since we count both user and AI messages
-
-        // Update results badge
-        const resultsBadge = document.getElementById('resultsBadge');
-        if (currentSchoolCount > 0) {
-            resultsBadge.textContent = currentSchoolCount;
-            resultsBadge.style.display = 'inline';
-        } else {
-            resultsBadge.style.display = 'none';
-        }
-    }
-
-    function setQuery(text) {
-        document.getElementById('queryInput').value = text;
-    }
-
-    function sendQuery() {
-        const input = document.getElementById('queryInput');
-        const query = input.value.trim();
-        if (!query) return;
-
-        addMessage(query, 'user');
-        input.value = '';
-        addMessage('🤔 Analyzing...', 'ai');
-
-        fetch('/query', {
-            method: 'POST',
-            headers: {'Content-Type': 'application/json'},
-            body: JSON.stringify({query: query})
-        })
-        .then(response => {
-            if (!response.ok) throw new Error(`Network response error: ${response.statusText}`);
-            return response.json();
-        })
-        .then(data => {
-            // Remove the "Analyzing..." message
-            const messages = document.querySelectorAll('#chatContainer .message');
-            const lastMessage = messages[messages.length - 1];
-            if (lastMessage && lastMessage.textContent.includes('Analyzing')) {
-                lastMessage.remove();
-                messageCount--; // Adjust count since we're removing a message
-            }
-            
-            addMessage(data.response, 'ai');
-            
-            // Store the searched district for dropdown selection
-            window.lastSearchedDistrict = data.searched_district;
-
-            // Clear any previous district selection when a new search is made
-            const districtSelect = document.getElementById('districtSelect');
-            if (districtSelect) {
-            districtSelect.value = ''; // Reset to "All Districts"
-}
-            
-            // Handle results
-            if (data.schools && data.schools.length > 0) {
-                showResults(data.schools);
-                // Don't auto-switch - let user manually go to results
-            } else {
-                // Clear results if no schools found
-                showEmptyResults();
-            }
-            
-            updateTabBadges();
-        })
-        .catch(error => {
-            // Remove the "Analyzing..." message
-            const messages = document.querySelectorAll('#chatContainer .message');
-            const lastMessage = messages[messages.length - 1];
-            if (lastMessage && lastMessage.textContent.includes('Analyzing')) {
-                lastMessage.remove();
-                messageCount--;
-            }
-            addMessage('❌ An error occurred: ' + error.message, 'ai');
-            updateTabBadges();
-            console.error('Error fetching data:', error);
-        });
-    }
-
-    function addMessage(text, sender) {
-        const container = document.getElementById('chatContainer');
-        const message = document.createElement('div');
-        message.className = `message ${sender}-message`;
-        let formattedText = text;
-        if (sender === 'ai') {
-            formattedText = formattedText
-                .replace(/\\*\\*(.*?)\\*\\*/g, '<strong>$1</strong>')
-                .replace(/\\n/g, '<br>');
-        }
-        message.innerHTML = `<span>${formattedText}</span>`;
-        container.appendChild(message);
-        
-        // Scroll to the new message
-        container.scrollTop = container.scrollHeight;
-        
-        messageCount++;
-        updateTabBadges();
-        syncChatContent(); // Sync with popup if open
-    }
-
-    function showEmptyResults() {
-        document.getElementById('emptyResults').style.display = 'block';
-        document.getElementById('resultsContent').style.display = 'none';
-        currentSchoolCount = 0;
-        updateTabBadges();
-       
-    }
-
-    function showResults(schools) {
-    console.log('DEBUG - showResults called with', schools.length, 'schools');
-    currentSchoolCount = schools.length;
-    
-    const emptyResults = document.getElementById('emptyResults');
-    const resultsContent = document.getElementById('resultsContent');
-    
-    if (emptyResults) {
-        emptyResults.style.display = 'none';
-        console.log('DEBUG - Hidden empty results');
-    }
-    
-    if (resultsContent) {
-        resultsContent.style.setProperty('display', 'block', 'important');
-        console.log('DEBUG - Showing results content with !important');
-    } else {
-        console.error('ERROR - resultsContent element not found!');
-        return;
-    }
-
-    const allIndicators = new Set();
-    const allStudentGroups = new Set(['ALL']);
-    schools.forEach(school => {
-        Object.keys(school.dashboard_indicators || {}).forEach(ind => allIndicators.add(ind));
-        Object.keys(school.student_groups || {}).forEach(grp => allStudentGroups.add(grp));
-        Object.values(school.student_groups || {}).forEach(groupData => {
-            Object.keys(groupData || {}).forEach(ind => allIndicators.add(ind));
-        });
-    });
-    
-    const indicators = Array.from(allIndicators);
-    const studentGroups = Array.from(allStudentGroups);
-    
-// Update the existing header count instead of creating a new one
-    const existingHeader = document.querySelector('.results-header h3');
-    if (existingHeader) {
-        existingHeader.textContent = `📊 School Performance Results (${schools.length} schools)`;
-    }
-
-    let html = '';
-    
-
-
-    // New Collapsible Filter System
-    html = '<div class="filter-system">';
-    
-    // Student Groups Filter (Collapsible)
-    if (studentGroups.length > 1) {
-        html += `
-        <div class="filter-section">
-            <div class="filter-header" onclick="toggleFilterSection('studentGroups')">
-                <span class="filter-title">👥 Student Groups</span>
-                <span class="filter-arrow" id="studentGroupsArrow">▼</span>
-            </div>
-            <div class="filter-content collapsed" id="studentGroupsContent">
-                <div class="student-group-grid">`;
-        
-        studentGroups.forEach(group => {
-            const checked = group === 'ALL' ? 'checked' : '';
-            html += `<label><input type="radio" name="studentGroup" value="${group}" ${checked}> ${getStudentGroupName(group)}</label>`;
-        });
-        
-        html += `    </div>
-            </div>
-        </div>`;
-    }
-    
-    // Performance Colors Filter (Collapsible)
-    html += `
-    <div class="filter-section">
-        <div class="filter-header" onclick="toggleFilterSection('performanceColors')">
-            <span class="filter-title">🎨 Performance Colors</span>
-            <span class="filter-arrow" id="performanceColorsArrow">▼</span>
-        </div>
-        <div class="filter-content collapsed" id="performanceColorsContent">
-            <div class="color-filter-grid">
-                <label class="color-filter-item">
-                    <input type="checkbox" name="colorFilter" value="Blue" onchange="updateColorFilter()">
-                    <span class="color-sample blue-sample"> Blue</span>
-                    <span class="color-description">Highest Performance</span>
-                </label>
-                <label class="color-filter-item">
-                    <input type="checkbox" name="colorFilter" value="Green" onchange="updateColorFilter()">
-                    <span class="color-sample green-sample"> Green</span>
-                    <span class="color-description">Above Average</span>
-                </label>
-                <label class="color-filter-item">
-                    <input type="checkbox" name="colorFilter" value="Yellow" onchange="updateColorFilter()">
-                    <span class="color-sample yellow-sample"> Yellow</span>
-                    <span class="color-description">Average Performance</span>
-                </label>
-                <label class="color-filter-item">
-                    <input type="checkbox" name="colorFilter" value="Orange" onchange="updateColorFilter()">
-                    <span class="color-sample orange-sample"> Orange</span>
-                    <span class="color-description">Below Average</span>
-                </label>
-                <label class="color-filter-item">
-                    <input type="checkbox" name="colorFilter" value="Red" onchange="updateColorFilter()">
-                    <span class="color-sample red-sample"> Red</span>
-                    <span class="color-description">Lowest Performance</span>
-                </label>
-            </div>
-            <div class="color-filter-actions">
-                <button onclick="selectAllColors()" class="filter-action-btn">Select All</button>
-                <button onclick="clearAllColors()" class="filter-action-btn">Clear All</button>
-                <button onclick="selectProblemsOnly()" class="filter-action-btn problems-btn">Problems Only (Red + Orange)</button>
-            </div>
-        </div>
-    </div>`;
-    
-    html += '</div>'; // End filter-system
-    
-    html += `<div id="tableView" class="performance-table">${generateTableView(schools, indicators, 'ALL')}</div>`;
-    
-document.getElementById('dynamicContent').innerHTML = html;
-document.getElementById('dynamicContent').style.display = 'block';
-document.getElementById('emptyResults').style.display = 'none';
-
-// Update the dropdowns with the new data
-populateDropdowns(schools, window.lastSearchedDistrict);
-    console.log('DEBUG - HTML injected successfully');
-    
-    populateDropdowns(schools, window.lastSearchedDistrict);
-    updateTabBadges();
-}
-
-// Toggle filter section open/closed
-function toggleFilterSection(sectionId) {
-    const content = document.getElementById(sectionId + 'Content');
-    const arrow = document.getElementById(sectionId + 'Arrow');
-    
-    if (content.classList.contains('collapsed')) {
-        content.classList.remove('collapsed');
-        arrow.textContent = '▲';
-    } else {
-        content.classList.add('collapsed');
-        arrow.textContent = '▼';
-    }
-}
-
-// Color filtering functions
-function updateColorFilter() {
-    const selectedColors = Array.from(document.querySelectorAll('input[name="colorFilter"]:checked'))
-                               .map(cb => cb.value);
-    
-    const tableRows = document.querySelectorAll('.performance-table tbody tr');
-    
-    if (selectedColors.length === 0) {
-        // No colors selected = show all rows
-        tableRows.forEach(row => row.style.display = '');
-        return;
-    }
-    
-    tableRows.forEach(row => {
-        const colorCells = row.querySelectorAll('.color-cell');
-        let shouldShow = false;
-        
-        // Check if any cell in this row matches selected colors
-        colorCells.forEach(cell => {
-            const cellClasses = cell.className;
-            selectedColors.forEach(color => {
-                if (cellClasses.includes(color)) {
-                    shouldShow = true;
-                }
-            });
-        });
-        
-        row.style.display = shouldShow ? '' : 'none';
-    });
-    
-    updateVisibleRowCount();
-}
-
-function selectAllColors() {
-    document.querySelectorAll('input[name="colorFilter"]').forEach(cb => {
-        cb.checked = true;
-    });
-    updateColorFilter();
-}
-
-function clearAllColors() {
-    document.querySelectorAll('input[name="colorFilter"]').forEach(cb => {
-        cb.checked = false;
-    });
-    updateColorFilter();
-}
-
-function selectProblemsOnly() {
-    // Clear all first
-    clearAllColors();
-    // Select only Red and Orange
-    document.querySelector('input[name="colorFilter"][value="Red"]').checked = true;
-    document.querySelector('input[name="colorFilter"][value="Orange"]').checked = true;
-    updateColorFilter();
-}
-
-function updateVisibleRowCount() {
-    const visibleRows = document.querySelectorAll('.performance-table tbody tr[style=""], .performance-table tbody tr:not([style*="none"])').length;
-    const totalRows = document.querySelectorAll('.performance-table tbody tr').length;
-    
-    // Update results header to show filtered count
-    const resultsHeader = document.querySelector('.results-header h3');
-    if (resultsHeader) {
-        const originalText = resultsHeader.textContent;
-        const baseText = originalText.split('(')[0].trim();
-        resultsHeader.textContent = `${baseText} (${visibleRows} of ${totalRows} schools shown)`;
-    }
-}
-    function toggleView(viewType, buttonElement) {
-        document.querySelectorAll('.view-toggle button').forEach(btn => btn.classList.remove('active'));
-        buttonElement.classList.add('active');
-        // Future: add card view logic here
-    }
-
-    function updateTableView() {
-    const selectedGroup = document.querySelector('input[name="studentGroup"]:checked').value;
-    const schools = window.currentSchools;
-    const indicators = window.currentIndicators;
-    if (schools && indicators) {
-        document.getElementById('tableView').innerHTML = generateTableView(schools, indicators, selectedGroup);
-        // Reapply color filters after table regeneration
-        updateColorFilter();
-    }
-}
-
-
-    function generateTableView(schools, indicators, selectedGroup) {
-    window.currentSchools = schools; // Cache for updates
-    window.currentIndicators = indicators;
-
-    let tableHtml = '<table><thead><tr><th>School</th>';
-    indicators.forEach(indicator => tableHtml += `<th>${formatIndicatorLabel(indicator)}</th>`);
-    tableHtml += '</tr></thead><tbody>';
-
-    schools.slice(0, 50).forEach(school => {
-        tableHtml += `<tr><td class="school-name-cell">${school.school_name}</td>`;
-        indicators.forEach(indicator => {
-            let data = (selectedGroup === 'ALL')
-                ? (school.dashboard_indicators || {})[indicator]
-                : ((school.student_groups || {})[selectedGroup] || {})[indicator];
-
-            const status = data?.status || 'No Data';
-            const value = data?.rate ?? data?.points_below_standard ?? 0;
-            const change = data?.change || 0;
-            
-            const displayStatus = status.replace(/\\s/g, '-');
-            const tooltip = data ? formatTooltip(indicator, status, value, change) : 'No data available';
-            
-            // Generate trend arrow and change text
-            const trendInfo = formatTrendInfo(indicator, change);
-            
-            // Generate performance value display (like "3 points above standard")
-            const performanceValue = formatPerformanceValue(indicator, value);
-            
-            tableHtml += `<td>
-                <div class="performance-cell">
-                    <div class="color-cell ${displayStatus}" title="${tooltip}">${status}</div>
-                    <div class="performance-value">${performanceValue}</div>
-                    <div class="trend-info">${trendInfo}</div>
-                </div>
-            </td>`;
-        });
-        tableHtml += '</tr>';
-    });
-
-    tableHtml += '</tbody></table>';
-    if (schools.length > 50) {
-        tableHtml += `<p class="results-footer">Showing first 50 of ${schools.length} total results.</p>`;
-    }
-    return tableHtml;
-}
-
-function formatPerformanceValue(indicator, value) {
-    if (!value && value !== 0) {
-        return '<span class="performance-na">--</span>';
-    }
-    
-    if (indicator.includes('performance')) {
-        // For ELA/Math: Show distance from standard
-        const absValue = Math.abs(value);
-        const direction = value >= 0 ? 'above' : 'below';
-        const colorClass = value >= 0 ? 'performance-above' : 'performance-below';
-        
-        return `<span class="${colorClass}">${absValue.toFixed(1)} pts ${direction}</span>`;
-    } else {
-        // For percentage indicators: Show the rate
-        return `<span class="performance-rate">${value.toFixed(1)}%</span>`;
-    }
-}
-
-function formatTrendInfo(indicator, change) {
-    if (!change || change === 0) {
-        return '<span class="trend-stable">➡️ --</span>';
-    }
-    
-    const absChange = Math.abs(change);
-    let arrow, changeText, cssClass;
-    
-    // Arrow direction is always based on actual change direction
-    if (change > 0) {
-        arrow = '↗️';
-        changeText = `+${absChange.toFixed(1)}`;
-    } else {
-        arrow = '↘️';
-        changeText = `-${absChange.toFixed(1)}`;
-    }
-    
-    // Add units based on indicator type
-    if (indicator.includes('performance')) {
-        changeText += 'pts';
-    } else {
-        changeText += '%';
-    }
-    
-    // Color is based on whether the change is GOOD or BAD for that indicator
-    if (indicator === 'chronic_absenteeism' || indicator === 'suspension_rate') {
-        // For these indicators: decrease = good, increase = bad
-        cssClass = (change < 0) ? 'trend-good' : 'trend-bad';
-    } else {
-        // For graduation, college_career, english_learner_progress, and performance: increase = good, decrease = bad
-        cssClass = (change > 0) ? 'trend-good' : 'trend-bad';
-    }
-    
-    return `<span class="${cssClass}">${arrow} ${changeText}</span>`;
-}
-
-function formatTooltip(indicator, status, value, change) {
-    let tooltip = '';
-    
-    if (indicator.includes('performance')) {
-        const direction = value >= 0 ? 'above' : 'below';
-        tooltip = `${status}: ${Math.abs(value).toFixed(1)} points ${direction} standard`;
-    } else {
-        tooltip = `${status}: ${value.toFixed(1)}%`;
-    }
-    
-    // Add change information to tooltip
-    if (change && change !== 0) {
-        const changeDirection = change > 0 ? 'increased' : 'decreased';
-        const changeAmount = Math.abs(change).toFixed(1);
-        
-        if (indicator.includes('performance')) {
-            tooltip += ` | Change: ${changeDirection} by ${changeAmount} points`;
-        } else {
-            tooltip += ` | Change: ${changeDirection} by ${changeAmount}%`;
-        }
-    }
-    
-    return tooltip;
-}
-
-// Keep your existing helper functions - they're still needed!
-function formatIndicatorLabel(indicator) {
-    const labels = {
-        'chronic_absenteeism': 'Attendance', 
-        'ela_performance': 'ELA', 
-        'math_performance': 'Math', 
-        'suspension_rate': 'Suspension',
-        'college_career': 'College/Career',
-        'graduation_rate': 'Graduation',
-        'english_learner_progress': 'EL Progress'
-    };
-    return labels[indicator] || indicator.replace(/_/g, ' ').replace(/\\b\\w/g, l => l.toUpperCase());
-}
-
-function getStudentGroupName(short_code) {
-    const map = {
-        'ALL': 'All Students',
-        'AA': 'Black/African American',
-        'AI': 'American Indian',
-        'AS': 'Asian',
-        'FI': 'Filipino',
-        'HI': 'Hispanic/Latino',
-        'PI': 'Pacific Islander',
-        'WH': 'White',
-        'MR': 'Two or More Races',
-        'EL': 'English Learners',
-        'LTEL': 'Long-Term English Learners',
-        'RFEP': 'Reclassified Fluent English Proficient',
-        'SED': 'Socioeconomically Disadvantaged',
-        'SWD': 'Students with Disabilities',
-        'HOM': 'Homeless',
-        'FOS': 'Foster Youth'
-    };
-    return map[short_code] || short_code;
-}
-
-// Initialize dropdowns on page load
-function initializeDefaultDropdowns() {
-    // Load all districts immediately when page loads
-    fetch('/districts')
-        .then(response => response.json())
-        .then(allDistricts => {
-            const districtSelect = document.getElementById('districtSelect');
-            if (districtSelect) {
-                districtSelect.innerHTML = '<option value="">Select a District</option>';
-                allDistricts.sort().forEach(district => {
-                    districtSelect.innerHTML += `<option value="${district}">${district}</option>`;
-                });
-            }
-        })
-        .catch(error => {
-            console.error('Error loading districts on init:', error);
-        });
-}
-
-
-// Dropdown menu functions
-function populateDropdowns(schools, selectedDistrict = null) {
-    // Get ALL districts by making a separate API call
-    fetch('/districts')
-        .then(response => response.json())
-        .then(allDistricts => {
-            const districtSelect = document.getElementById('districtSelect');
-            const schoolSelect = document.getElementById('schoolSelect');
-            
-            if (districtSelect && schoolSelect) {
-                districtSelect.innerHTML = '<option value="">All Districts</option>';
-                
-                // Sort and add all districts
-                allDistricts.sort().forEach(district => {
-                    const selected = (selectedDistrict && district.toLowerCase().includes(selectedDistrict.toLowerCase())) ? 'selected' : '';
-                    districtSelect.innerHTML += `<option value="${district}" ${selected}>${district}</option>`;
-                });
-                
-                // If a district is selected (from chat), fetch ALL schools for that district
-                if (selectedDistrict) {
-                    fetch('/district-schools', {
-                        method: 'POST',
-                        headers: {'Content-Type': 'application/json'},
-                        body: JSON.stringify({district_name: selectedDistrict})
-                    })
-                    .then(response => response.json())
-                    .then(data => {
-                        if (data.schools) {
-                            // Build school dropdown with ALL schools from the district
-                            const schoolsByDistrict = {};
-                            data.schools.forEach(school => {
-                                const district = school.district_name || 'Unknown District';
-                                const schoolName = school.school_name || district;
-                                
-                                if (!schoolsByDistrict[district]) {
-                                    schoolsByDistrict[district] = new Set();
-                                }
-                                schoolsByDistrict[district].add(schoolName);
-                            });
-                            
-                            updateSchoolDropdown(schoolsByDistrict, selectedDistrict);
-                        }
-                    })
-                    .catch(error => {
-                        console.error('Error loading all schools for district:', error);
-                    });
-                } else {
-                    // No district selected, clear schools dropdown
-                    schoolSelect.innerHTML = '<option value="">All Schools</option>';
-                }
-            }
-        })
-        .catch(error => {
-            console.error('Error loading districts:', error);
-            // Fallback to using districts from current results only if API fails
-            const districts = new Set();
-            schools.forEach(school => {
-                const district = school.district_name || 'Unknown District';
-                districts.add(district);
-            });
-            
-            const districtSelect = document.getElementById('districtSelect');
-            if (districtSelect) {
-                districtSelect.innerHTML = '<option value="">All Districts</option>';
-                Array.from(districts).sort().forEach(district => {
-                    const selected = (selectedDistrict && district.toLowerCase().includes(selectedDistrict.toLowerCase())) ? 'selected' : '';
-                    districtSelect.innerHTML += `<option value="${district}" ${selected}>${district}</option>`;
-                });
-            }
-        });
-}
-    
-function updateSchoolDropdown(schoolsByDistrict, selectedDistrict) {
-    const schoolSelect = document.getElementById('schoolSelect');
-    if (!schoolSelect) return;
-    
-    schoolSelect.innerHTML = '<option value="">All Schools</option>';
-    
-    if (selectedDistrict && schoolsByDistrict[selectedDistrict]) {
-        Array.from(schoolsByDistrict[selectedDistrict]).sort().forEach(school => {
-            schoolSelect.innerHTML += `<option value="${school}">${school}</option>`;
-        });
-    } else {
-        // Show all schools if no district selected
-        const allSchools = new Set();
-        Object.values(schoolsByDistrict).forEach(schoolSet => {
-            schoolSet.forEach(school => allSchools.add(school));
-        });
-        Array.from(allSchools).sort().forEach(school => {
-            schoolSelect.innerHTML += `<option value="${school}">${school}</option>`;
-        });
-    }
-}
-
-function filterByDropdowns() {
-    const selectedDistrict = document.getElementById('districtSelect').value;
-    const selectedSchool = document.getElementById('schoolSelect').value;
-    const tableRows = document.querySelectorAll('.performance-table tbody tr');
-    
-    tableRows.forEach(row => {
-        let shouldShow = true;
-        const schoolNameCell = row.querySelector('.school-name-cell');
-        
-        if (schoolNameCell) {
-            const schoolText = schoolNameCell.textContent.trim();
-            
-            // Get the school data to check district
-            const schools = window.currentSchools || [];
-            const matchingSchool = schools.find(s => 
-                (s.school_name || s.district_name) === schoolText
-            );
-            
-            if (selectedDistrict && matchingSchool) {
-                if (!matchingSchool.district_name || !matchingSchool.district_name.includes(selectedDistrict)) {
-                    shouldShow = false;
-                }
-            }
-            
-            if (selectedSchool && schoolText !== selectedSchool) {
-                shouldShow = false;
-            }
-        }
-        
-        row.style.display = shouldShow ? '' : 'none';
-    });
-    
-    updateVisibleRowCount();
-}
-
-function handleDistrictChange() {
-    const selectedDistrict = document.getElementById('districtSelect').value;
-    
-    if (!selectedDistrict) {
-        // If no district selected, hide dynamic content and show empty state
-        document.getElementById('emptyResults').style.display = 'block';
-        document.getElementById('dynamicContent').style.display = 'none';
-        
-        // Reset school dropdown
-        const schoolSelect = document.getElementById('schoolSelect');
-        if (schoolSelect) {
-            schoolSelect.innerHTML = '<option value="">All Schools</option>';
-        }
-        
-        // Reset count
-        currentSchoolCount = 0;
-        updateTabBadges();
-        return;
-    }
-    
-    // Fetch fresh data for the selected district
-    fetch('/district-schools', {
-        method: 'POST',
-        headers: {'Content-Type': 'application/json'},
-        body: JSON.stringify({district_name: selectedDistrict})
-    })
-    .then(response => response.json())
-    .then(data => {
-        if (data.schools && data.schools.length > 0) {
-            // Store the schools data
-            window.currentSchools = data.schools;
-            
-            // Build school dropdown
-            const schoolsByDistrict = {};
-            data.schools.forEach(school => {
-                const district = school.district_name || 'Unknown District';
-                const schoolName = school.school_name || district;
-                
-                if (!schoolsByDistrict[district]) {
-                    schoolsByDistrict[district] = new Set();
-                }
-                schoolsByDistrict[district].add(schoolName);
-            });
-            
-            // Update school dropdown
-            updateSchoolDropdown(schoolsByDistrict, selectedDistrict);
-            
-            // Show the dynamic content area
-            showDynamicResults(data.schools);
-            
-            // Hide empty state
-            document.getElementById('emptyResults').style.display = 'none';
-            
-            // Update count
-            currentSchoolCount = data.schools.length;
-            updateTabBadges();
-        }
-    })
-    .catch(error => {
-        console.error('Error fetching district schools:', error);
-    });
-}
-
-function showDynamicResults(schools) {
-    const allIndicators = new Set();
-    const allStudentGroups = new Set(['ALL']);
-    schools.forEach(school => {
-        Object.keys(school.dashboard_indicators || {}).forEach(ind => allIndicators.add(ind));
-        Object.keys(school.student_groups || {}).forEach(grp => allStudentGroups.add(grp));
-        Object.values(school.student_groups || {}).forEach(groupData => {
-            Object.keys(groupData || {}).forEach(ind => allIndicators.add(ind));
-        });
-    });
-    
-    const indicators = Array.from(allIndicators);
-    const studentGroups = Array.from(allStudentGroups);
-    
-    let html = '<div class="filter-system">';
-    
-    // Student Groups Filter (Collapsible)
-    if (studentGroups.length > 1) {
-        html += `
-        <div class="filter-section">
-            <div class="filter-header" onclick="toggleFilterSection('studentGroups')">
-                <span class="filter-title">👥 Student Groups</span>
-                <span class="filter-arrow" id="studentGroupsArrow">▼</span>
-            </div>
-            <div class="filter-content collapsed" id="studentGroupsContent">
-                <div class="student-group-grid">`;
-        
-        studentGroups.forEach(group => {
-            const checked = group === 'ALL' ? 'checked' : '';
-            html += `<label><input type="radio" name="studentGroup" value="${group}" ${checked}> ${getStudentGroupName(group)}</label>`;
-        });
-        
-        html += `    </div>
-            </div>
-        </div>`;
-    }
-    
-    // Performance Colors Filter (Collapsible)
-    html += `
-    <div class="filter-section">
-        <div class="filter-header" onclick="toggleFilterSection('performanceColors')">
-            <span class="filter-title">🎨 Performance Colors</span>
-            <span class="filter-arrow" id="performanceColorsArrow">▼</span>
-        </div>
-        <div class="filter-content collapsed" id="performanceColorsContent">
-            <div class="color-filter-grid">
-                <label class="color-filter-item">
-                    <input type="checkbox" name="colorFilter" value="Blue" onchange="updateColorFilter()">
-                    <span class="color-sample blue-sample"> Blue</span>
-                    <span class="color-description">Highest Performance</span>
-                </label>
-                <label class="color-filter-item">
-                    <input type="checkbox" name="colorFilter" value="Green" onchange="updateColorFilter()">
-                    <span class="color-sample green-sample"> Green</span>
-                    <span class="color-description">Above Average</span>
-                </label>
-                <label class="color-filter-item">
-                    <input type="checkbox" name="colorFilter" value="Yellow" onchange="updateColorFilter()">
-                    <span class="color-sample yellow-sample"> Yellow</span>
-                    <span class="color-description">Average Performance</span>
-                </label>
-                <label class="color-filter-item">
-                    <input type="checkbox" name="colorFilter" value="Orange" onchange="updateColorFilter()">
-                    <span class="color-sample orange-sample"> Orange</span>
-                    <span class="color-description">Below Average</span>
-                </label>
-                <label class="color-filter-item">
-                    <input type="checkbox" name="colorFilter" value="Red" onchange="updateColorFilter()">
-                    <span class="color-sample red-sample"> Red</span>
-                    <span class="color-description">Lowest Performance</span>
-                </label>
-            </div>
-            <div class="color-filter-actions">
-                <button onclick="selectAllColors()" class="filter-action-btn">Select All</button>
-                <button onclick="clearAllColors()" class="filter-action-btn">Clear All</button>
-                <button onclick="selectProblemsOnly()" class="filter-action-btn problems-btn">Problems Only (Red + Orange)</button>
-            </div>
-        </div>
-    </div>`;
-    
-    html += '</div>'; // End filter-system
-    
-    html += `<div id="tableView" class="performance-table">${generateTableView(schools, indicators, 'ALL')}</div>`;
-    
-    document.getElementById('dynamicContent').innerHTML = html;
-    document.getElementById('dynamicContent').style.display = 'block';
-    
-    // Store indicators for updates
-    window.currentIndicators = indicators;
-}
-
-// Pop-up Chat Functionality
-function openPopupChat() {
-    const overlay = document.getElementById('popupChatOverlay');
-    const popupContent = document.getElementById('popupChatContent');
-    const mainChatContainer = document.getElementById('chatContainer');
-    
-    // Sync chat content from main chat to popup
-    popupContent.innerHTML = mainChatContainer.innerHTML;
-    
-    // Show the popup
-    overlay.style.display = 'block';
-    
-    // Scroll to bottom
-    popupContent.scrollTop = popupContent.scrollHeight;
-}
-
-function closePopupChat() {
-    const overlay = document.getElementById('popupChatOverlay');
-    overlay.style.display = 'none';
-}
-
-function syncChatContent() {
-    // Sync content from main chat to popup if popup is open
-    const overlay = document.getElementById('popupChatOverlay');
-    if (overlay.style.display === 'block') {
-        const popupContent = document.getElementById('popupChatContent');
-        const mainChatContainer = document.getElementById('chatContainer');
-        
-        popupContent.innerHTML = mainChatContainer.innerHTML;
-        popupContent.scrollTop = popupContent.scrollHeight;
-    }
-}
-
-function sendPopupQuery() {
-    const popupInput = document.getElementById('popupQueryInput');
-    const query = popupInput.value.trim();
-    if (!query) return;
-    
-    // Set the main input and send query
-    document.getElementById('queryInput').value = query;
-    popupInput.value = '';
-    sendQuery();
-}
-    </script>
-    
-    <!-- Pop-up Chat Overlay -->
-    <div class="popup-chat-overlay" id="popupChatOverlay">
-        <div class="popup-chat-window" onclick="event.stopPropagation()">
-            <div class="popup-chat-header">
-    <div class="popup-chat-title">
-        💬 Chat
-    </div>
-    <button class="popup-close-btn" id="popupCloseBtn">×</button>
-</div>
-            <div class="popup-chat-content" id="popupChatContent">
-                <!-- Chat messages will be synced here -->
-            </div>
-            <div class="popup-chat-input">
-                <div class="popup-input-container">
-                    <input id="popupQueryInput" type="text" placeholder="Ask a question...">
-                    <button id="popupSendBtn">Ask</button>
-                </div>
-            </div>
-        </div>
-    </div>
-</body>
-</html>
-'''
-
-@app.route('/')
-def index():
-    return render_template_string(HTML_TEMPLATE)
-
-@app.route('/query', methods=['POST'])
-@limiter.limit("10 per minute")  # Max 10 queries per minute per IP
-
-def handle_query():
-    user_query = request.json.get('query')
-    if not user_query:
-        return jsonify({"error": "No query provided"}), 400
-
-    # Use the appropriate parsing function
-    parsed_query = parse_query_with_real_ai(user_query)
-    
-    # Store the searched district for frontend dropdown selection
-    searched_district = parsed_query.get("district_name") if parsed_query else None
-    
-    # If AI determined data is unavailable, return early
-    if parsed_query and parsed_query.get("data_availability") == "not_available":
-        response_text = generate_intelligent_response(user_query, [], parsed_query)
-        return jsonify({"response": response_text, "schools": []})
-
-    # Build and execute MongoDB query
-    mongo_query = build_mongodb_query(parsed_query)
+    # Build and execute MongoDB query (first page only - the rest come from /query/page)
     try:
-        results = list(schools_collection.find(mongo_query).limit(50))
-        # Convert ObjectId to string for JSON serialization
-        for item in results:
-            item['_id'] = str(item['_id'])
+        results, next_after, total, total_capped = search or run_school_search(parsed_query, page_size)
     except Exception as e:
         print(f"MongoDB query failed: {e}")
         return jsonify({"error": "Database query failed"}), 500
@@ -2591,43 +1491,209 @@ def handle_query():
     # Generate the final response
     response_text = generate_intelligent_response(user_query, results, parsed_query)
     
-    return jsonify({"response": response_text, "schools": results, "searched_district": searched_district})
+    next_cursor = None
+    if next_after:
+        next_cursor = encode_cursor({"query": sanitize_parsed_query(parsed_query), "size": page_size, **next_after})
+    
+    return schools_response({
+        "response": response_text,
+        "schools": results,
+        "searched_district": searched_district,
+        "next_cursor": next_cursor,
+        "total": total,
+        "total_capped": total_capped
+    })
+
+def ndjson_line(event: Dict) -> str:
+    return json.dumps(event, default=str, separators=(',', ':')) + "\n"
+
+@app.route('/query/stream', methods=['POST'])
+@limiter.limit("10 per minute")
+def handle_query_stream():
+    """/query as newline-delimited JSON events, so the table can render before the AI analysis
+    
+    Events, in order: {"type": "parsed"}, {"type": "schools"}, then one or more
+    {"type": "analysis", "text": ...} pieces and finally {"type": "done"}
+    (or {"type": "error"} in place of the remaining events).
+    """
+    user_query = request.json.get('query')
+    if not user_query:
+        return jsonify({"error": "No query provided"}), 400
+    page_size = get_page_size(request.json.get('page_size'))
+    
+    def generate():
+        parsed_query, search = parse_query_with_speculative_search(user_query, page_size)
+        searched_district = parsed_query.get("district_name") if parsed_query else None
+        yield ndjson_line({"type": "parsed", "parsed_query": sanitize_parsed_query(parsed_query),
+                           "searched_district": searched_district})
+        
+        precomputed = find_precomputed_answer(parsed_query)
+        if precomputed:
+            yield ndjson_line(encode_schools_payload(dict(precomputed, type="schools", searched_district=searched_district)))
+            yield ndjson_line({"type": "analysis", "text": generate_precomputed_response(user_query, precomputed, parsed_query)})
+            yield ndjson_line({"type": "done"})
+            return
+        
+        # If AI determined data is unavailable there is nothing to search
+        results, next_after, total, total_capped = [], None, 0, False
+        if parsed_query.get("data_availability") != "not_available":
+            try:
+                results, next_after, total, total_capped = search or run_school_search(parsed_query, page_size)
+            except Exception as e:
+                print(f"MongoDB query failed: {e}")
+                yield ndjson_line({"type": "error", "error": "Database query failed"})
+                return
+        print(f"DEBUG - Streamed query returned {len(results)} schools")
+        
+        next_cursor = None
+        if next_after:
+            next_cursor = encode_cursor({"query": sanitize_parsed_query(parsed_query), "size": page_size, **next_after})
+        yield ndjson_line(encode_schools_payload({
+            "type": "schools",
+            "schools": results,
+            "searched_district": searched_district,
+            "next_cursor": next_cursor,
+            "total": total,
+            "total_capped": total_capped
+        }))
+        
+        for text in stream_intelligent_response(user_query, results, parsed_query):
+            yield ndjson_line({"type": "analysis", "text": text})
+        yield ndjson_line({"type": "done"})
+    
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.cache_control.no_cache = True
+    # Ask reverse proxies not to buffer the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/query/page', methods=['POST'])
+@limiter.limit("60 per minute")
+def handle_query_page():
+    """Next page of a /query result - no parsing or AI analysis, just the database"""
+    try:
+        state = decode_cursor(request.json.get('cursor') or '')
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
+    
+    parsed_query = sanitize_parsed_query(state.get("query") or {})
+    page_size = get_page_size(state.get("size"))
+    try:
+        results, next_after = school_data.search(parsed_query, page_size, after=state,
+                                                 projection=build_projection(parsed_query), sort=build_sort(parsed_query))
+    except Exception as e:
+        print(f"MongoDB query failed: {e}")
+        return jsonify({"error": "Database query failed"}), 500
+    
+    next_cursor = encode_cursor(dict(state, **next_after)) if next_after else None
+    return schools_response({"schools": results, "next_cursor": next_cursor})
+
+def catalog_response(payload, catalog, name):
+    """JSON response with an ETag tied to the data version, answering 304 when unchanged"""
+    response = jsonify(payload)
+    name_hash = hashlib.sha1(name.encode('utf-8')).hexdigest()[:12]
+    response.set_etag(f"{catalog['version']}-{name_hash}")
+    response.cache_control.public = True
+    response.cache_control.max_age = CATALOG_MAX_AGE
+    return response.make_conditional(request)
 
 @app.route('/districts', methods=['GET'])
 def get_all_districts():
-    """Get all unique district names from the database"""
+    """Get all unique district names from the in-memory catalog"""
     try:
-        # Get all unique district names
-        districts = schools_collection.distinct("district_name")
-        # Filter out null/empty values and sort
-        districts = [d for d in districts if d and d.strip()]
-        districts.sort()
-        return jsonify(districts)
+        catalog = get_catalog(school_data)
+        return catalog_response(catalog['districts'], catalog, 'districts')
     except Exception as e:
         print(f"Error getting districts: {e}")
         return jsonify([]), 500
 
+@app.route('/school-list', methods=['GET'])
+def get_school_list():
+    """Get the school names (CDS, name, county) for a district from the in-memory catalog"""
+    district_name = request.args.get('district', '')
+    if not district_name:
+        return jsonify({"error": "No district name provided"}), 400
+    try:
+        catalog = get_catalog(school_data)
+        schools = find_district_schools(catalog, district_name)
+        return catalog_response({"schools": schools}, catalog, f"schools-{district_name}")
+    except Exception as e:
+        print(f"Error getting school list: {e}")
+        return jsonify({"error": "Failed to fetch school list"}), 500
+
+@app.route('/cache-stats', methods=['GET'])
+def get_cache_stats():
+    """Hit/miss counters for the in-process caches"""
+    return jsonify({
+        "parsed_queries": parsed_query_cache.stats(),
+        "analyses": analysis_cache.stats(),
+        "ai": ai_status()
+    })
+
+@app.route('/school-details', methods=['POST'])
+def get_school_details():
+    """Student group data for schools whose results were projected without it"""
+    cds_codes = request.json.get('cds_codes') or []
+    groups = [g for g in (request.json.get('student_groups') or []) if g in VALID_STUDENT_GROUPS]
+    if not isinstance(cds_codes, list) or not cds_codes or not groups:
+        return jsonify({"error": "cds_codes and student_groups are required"}), 400
+    if len(cds_codes) > MAX_PAGE_SIZE:
+        return jsonify({"error": f"At most {MAX_PAGE_SIZE} schools per request"}), 400
+    
+    projection = {"cds_code": 1, "_id": 0}
+    for group in groups:
+        projection[f"student_groups.{group}"] = 1
+    try:
+        docs = school_data.find_by_cds([str(c) for c in cds_codes], projection)
+        details = {doc["cds_code"]: doc.get("student_groups", {}) for doc in docs}
+    except Exception as e:
+        print(f"Error getting school details: {e}")
+        return jsonify({"error": "Failed to fetch school details"}), 500
+    return jsonify({"schools": details})
+
 @app.route('/district-schools', methods=['POST'])
 def get_district_schools():
-    """Get all schools for a specific district"""
+    """Get the schools for a specific district, one page at a time"""
     try:
-        district_name = request.json.get('district_name')
+        cursor = request.json.get('cursor')
+        if cursor:
+            state = decode_cursor(cursor)
+            district_name = state.get('district')
+        else:
+            district_name = request.json.get('district_name')
         if not district_name:
             return jsonify({"error": "No district name provided"}), 400
+        if not isinstance(district_name, str):
+            return jsonify({"error": "district_name must be a string"}), 400
+        page_size = get_page_size(request.json.get('page_size'), default=100)
         
         # Query for schools in the specified district
-        query = {"district_name": {"$regex": district_name, "$options": "i"}}
-        results = list(schools_collection.find(query).limit(100))
-        
-        # Convert ObjectId to string for JSON serialization
-        for item in results:
-            item['_id'] = str(item['_id'])
+        if not build_name_filter("district", district_name):
+            return jsonify({"schools": []})
+        query = {"district_name": district_name}
+        results, next_after = school_data.search(query, page_size, after=state if cursor else None,
+                                                 projection=build_projection({}))
         
-        return jsonify({"schools": results})
+        response = {"schools": results, "next_cursor": None}
+        if next_after:
+            response["next_cursor"] = encode_cursor({"district": district_name, **next_after})
+        if not cursor:
+            response["total"], response["total_capped"] = count_matches(query)
+        return schools_response(response)
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
     except Exception as e:
         print(f"Error getting district schools: {e}")
         return jsonify({"error": "Failed to fetch district schools"}), 500
         
+def print_startup_report():
+    """Log how long module-level startup took, step by step"""
+    total = (time.perf_counter() - STARTUP_STARTED) * 1000
+    steps = ", ".join(f"{name} {ms:.0f} ms" for name, ms in startup_timings.items())
+    print(f"🚀 Ready in {total:.0f} ms ({steps})")
+
+print_startup_report()
+
 if __name__ == '__main__':
     # Use environment variable for port, default to 8080
     port = int(os.environ.get("PORT", 8080))
@@ -0,0 +1,83 @@
+# build_assets.py
+# Minify the page's CSS/JS and write content-hashed copies to static/dist/ with a
+# manifest.json mapping each source name to its fingerprinted file.
+# Run at image build time (see Dockerfile); app.py rebuilds on startup if the
+# manifest is missing or older than the sources.
+import hashlib
+import json
+import os
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+
+# source file in static/ -> minifier name
+ASSETS = {
+    'dashboard.css': 'css',
+    'dashboard.js': 'js'
+}
+
+def minify(source, kind):
+    """Minified source text, or the source unchanged if the minifier is not installed"""
+    if kind == 'css' and rcssmin is not None:
+        return rcssmin.cssmin(source)
+    if kind == 'js' and rjsmin is not None:
+        return rjsmin.jsmin(source)
+    return source
+
+def build_assets():
+    """Write fingerprinted, minified assets and return the manifest {source: dist file}"""
+    os.makedirs(DIST_DIR, exist_ok=True)
+    manifest = {}
+    for name, kind in ASSETS.items():
+        with open(os.path.join(STATIC_DIR, name), 'r', encoding='utf-8') as file:
+            data = minify(file.read(), kind).encode('utf-8')
+
+        stem, ext = os.path.splitext(name)
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        dist_name = f"{stem}.{digest}.min{ext}"
+        with open(os.path.join(DIST_DIR, dist_name), 'wb') as file:
+            file.write(data)
+        manifest[name] = dist_name
+
+    # Remove fingerprints from earlier builds
+    current = set(manifest.values())
+    for name in os.listdir(DIST_DIR):
+        if name != 'manifest.json' and name not in current:
+            os.remove(os.path.join(DIST_DIR, name))
+
+    with open(MANIFEST_PATH, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=2)
+    return manifest
+
+def load_or_build_manifest():
+    """Manifest from the last build, rebuilding if it is missing or a source changed since"""
+    try:
+        built_at = os.path.getmtime(MANIFEST_PATH)
+        if all(os.path.getmtime(os.path.join(STATIC_DIR, name)) <= built_at for name in ASSETS):
+            with open(MANIFEST_PATH, 'r', encoding='utf-8') as file:
+                manifest = json.load(file)
+            if all(os.path.exists(os.path.join(DIST_DIR, manifest.get(name, ''))) for name in ASSETS):
+                return manifest
+    except (OSError, ValueError):
+        pass
+    return build_assets()
+
+if __name__ == "__main__":
+    if rjsmin is None or rcssmin is None:
+        print("⚠️  rjsmin/rcssmin not installed - assets will be fingerprinted but not minified")
+    manifest = build_assets()
+    for name, dist_name in manifest.items():
+        size = os.path.getsize(os.path.join(DIST_DIR, dist_name))
+        original = os.path.getsize(os.path.join(STATIC_DIR, name))
+        print(f"📦 {name} -> dist/{dist_name} ({original:,} -> {size:,} bytes)")
@@ -0,0 +1,55 @@
+# compression.py
+# gzip/brotli response compression helpers for app.py
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Responses smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+COMPRESSIBLE_MIMETYPES = {'text/html', 'text/css', 'application/javascript', 'application/json', 'application/x-msgpack'}
+
+def supported_encodings():
+    """Encodings this process can produce, best first"""
+    return (['br'] if brotli is not None else []) + ['gzip']
+
+def choose_encoding(accept_encoding):
+    """Best encoding the client accepts (honouring q=0), or None for identity"""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        pieces = part.strip().split(';')
+        name = pieces[0].strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in pieces[1:]:
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = quality
+
+    for encoding in supported_encodings():
+        if accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return None
+
+def compress(data, encoding, fast=True):
+    """Compress bytes; fast=False uses the maximum level for pre-compressed assets"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=5 if fast else 11)
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=6 if fast else 9)
+    return data
+
+def precompress(data):
+    """{encoding: bytes} for every supported encoding, plus None for the raw data"""
+    variants = {None: data}
+    for encoding in supported_encodings():
+        variants[encoding] = compress(data, encoding, fast=False)
+    return variants
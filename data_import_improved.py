@@ -1,16 +1,32 @@
+import argparse
 import csv
+import hashlib
+import heapq
+import json
 import pymongo
 import os
-from pymongo import MongoClient
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pymongo import MongoClient, ReplaceOne, DeleteMany
 from dotenv import load_dotenv
+from school_indexes import ensure_indexes, print_index_report
+from search_keys import build_search_keys
+from data_version import record_data_version
+from rollups import rebuild_rollups
+from equity_gaps import rebuild_gap_index
+from school_store import write_school_store
+from warm_start import write_warm_start
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
 
 # Load environment variables
 load_dotenv()
 
-# Your MongoDB connection - SECURE VERSION
+# Your MongoDB connection - SECURE VERSION (checked in __main__, as --store-only needs no database)
 MONGODB_URI = os.getenv("MONGODB_URI")
-if not MONGODB_URI:
-    raise ValueError("MONGODB_URI environment variable is not set. Create a .env file with MONGODB_URI=your_connection_string")
 
 def get_color_status(color_code):
     """Convert color code to status"""
@@ -58,24 +74,131 @@ def load_csv_file(filename):
         print(f"❌ Error loading {filename}: {e}")
         return []
 
+def iter_csv_file(filename):
+    """Yield CSV rows one at a time instead of loading the whole file"""
+    count = 0
+    try:
+        with open(filename, 'r', encoding='utf-8') as file:
+            for row in csv.DictReader(file):
+                count += 1
+                yield row
+        print(f"✅ Streamed {filename}: {count} rows")
+    except Exception as e:
+        print(f"❌ Error loading {filename}: {e}")
+
+# All 7 CA Dashboard CSV files, keyed by the indicator they feed
+CSV_FILES = {
+    'chronic_absenteeism': 'chronicdownload2024 - Sheet1.csv',
+    'ela_performance': 'eladownload2024 - Sheet1.csv', 
+    'math_performance': 'mathdownload2024 - Sheet1.csv',
+    'suspension_rate': 'suspdownload2024 - Sheet1.csv',
+    'college_career': 'ccidownload2024 - Sheet1.csv',
+    'graduation_rate': 'graddownload2024 - Sheet1.csv',
+    'english_learner_progress': 'elpidownload2024 - Sheet1.csv'  # English Learner Progress Indicator
+}
+
+INDICATORS = list(CSV_FILES.keys())
+
+# Documents per insert_many call when streaming
+DEFAULT_BATCH_SIZE = 500
+
+# Blue/green reloads build here and are renamed over the live collection
+STAGING_COLLECTION = 'schools_staging'
+
+# Largest fall in any per-indicator count (vs the live collection) a swap accepts
+MAX_COUNT_DROP = 0.10
+
+def is_state_row(cds):
+    """State-level rows are skipped - only districts and schools are imported"""
+    return cds == '00000000000000' or cds == '0'
+
+def get_row_student_group(row, indicator_name):
+    """Work out the student group short code for a CSV row"""
+    # Handle different column names for student groups
+    student_group = row.get('stugroupshort', 'ALL')
+    if not student_group or student_group == 'ALL':
+        # ELPI file uses 'studentgroup' instead of 'stugroupshort'
+        if indicator_name == 'english_learner_progress':
+            # For ELPI, all data is for English Learners
+            student_group = 'EL'
+        else:
+            student_group = 'ALL'
+    return student_group
+
+def build_indicator_data(row, indicator_name, student_group):
+    """Build the per-indicator dict stored under a student group"""
+    # Add indicator data with proper field mapping
+    indicator_data = {
+        'status': get_color_status(row.get('color', '')),
+        'color_code': row.get('color', ''),
+        'student_group_name': get_student_group_name(student_group),
+        'change': float(row.get('change', 0) or 0)
+    }
+    
+    # Add indicator-specific value field based on actual data structure
+    if indicator_name in ['chronic_absenteeism', 'suspension_rate', 'graduation_rate', 'english_learner_progress']:
+        # These are percentage rates
+        indicator_data['rate'] = float(row.get('currstatus', 0) or 0)
+    elif indicator_name in ['ela_performance', 'math_performance']:
+        # These are Distance from Standard (DFS) scores
+        indicator_data['points_below_standard'] = float(row.get('currstatus', 0) or 0)
+    elif indicator_name == 'college_career':
+        # College/Career Indicator (CCI) - percentage prepared
+        indicator_data['rate'] = float(row.get('currstatus', 0) or 0)
+    else:
+        # Default to rate for unknown indicators
+        indicator_data['rate'] = float(row.get('currstatus', 0) or 0)
+    
+    return indicator_data
+
+def new_school_record(row, cds):
+    """Start the in-progress record for a school the first time its CDS is seen"""
+    return {
+        'cds_code': cds,
+        'county_name': row.get('countyname', ''),
+        'district_name': row.get('districtname', ''),
+        'school_name': row.get('schoolname', ''),
+        'year': '2024',
+        'student_groups': {}
+    }
+
+def add_row_to_school(school_data, indicator_name, row):
+    """Fold one CSV row into a school record"""
+    student_group = get_row_student_group(row, indicator_name)
+    
+    # Initialize student group if not exists
+    if student_group not in school_data['student_groups']:
+        school_data['student_groups'][student_group] = {}
+    
+    school_data['student_groups'][student_group][indicator_name] = build_indicator_data(row, indicator_name, student_group)
+
+def school_to_document(school_data):
+    """Convert a school record to its MongoDB document"""
+    # Create overall indicators from "ALL" student group if available
+    all_students = school_data['student_groups'].get('ALL', {})
+    
+    doc = {
+        'cds_code': school_data['cds_code'],
+        'county_name': school_data['county_name'],
+        'district_name': school_data['district_name'],
+        'school_name': school_data['school_name'],
+        'year': school_data['year'],
+        'dashboard_indicators': all_students,  # Overall school performance
+        'student_groups': school_data['student_groups'],  # All student group breakdowns
+        'student_group_codes': list(school_data['student_groups'].keys())  # Lets queries skip student_groups
+    }
+    
+    # Normalized name tokens for index-backed district/school search
+    doc.update(build_search_keys(doc))
+    return doc
+
 def create_school_documents_complete():
     """Create school documents with ALL 6 CA Dashboard indicators"""
     print("📁 Loading ALL CA Dashboard CSV files...")
     
-    # Load all 6 CSV files for complete CA Dashboard coverage
-    csv_files = {
-        'chronic_absenteeism': 'chronicdownload2024 - Sheet1.csv',
-        'ela_performance': 'eladownload2024 - Sheet1.csv', 
-        'math_performance': 'mathdownload2024 - Sheet1.csv',
-        'suspension_rate': 'suspdownload2024 - Sheet1.csv',
-        'college_career': 'ccidownload2024 - Sheet1.csv',
-        'graduation_rate': 'graddownload2024 - Sheet1.csv',
-        'english_learner_progress': 'elpidownload2024 - Sheet1.csv'  # English Learner Progress Indicator
-    }
-    
     # Load all data
     all_data = {}
-    for indicator, filename in csv_files.items():
+    for indicator, filename in CSV_FILES.items():
         all_data[indicator] = load_csv_file(filename)
         if not all_data[indicator]:
             print(f"⚠️  Warning: No data loaded for {indicator} from {filename}")
@@ -89,79 +212,234 @@ def create_school_documents_complete():
         
         for row in data:
             cds = row.get('cds', '')
-            if cds == '00000000000000' or cds == '0':  # Skip state-level data
+            if is_state_row(cds):  # Skip state-level data
                 continue
-                
-            # Handle different column names for student groups
-            student_group = row.get('stugroupshort', 'ALL')
-            if not student_group or student_group == 'ALL':
-                # ELPI file uses 'studentgroup' instead of 'stugroupshort'
-                if indicator_name == 'english_learner_progress':
-                    # For ELPI, all data is for English Learners
-                    student_group = 'EL'
-                else:
-                    student_group = 'ALL'
             
             # Initialize school if not exists
             if cds not in schools:
-                schools[cds] = {
-                    'cds_code': cds,
-                    'county_name': row.get('countyname', ''),
-                    'district_name': row.get('districtname', ''),
-                    'school_name': row.get('schoolname', ''),
-                    'year': '2024',
-                    'student_groups': {}
-                }
-            
-            # Initialize student group if not exists
-            if student_group not in schools[cds]['student_groups']:
-                schools[cds]['student_groups'][student_group] = {}
-            
-            # Add indicator data with proper field mapping
-            indicator_data = {
-                'status': get_color_status(row.get('color', '')),
-                'color_code': row.get('color', ''),
-                'student_group_name': get_student_group_name(student_group),
-                'change': float(row.get('change', 0) or 0)
-            }
-            
-            # Add indicator-specific value field based on actual data structure
-            if indicator_name in ['chronic_absenteeism', 'suspension_rate', 'graduation_rate', 'english_learner_progress']:
-                # These are percentage rates
-                indicator_data['rate'] = float(row.get('currstatus', 0) or 0)
-            elif indicator_name in ['ela_performance', 'math_performance']:
-                # These are Distance from Standard (DFS) scores
-                indicator_data['points_below_standard'] = float(row.get('currstatus', 0) or 0)
-            elif indicator_name == 'college_career':
-                # College/Career Indicator (CCI) - percentage prepared
-                indicator_data['rate'] = float(row.get('currstatus', 0) or 0)
-            else:
-                # Default to rate for unknown indicators
-                indicator_data['rate'] = float(row.get('currstatus', 0) or 0)
+                schools[cds] = new_school_record(row, cds)
             
-            schools[cds]['student_groups'][student_group][indicator_name] = indicator_data
+            add_row_to_school(schools[cds], indicator_name, row)
     
     # Convert to documents with dashboard_indicators for overall school performance
-    documents = []
-    for cds, school_data in schools.items():
-        # Create overall indicators from "ALL" student group if available
-        all_students = school_data['student_groups'].get('ALL', {})
-        
-        doc = {
-            'cds_code': school_data['cds_code'],
-            'county_name': school_data['county_name'],
-            'district_name': school_data['district_name'],
-            'school_name': school_data['school_name'],
-            'year': school_data['year'],
-            'dashboard_indicators': all_students,  # Overall school performance
-            'student_groups': school_data['student_groups']  # All student group breakdowns
+    documents = [school_to_document(school_data) for school_data in schools.values()]
+    
+    print(f"✅ Created {len(documents)} school documents with complete CA Dashboard data")
+    return documents
+
+def parse_indicator_file(indicator_name, filename):
+    """Parse one indicator CSV into a compact {cds: partial school} map
+    
+    Runs in a worker process, so it only returns what the parent needs to
+    merge: the school's identity fields and its student group entries.
+    """
+    partial = {}
+    for row in iter_csv_file(filename):
+        cds = row.get('cds', '')
+        if is_state_row(cds):  # Skip state-level data
+            continue
+        
+        if cds not in partial:
+            partial[cds] = {
+                'identity': (row.get('countyname', ''), row.get('districtname', ''), row.get('schoolname', '')),
+                'groups': {}
+            }
+        
+        student_group = get_row_student_group(row, indicator_name)
+        partial[cds]['groups'][student_group] = build_indicator_data(row, indicator_name, student_group)
+    return partial
+
+def create_school_documents_parallel(workers):
+    """Create school documents, parsing the indicator files in a process pool"""
+    print(f"📁 Parsing ALL CA Dashboard CSV files with {workers} worker processes...")
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            indicator: executor.submit(parse_indicator_file, indicator, filename)
+            for indicator, filename in CSV_FILES.items()
         }
         
-        documents.append(doc)
+        # Merge in CSV_FILES order so the result matches the sequential import
+        schools = {}
+        for indicator_name, future in futures.items():
+            partial = future.result()
+            if not partial:
+                print(f"⚠️  Warning: No data loaded for {indicator_name} from {CSV_FILES[indicator_name]}")
+            print(f"📊 Merging {indicator_name} data ({len(partial)} schools)...")
+            
+            for cds, entry in partial.items():
+                if cds not in schools:
+                    county_name, district_name, school_name = entry['identity']
+                    schools[cds] = new_school_record({
+                        'countyname': county_name,
+                        'districtname': district_name,
+                        'schoolname': school_name
+                    }, cds)
+                
+                student_groups = schools[cds]['student_groups']
+                for student_group, indicator_data in entry['groups'].items():
+                    if student_group not in student_groups:
+                        student_groups[student_group] = {}
+                    student_groups[student_group][indicator_name] = indicator_data
+    
+    documents = [school_to_document(school_data) for school_data in schools.values()]
     
     print(f"✅ Created {len(documents)} school documents with complete CA Dashboard data")
     return documents
 
+def iter_sorted_rows(indicator_name, filename):
+    """Yield (cds sort key, indicator, row) tuples, checking the file is in CDS order"""
+    last_key = -1
+    for row in iter_csv_file(filename):
+        cds = row.get('cds', '')
+        key = int(cds or 0)
+        if key < last_key:
+            raise ValueError(f"{filename} is not sorted by cds (saw {cds} after {last_key}) - run without --stream")
+        last_key = key
+        yield key, indicator_name, row
+
+def check_csv_order():
+    """Raise ValueError if a CSV file is not sorted by cds, before --stream starts loading"""
+    print("🔎 Checking the CSV files are sorted by cds...")
+    for indicator_name, filename in CSV_FILES.items():
+        for _ in iter_sorted_rows(indicator_name, filename):
+            pass
+
+def iter_school_documents_streaming():
+    """Yield finished school documents while streaming all CSV files at once
+    
+    The CDE files are sorted by CDS code, so merging the seven row streams
+    on that key means every row for a school arrives together. Only the
+    school currently being assembled is held in memory.
+    """
+    print("📁 Streaming ALL CA Dashboard CSV files...")
+    streams = [iter_sorted_rows(indicator, filename) for indicator, filename in CSV_FILES.items()]
+    
+    current_key = None
+    school_data = None
+    count = 0
+    for key, indicator_name, row in heapq.merge(*streams, key=lambda item: item[0]):
+        cds = row.get('cds', '')
+        if is_state_row(cds):  # Skip state-level data
+            continue
+        
+        if key != current_key:
+            if school_data is not None:
+                count += 1
+                yield school_to_document(school_data)
+            current_key = key
+            school_data = new_school_record(row, cds)
+        
+        add_row_to_school(school_data, indicator_name, row)
+    
+    if school_data is not None:
+        count += 1
+        yield school_to_document(school_data)
+    
+    print(f"✅ Streamed {count} school documents with complete CA Dashboard data")
+
+def get_peak_memory_mb():
+    """Peak resident memory of this process in MB (None where unsupported)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+def report_peak_memory():
+    """Print the peak memory figure for the import run"""
+    peak_mb = get_peak_memory_mb()
+    if peak_mb is None:
+        print("📈 Peak memory: not available on this platform")
+    else:
+        print(f"📈 Peak memory: {peak_mb:.1f} MB")
+
+def compute_content_hash(doc):
+    """Stable SHA-256 of a school document's content (ignoring _id and the hash itself)"""
+    content = {k: v for k, v in doc.items() if k not in ('_id', 'content_hash')}
+    encoded = json.dumps(content, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+def stamp_content_hash(doc):
+    """Store the content hash on the document so later delta imports can compare"""
+    doc['content_hash'] = compute_content_hash(doc)
+    return doc
+
+def print_collection_summary(collection):
+    """Print a test document and per-indicator counts for an uploaded collection"""
+    # Test query with student groups
+    test_doc = collection.find_one({"school_name": {"$ne": ""}})
+    if test_doc:
+        print(f"✅ Test document: {test_doc['school_name']} in {test_doc['district_name']}")
+        print(f"   Student groups available: {list(test_doc.get('student_groups', {}).keys())}")
+        
+        # Show available indicators
+        all_students_data = test_doc.get('student_groups', {}).get('ALL', {})
+        if all_students_data:
+            print(f"   Indicators available: {list(all_students_data.keys())}")
+    
+    # Get summary statistics
+    total_schools = collection.count_documents({})
+    districts_count = len(collection.distinct("district_name"))
+    
+    print(f"📊 Database Summary:")
+    print(f"   Total Schools: {total_schools}")
+    print(f"   Total Districts: {districts_count}")
+    
+    # Check each indicator availability
+    indicator_counts = {}
+    for indicator in INDICATORS:
+        count = collection.count_documents({f"dashboard_indicators.{indicator}": {"$exists": True}})
+        indicator_counts[indicator] = count
+        print(f"   Schools with {indicator}: {count}")
+    return indicator_counts
+
+def create_indexes(collection):
+    """Create the indexes the importer and web app rely on and report coverage"""
+    ensure_indexes(collection)
+    print_index_report(collection)
+
+def count_by_indicator(collection):
+    """Total and per-indicator document counts, used to validate a reload"""
+    counts = {'total': collection.count_documents({})}
+    for indicator in INDICATORS:
+        counts[indicator] = collection.count_documents({f"dashboard_indicators.{indicator}": {"$exists": True}})
+    return counts
+
+def add_document_counts(counts, doc):
+    """Add one document to counts ({'total': 0} to start) in the form count_by_indicator returns"""
+    counts['total'] += 1
+    for indicator in doc.get('dashboard_indicators') or {}:
+        if indicator in INDICATORS:
+            counts[indicator] = counts.get(indicator, 0) + 1
+    return counts
+
+def count_documents(documents):
+    """Per-indicator counts of an iterable of documents, in the form count_by_indicator returns"""
+    counts = {'total': 0}
+    for doc in documents:
+        add_document_counts(counts, doc)
+    return counts
+
+def validate_staging_counts(staging_counts, live_counts, max_drop=MAX_COUNT_DROP):
+    """Return a list of problems that should stop the staging collection going live"""
+    problems = []
+    if staging_counts['total'] == 0:
+        problems.append("staging collection is empty")
+    for key, live_count in live_counts.items():
+        staged = staging_counts.get(key, 0)
+        if live_count and staged < live_count * (1 - max_drop):
+            problems.append(f"{key} fell from {live_count} to {staged}")
+    return problems
+
+def finish_upload(db, collection):
+    """Record the new data version and rebuild the collections derived from the schools"""
+    record_data_version(db, collection)
+    rebuild_rollups(db, collection)
+    rebuild_gap_index(db, collection)
+
 def upload_to_mongodb(documents):
     """Upload documents to MongoDB"""
     print("📤 Uploading to MongoDB...")
@@ -176,42 +454,277 @@ def upload_to_mongodb(documents):
         collection.delete_many({})
         
         # Insert new data
+        for doc in documents:
+            stamp_content_hash(doc)
         result = collection.insert_many(documents)
         print(f"✅ Uploaded {len(result.inserted_ids)} documents to MongoDB!")
         
-        # Test query with student groups
-        test_doc = collection.find_one({"school_name": {"$ne": ""}})
-        if test_doc:
-            print(f"✅ Test document: {test_doc['school_name']} in {test_doc['district_name']}")
-            print(f"   Student groups available: {list(test_doc.get('student_groups', {}).keys())}")
+        print("🗂️  Creating indexes...")
+        create_indexes(collection)
+        
+        print_collection_summary(collection)
+        finish_upload(db, collection)
+        
+    except Exception as e:
+        print(f"❌ MongoDB upload failed: {e}")
+
+def insert_in_batches(collection, documents, batch_size=DEFAULT_BATCH_SIZE):
+    """Content-hash and insert an iterable of documents in bounded batches; returns the count"""
+    uploaded = 0
+    batch = []
+    for doc in documents:
+        batch.append(stamp_content_hash(doc))
+        if len(batch) >= batch_size:
+            collection.insert_many(batch)
+            uploaded += len(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch)
+        uploaded += len(batch)
+    return uploaded
+
+def upload_to_mongodb_streaming(documents, batch_size=DEFAULT_BATCH_SIZE):
+    """Upload an iterable of documents to MongoDB in bounded batches
+    
+    The batches go into the staging collection, renamed over the live one
+    only once every document is in and indexed, so a stream that fails part
+    way (e.g. on an unsorted file) leaves the live collection as it was.
+    """
+    print(f"📤 Streaming upload to MongoDB via {STAGING_COLLECTION} (batch size {batch_size})...")
+    
+    try:
+        client = MongoClient(MONGODB_URI)
+        db = client.ca_schools
+        staging = db[STAGING_COLLECTION]
+        
+        # Start from an empty staging collection in case a previous run failed
+        staging.drop()
+        
+        uploaded = insert_in_batches(staging, documents, batch_size)
+        print(f"✅ Uploaded {uploaded} documents into {STAGING_COLLECTION}")
+        
+        print("🗂️  Creating indexes...")
+        create_indexes(staging)
+        
+        print_collection_summary(staging)
+        staging.rename('schools', dropTarget=True)
+        print(f"🔁 Swapped {STAGING_COLLECTION} in as the live schools collection")
+        finish_upload(db, db.schools)
+        return True
+        
+    except Exception as e:
+        print(f"❌ MongoDB upload failed: {e} - live collection left untouched")
+        return False
+
+def upload_to_mongodb_delta(documents, batch_size=DEFAULT_BATCH_SIZE, force=False, expected_counts=None):
+    """Apply only the changes between the generated documents and the collection
+    
+    Each document is content-hashed and compared with the hash stored on the
+    live copy. Changed or new schools are upserted and vanished schools are
+    deleted with unordered bulk_write batches, so the collection is never
+    empty while the import runs.
+    
+    The new documents' per-indicator counts are checked against the live
+    collection as in --swap (a missing CSV would otherwise make every school
+    look vanished): before any write when documents is a list or the
+    stream's counts are passed in as expected_counts (see count_documents),
+    otherwise before the deletes. Returns None if the check fails.
+    """
+    print(f"📤 Delta upload to MongoDB (batch size {batch_size})...")
+    
+    try:
+        client = MongoClient(MONGODB_URI)
+        db = client.ca_schools
+        collection = db.schools
+        
+        # Upserts are keyed on cds_code, so make sure that lookup is indexed
+        create_indexes(collection)
+        
+        live_counts = count_by_indicator(collection)
+        if expected_counts is None and isinstance(documents, list):
+            expected_counts = count_documents(documents)
+        if expected_counts is not None and not delta_counts_ok(expected_counts, live_counts, force):
+            return None
+        
+        existing_hashes = {
+            doc['cds_code']: doc.get('content_hash')
+            for doc in collection.find({}, {'cds_code': 1, 'content_hash': 1, '_id': 0})
+        }
+        print(f"🔎 Found {len(existing_hashes)} existing documents")
+        
+        counts = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0}
+        new_counts = {'total': 0}
+        seen = set()
+        operations = []
+        
+        def flush():
+            if operations:
+                collection.bulk_write(operations, ordered=False)
+                operations.clear()
+        
+        for doc in documents:
+            stamp_content_hash(doc)
+            add_document_counts(new_counts, doc)
+            cds = doc['cds_code']
+            seen.add(cds)
             
-            # Show available indicators
-            all_students_data = test_doc.get('student_groups', {}).get('ALL', {})
-            if all_students_data:
-                print(f"   Indicators available: {list(all_students_data.keys())}")
-        
-        # Get summary statistics
-        total_schools = collection.count_documents({})
-        districts_count = len(collection.distinct("district_name"))
-        
-        print(f"📊 Database Summary:")
-        print(f"   Total Schools: {total_schools}")
-        print(f"   Total Districts: {districts_count}")
-        
-        # Check each indicator availability
-        indicator_counts = {}
-        for indicator in ['chronic_absenteeism', 'ela_performance', 'math_performance', 
-                         'suspension_rate', 'college_career', 'graduation_rate', 'english_learner_progress']:
-            count = collection.count_documents({f"dashboard_indicators.{indicator}": {"$exists": True}})
-            indicator_counts[indicator] = count
-            print(f"   Schools with {indicator}: {count}")
+            if cds not in existing_hashes:
+                counts['inserted'] += 1
+            elif existing_hashes[cds] != doc['content_hash']:
+                counts['updated'] += 1
+            else:
+                counts['unchanged'] += 1
+                continue
+            
+            operations.append(ReplaceOne({'cds_code': cds}, doc, upsert=True))
+            if len(operations) >= batch_size:
+                flush()
+        flush()
+        
+        if not delta_counts_ok(new_counts, live_counts, force):
+            print(f"   {counts['inserted']} inserts and {counts['updated']} updates were already applied")
+            return None
+        
+        # Remove schools that are no longer in the source files
+        vanished = [cds for cds in existing_hashes if cds not in seen]
+        for start in range(0, len(vanished), batch_size):
+            chunk = vanished[start:start + batch_size]
+            operations.append(DeleteMany({'cds_code': {'$in': chunk}}))
+            flush()
+        counts['deleted'] = len(vanished)
+        
+        print(f"✅ Delta applied: {counts['inserted']} inserted, {counts['updated']} updated, "
+              f"{counts['unchanged']} unchanged, {counts['deleted']} deleted")
+        
+        print_collection_summary(collection)
+        finish_upload(db, collection)
+        return counts
         
     except Exception as e:
         print(f"❌ MongoDB upload failed: {e}")
 
+def delta_counts_ok(new_counts, live_counts, force=False):
+    """Whether a delta may go ahead, printing any count check problems"""
+    problems = validate_staging_counts(new_counts, live_counts)
+    for problem in problems:
+        print(f"⚠️  Validation: {problem}")
+    if problems and not force:
+        print("❌ Delta aborted - no schools deleted (use --force to override)")
+        return False
+    return True
+
+def upload_to_mongodb_swap(documents, batch_size=DEFAULT_BATCH_SIZE, force=False):
+    """Build a staging collection, validate it and rename it over the live one
+    
+    The web app keeps reading the old collection until the final
+    rename(dropTarget=True), which MongoDB performs atomically, so queries
+    never see an empty, partially loaded or unindexed collection.
+    """
+    print(f"📤 Blue/green upload to MongoDB via {STAGING_COLLECTION} (batch size {batch_size})...")
+    
+    try:
+        client = MongoClient(MONGODB_URI)
+        db = client.ca_schools
+        staging = db[STAGING_COLLECTION]
+        
+        # Start from an empty staging collection in case a previous run failed
+        staging.drop()
+        
+        uploaded = insert_in_batches(staging, documents, batch_size)
+        print(f"✅ Loaded {uploaded} documents into {STAGING_COLLECTION}")
+        
+        print("🗂️  Creating indexes on staging collection...")
+        create_indexes(staging)
+        
+        print_collection_summary(staging)
+        problems = validate_staging_counts(count_by_indicator(staging), count_by_indicator(db.schools))
+        if problems:
+            for problem in problems:
+                print(f"⚠️  Validation: {problem}")
+            if not force:
+                print(f"❌ Swap aborted - live collection left untouched ({STAGING_COLLECTION} kept for inspection, use --force to override)")
+                return False
+        
+        staging.rename('schools', dropTarget=True)
+        print(f"🔁 Swapped {STAGING_COLLECTION} in as the live schools collection")
+        finish_upload(db, db.schools)
+        return True
+        
+    except Exception as e:
+        print(f"❌ MongoDB upload failed: {e}")
+        return False
+
+def write_school_store_from_mongodb(path):
+    """Write the local school store from the live collection, so it carries the same data version"""
+    try:
+        client = MongoClient(MONGODB_URI)
+        write_school_store(client.ca_schools.schools.find({}, {'_id': 0}), path)
+        write_warm_start(path)
+    except Exception as e:
+        print(f"❌ School store export failed: {e}")
+
+def parse_args():
+    """Command line options for the importer"""
+    parser = argparse.ArgumentParser(description="Import CA Dashboard CSV files into MongoDB")
+    parser.add_argument("--stream", action="store_true",
+                        help="stream rows and upload in batches instead of loading every file into memory")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"documents per insert/bulk_write in --stream and --delta modes (default {DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="parse the indicator files in this many processes (ignored with --stream)")
+    parser.add_argument("--delta", action="store_true",
+                        help="upsert only changed schools and delete vanished ones instead of reloading everything")
+    parser.add_argument("--swap", action="store_true",
+                        help="build and validate a staging collection, then atomically rename it over the live one")
+    parser.add_argument("--force", action="store_true",
+                        help="with --swap or --delta, go ahead even if the per-indicator count checks fail")
+    parser.add_argument("--store", metavar="DIR",
+                        help="after uploading, also write the local school store and its warm-start snapshot to DIR")
+    parser.add_argument("--store-only", action="store_true",
+                        help="with --store, write the store straight from the CSV files without touching MongoDB")
+    return parser.parse_args()
+
 if __name__ == "__main__":
+    args = parse_args()
     print("🚀 Starting COMPLETE CA Dashboard data import (ALL 6 indicators)...")
-    documents = create_school_documents_complete()
-    upload_to_mongodb(documents)
+    if args.stream:
+        # Fail before anything is written rather than part way through the upload
+        try:
+            check_csv_order()
+        except ValueError as e:
+            raise SystemExit(f"❌ {e}")
+        documents = iter_school_documents_streaming()
+    elif args.workers > 1:
+        documents = create_school_documents_parallel(args.workers)
+    else:
+        documents = create_school_documents_complete()
+    
+    if args.store_only:
+        if not args.store:
+            raise SystemExit("--store-only needs --store DIR")
+        write_school_store((stamp_content_hash(doc) for doc in documents), args.store)
+        write_warm_start(args.store)
+        report_peak_memory()
+        sys.exit(0)
+    if not MONGODB_URI:
+        raise ValueError("MONGODB_URI environment variable is not set. Create a .env file with MONGODB_URI=your_connection_string")
+    
+    if args.delta:
+        # A streamed delta counts the new documents in a first pass, so a bad file
+        # is caught before any school is changed
+        expected_counts = count_documents(iter_school_documents_streaming()) if args.stream else None
+        if upload_to_mongodb_delta(documents, batch_size=args.batch_size, force=args.force,
+                                   expected_counts=expected_counts) is None:
+            sys.exit(1)
+    elif args.swap:
+        upload_to_mongodb_swap(documents, batch_size=args.batch_size, force=args.force)
+    elif args.stream:
+        if not upload_to_mongodb_streaming(documents, batch_size=args.batch_size):
+            sys.exit(1)
+    else:
+        upload_to_mongodb(documents)
+    if args.store:
+        write_school_store_from_mongodb(args.store)
+    report_peak_memory()
     print("🎉 Complete CA Dashboard data import finished!")
     print("✅ All indicators available: Chronic Absenteeism, ELA, Math, Suspensions, College/Career, Graduation Rate, English Learner Progress")
\ No newline at end of file
@@ -0,0 +1,31 @@
+# data_version.py
+# Dataset version marker written by the importer so app.py can tell when new data lands
+import hashlib
+from datetime import datetime, timezone
+
+# metadata collection document describing the live schools collection
+DATA_VERSION_ID = 'schools'
+
+def compute_data_version(collection):
+    """Short hash over every (cds_code, content_hash) pair - changes whenever any school does"""
+    digest = hashlib.sha256()
+    cursor = collection.find({}, {'cds_code': 1, 'content_hash': 1, '_id': 0}).sort('cds_code', 1)
+    for doc in cursor:
+        digest.update(f"{doc.get('cds_code')}:{doc.get('content_hash')}\n".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+def record_data_version(db, collection):
+    """Store the dataset version after an import and return it"""
+    version = compute_data_version(collection)
+    db.metadata.replace_one(
+        {'_id': DATA_VERSION_ID},
+        {'_id': DATA_VERSION_ID, 'version': version, 'updated_at': datetime.now(timezone.utc)},
+        upsert=True
+    )
+    print(f"🏷️  Data version: {version}")
+    return version
+
+def get_data_version(db):
+    """Current dataset version, or None if the importer has never recorded one"""
+    doc = db.metadata.find_one({'_id': DATA_VERSION_ID}, {'version': 1})
+    return doc.get('version') if doc else None
@@ -0,0 +1,122 @@
+# equity_gaps.py
+# Precomputed per-school gaps between student groups, rebuilt by the importer from
+# the schools collection so app.py can answer "largest gap" questions as indexed top-K queries
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from school_indexes import LOWER_IS_BETTER, VALUE_KEYS
+from search_keys import build_name_filter
+
+GAP_COLLECTION = 'equity_gaps'
+GAP_STAGING_COLLECTION = 'equity_gaps_staging'
+
+# Every group is compared with All Students; these pairs are compared directly as well
+GAP_PAIRS = [('AA', 'WH'), ('HI', 'WH'), ('AS', 'WH'), ('FI', 'WH'), ('AI', 'WH'), ('PI', 'WH'), ('MR', 'WH')]
+
+RATED_STATUSES = {'Red', 'Orange', 'Yellow', 'Green', 'Blue'}
+
+# Rankings that ask for the gaps closest to parity: "smallest gap", and "best" since
+# a narrower gap is the better result
+SMALLEST_GAP_RANKINGS = {'asc', 'best'}
+
+def wants_largest_gaps(ranking):
+    """Whether a parsed query's ranking asks for the largest gaps rather than the smallest"""
+    return ranking not in SMALLEST_GAP_RANKINGS
+
+def get_gap_index_specs():
+    """Indexes on the equity_gaps collection, in the same form as school_indexes.get_index_specs"""
+    return [
+        # Top-K for one group against a baseline, walked in gap order
+        {'name': 'gap_rank', 'keys': [('indicator', ASCENDING), ('baseline', ASCENDING), ('group', ASCENDING),
+                                      ('gap', DESCENDING)], 'options': {}},
+        # "Smallest gap" questions rank by distance from parity
+        {'name': 'gap_rank_abs', 'keys': [('indicator', ASCENDING), ('baseline', ASCENDING), ('group', ASCENDING),
+                                          ('abs_gap', ASCENDING)], 'options': {}},
+        # Top-K across every group compared with a baseline
+        {'name': 'gap_rank_any_group', 'keys': [('indicator', ASCENDING), ('baseline', ASCENDING),
+                                                ('gap', DESCENDING)], 'options': {}},
+        # District-scoped questions: a district's few hundred rows are sorted in memory
+        {'name': 'gap_district', 'keys': [('district_tokens', ASCENDING), ('indicator', ASCENDING),
+                                          ('baseline', ASCENDING)], 'options': {}},
+    ]
+
+def _rated_value(data):
+    """(value, value_key) for a rated indicator entry, or (None, None)"""
+    if not isinstance(data, dict) or data.get('status') not in RATED_STATUSES:
+        return None, None
+    key = next((k for k in VALUE_KEYS if k in data), None)
+    return (data[key], key) if key else (None, None)
+
+def compute_school_gaps(doc):
+    """Gap rows for one school document
+
+    gap is how far the group trails the baseline in the indicator's own units,
+    oriented so a positive gap always means the group is doing worse.
+    """
+    student_groups = doc.get('student_groups') or {}
+    pairs = [(group, 'ALL') for group in student_groups if group != 'ALL' and 'ALL' in student_groups] + \
+            [(group, baseline) for group, baseline in GAP_PAIRS if group in student_groups and baseline in student_groups]
+
+    rows = []
+    for group, baseline in pairs:
+        for indicator, data in student_groups[group].items():
+            group_value, value_key = _rated_value(data)
+            baseline_value, _ = _rated_value(student_groups[baseline].get(indicator))
+            if group_value is None or baseline_value is None:
+                continue
+            difference = group_value - baseline_value
+            rows.append({
+                'cds_code': doc.get('cds_code'),
+                'school_name': doc.get('school_name'),
+                'district_name': doc.get('district_name'),
+                'county_name': doc.get('county_name'),
+                'district_tokens': doc.get('district_tokens', []),
+                'indicator': indicator,
+                'group': group,
+                'baseline': baseline,
+                'value_key': value_key,
+                'group_value': group_value,
+                'baseline_value': baseline_value,
+                # + 0.0 turns the -0.0 of negating an equal pair into 0.0
+                'gap': round(difference if indicator in LOWER_IS_BETTER else -difference, 1) + 0.0,
+                'abs_gap': round(abs(difference), 1) + 0.0
+            })
+    return rows
+
+def rebuild_gap_index(db, collection, batch_size=1000):
+    """Rebuild the equity_gaps collection from collection and swap it in atomically"""
+    staging = db[GAP_STAGING_COLLECTION]
+    staging.drop()
+
+    projection = {'cds_code': 1, 'school_name': 1, 'district_name': 1, 'county_name': 1,
+                  'district_tokens': 1, 'student_groups': 1, '_id': 0}
+    total = 0
+    batch = []
+    # District rows (no school name) are already summarized in the rollups collection
+    for doc in collection.find({'school_name': {'$ne': ''}}, projection):
+        batch.extend(compute_school_gaps(doc))
+        if len(batch) >= batch_size:
+            staging.insert_many(batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        staging.insert_many(batch)
+        total += len(batch)
+
+    staging.create_indexes([IndexModel(spec['keys'], name=spec['name'], **spec['options'])
+                            for spec in get_gap_index_specs()])
+    staging.rename(GAP_COLLECTION, dropTarget=True)
+    print(f"⚖️  Equity gap index rebuilt: {total} school/group/indicator gaps")
+    return total
+
+def find_largest_gaps(db, indicator, group=None, baseline='ALL', district_name=None, county_name=None,
+                      limit=10, largest=True):
+    """Schools with the largest gaps (group furthest behind) or, with largest=False, the
+    gaps closest to zero for an indicator, best match first"""
+    query = {'indicator': indicator, 'baseline': baseline}
+    if group:
+        query['group'] = group
+    if district_name:
+        query.update(build_name_filter('district', district_name))
+    if county_name:
+        query['county_name'] = county_name
+    sort = ('gap', DESCENDING) if largest else ('abs_gap', ASCENDING)
+    return list(db[GAP_COLLECTION].find(query, {'_id': 0, 'district_tokens': 0}).sort(*sort).limit(limit))
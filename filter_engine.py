@@ -0,0 +1,89 @@
+# filter_engine.py
+# Vectorized evaluation of parsed queries (as produced by parse_query_with_speculative_search)
+# over the school store. The store keeps one packed bitmap per student group x
+# indicator x color over school ordinals, so the color/indicator/group part of a
+# query - with the same meaning as the matching clause of app.build_mongodb_query -
+# is an OR of a few bitmap rows, combined with the name/county filters by AND,
+# and counted without touching any school.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# color_code values in the store (see school_store.STATUS_BY_CODE)
+CODE_BY_STATUS = {'No Data': 0, 'Red': 1, 'Orange': 2, 'Yellow': 3, 'Green': 4, 'Blue': 5, 'Unknown': 6}
+CODES = list(range(len(CODE_BY_STATUS)))
+RATED_CODES = [1, 2, 3, 4, 5]
+
+# Set bits per byte value, for counting packed bitmaps
+POPCOUNT = np.array([bin(byte).count('1') for byte in range(256)], dtype=np.uint16) if np is not None else None
+
+def build_bitmaps(colors):
+    """Packed bitmaps [group, indicator, color code, byte] from a group x indicator x school color array"""
+    groups, indicators, count = colors.shape
+    bitmaps = np.zeros((groups, indicators, len(CODES), (count + 7) // 8), dtype=np.uint8)
+    for g in range(groups):
+        for k in range(indicators):
+            column = colors[g, k]
+            for code in CODES:
+                bitmaps[g, k, code] = np.packbits(column == code)
+    return bitmaps
+
+def all_bits(count):
+    """Bitmap with every school set (and the padding bits of the last byte clear)"""
+    return np.packbits(np.ones(count, dtype=bool))
+
+def popcount(bits):
+    return int(POPCOUNT[bits].sum())
+
+def bits_to_ordinals(bits, count):
+    return np.flatnonzero(np.unpackbits(bits, count=count))
+
+def any_pair_bits(bitmaps, pairs, groups, indicators, codes=None):
+    """Schools where any pair has one of codes (or, with codes=None, has any result)"""
+    rows = [bitmaps[groups.index(g), indicators.index(k), code]
+            for g, k in pairs if g in groups and k in indicators
+            for code in (CODES if codes is None else codes)]
+    if not rows:
+        return np.zeros(bitmaps.shape[-1], dtype=np.uint8)
+    return np.bitwise_or.reduce(rows)
+
+def predicate_pairs(parsed_query, all_indicators):
+    """(group, indicator) pairs a parsed query's color/indicator filter looks at, or None for no filter
+
+    Mirrors build_mongodb_query: colors without groups are checked on All
+    Students, and an indicator-only filter looks for ELPI in the EL group,
+    the only group CDE reports it for.
+    """
+    groups = parsed_query.get("student_groups") or []
+    indicators = parsed_query.get("indicators") or []
+    if parsed_query.get("colors"):
+        return [(g, k) for g in (groups or ["ALL"]) for k in (indicators or all_indicators)]
+    if indicators:
+        if groups:
+            return [(g, k) for g in groups for k in indicators]
+        return [("EL" if k == "english_learner_progress" else "ALL", k) for k in indicators]
+    return None
+
+def build_bits(bitmaps, groups, indicators, parsed_query, count):
+    """Bitmap of schools matching the color/indicator/group part of parsed_query"""
+    pairs = predicate_pairs(parsed_query, indicators)
+    if pairs is None:
+        return all_bits(count)
+    codes = None
+    if parsed_query.get("colors"):
+        codes = [CODE_BY_STATUS[c] for c in parsed_query["colors"] if c in CODE_BY_STATUS]
+    return any_pair_bits(bitmaps, pairs, groups, indicators, codes)
+
+def sort_keys(bitmaps, values, group_index, indicator_index):
+    """Per-school sort values for one group/indicator column, rounded as returned to clients,
+    and the bitmap of schools that can be ranked (rated, with a value)"""
+    column = np.round(values[group_index, indicator_index].astype(np.float64), 4)
+    rated = np.bitwise_or.reduce([bitmaps[group_index, indicator_index, code] for code in RATED_CODES])
+    return column, rated & np.packbits(~np.isnan(column))
+
+def ordered(ordinals, keys=None, direction=1):
+    """Ordinals sorted by keys with ordinal (= cds_code order) breaking ties, in direction"""
+    if keys is not None:
+        ordinals = ordinals[np.lexsort((ordinals, keys[ordinals]))]
+    return ordinals[::-1] if direction == -1 else ordinals
@@ -0,0 +1,283 @@
+# local_parser.py
+# Fast first-pass query parser: a token trie over every district, county and school
+# name in the catalog plus the student group / indicator / color keyword tables.
+# Returns the same structure as the Gemini parse (app.analyze_query_with_gemini) with
+# a confidence score.
+from search_keys import tokenize_name
+
+# Same vocabulary as parse_query_with_patterns, plus plurals and common synonyms
+STUDENT_GROUP_PHRASES = {
+    "hispanic": "HI", "latino": "HI", "latinos": "HI", "latinx": "HI", "latina": "HI",
+    "black": "AA", "african american": "AA", "african americans": "AA",
+    "asian": "AS", "asians": "AS", "white": "WH", "filipino": "FI", "filipinos": "FI",
+    "pacific islander": "PI", "pacific islanders": "PI",
+    "american indian": "AI", "native american": "AI", "native americans": "AI",
+    "two or more races": "MR", "multiracial": "MR",
+    "english learners": "EL", "english learner": "EL", "els": "EL",
+    "long term english learners": "LTEL", "long term english learner": "LTEL", "ltel": "LTEL",
+    "socioeconomically disadvantaged": "SED", "low income": "SED", "poverty": "SED",
+    "students with disabilities": "SWD", "special education": "SWD", "special ed": "SWD", "swd": "SWD",
+    "homeless": "HOM", "foster": "FOS", "foster youth": "FOS", "all students": "ALL"
+}
+
+INDICATOR_PHRASES = {
+    "chronic": "chronic_absenteeism", "absenteeism": "chronic_absenteeism",
+    "chronic absenteeism": "chronic_absenteeism", "attendance": "chronic_absenteeism",
+    "absent": "chronic_absenteeism", "absences": "chronic_absenteeism",
+    "ela": "ela_performance", "english language arts": "ela_performance",
+    "reading": "ela_performance", "literacy": "ela_performance",
+    "math": "math_performance", "maths": "math_performance", "mathematics": "math_performance",
+    "arithmetic": "math_performance",
+    "suspension": "suspension_rate", "suspensions": "suspension_rate",
+    "discipline": "suspension_rate", "suspended": "suspension_rate",
+    "college": "college_career", "career": "college_career", "college career": "college_career",
+    "cci": "college_career", "prepared": "college_career", "readiness": "college_career",
+    "graduation": "graduation_rate", "graduate": "graduation_rate", "graduating": "graduation_rate",
+    "english learner progress": "english_learner_progress", "elpi": "english_learner_progress",
+    "elpac": "english_learner_progress", "el progress": "english_learner_progress"
+}
+
+COLOR_PHRASES = {color.lower(): [color] for color in ["Red", "Orange", "Yellow", "Green", "Blue"]}
+
+# Words that imply a color range without naming one (only unambiguous ones -
+# "high"/"low" flip meaning between e.g. math and suspensions, so they escalate)
+COLOR_HINT_PHRASES = {
+    "lowest": ["Red", "Orange"], "worst": ["Red", "Orange"], "struggling": ["Red", "Orange"],
+    "problem": ["Red", "Orange"], "problems": ["Red", "Orange"], "concerning": ["Red", "Orange"],
+    "concerns": ["Red", "Orange"], "failing": ["Red", "Orange"], "underperforming": ["Red", "Orange"],
+    "best": ["Blue", "Green"], "highest": ["Blue", "Green"], "strong": ["Blue", "Green"],
+    "excellent": ["Blue", "Green"], "high performing": ["Blue", "Green"], "top performing": ["Blue", "Green"]
+}
+
+# Words asking about a district or county as a whole (answered from the rollups collection)
+AGGREGATE_PHRASES = {
+    "overall", "average", "averages", "mean",
+    "median", "typical", "distribution", "breakdown", "summary", "summarize", "district wide",
+    "districtwide", "county wide", "countywide", "as a whole", "how many", "compare", "comparison",
+    "versus", "vs", "aggregate"
+}
+
+# Words asking about differences between student groups (rollups, or the equity gap index when ranked)
+GAP_PHRASES = {
+    "gap", "gaps", "achievement gap", "achievement gaps", "equity gap", "equity gaps",
+    "disparity", "disparities", "opportunity gap", "opportunity gaps"
+}
+
+# Words asking for the top or bottom of a ranking: "asc"/"desc" order the raw value,
+# "best"/"worst" depend on whether the indicator is better high or low
+RANKING_PHRASES = {
+    "largest": "desc", "biggest": "desc", "widest": "desc", "greatest": "desc", "most": "desc", "top": "desc",
+    "highest": "desc", "smallest": "asc", "narrowest": "asc", "least": "asc", "lowest": "asc",
+    "best": "best", "strongest": "best", "top performing": "best", "high performing": "best",
+    "worst": "worst", "weakest": "worst"
+}
+
+# Words asking for a ranking by change since last year rather than the current value
+TREND_PHRASES = {
+    "improved": "best", "most improved": "best", "improving": "best", "improvement": "best", "gains": "best",
+    "declined": "worst", "declining": "worst", "decline": "worst", "dropped": "worst", "worsened": "worst"
+}
+
+# Words that negate or compare a filter ("not red", "except Fresno Unified", "better
+# than the county") - the local parser would read them as the filter itself, so any
+# of them sends the question on to Gemini
+NEGATION_PHRASES = {
+    "not", "no", "none", "without", "except", "excluding", "exclude", "other than", "besides",
+    "instead of", "rather than", "better than", "worse than", "more than", "less than",
+    "fewer than", "higher than", "lower than", "above", "below", "compared to"
+}
+
+# Filler words that carry no filter but should not lower confidence
+STOPWORDS = {
+    "which", "what", "where", "how", "show", "me", "list", "find", "give", "get", "see", "are", "is",
+    "the", "a", "an", "in", "at", "of", "for", "with", "and", "or", "to", "on", "by", "from",
+    "schools", "school", "district", "districts", "students", "student", "data", "performance",
+    "scores", "score", "rates", "rate", "have", "has", "having", "that", "there", "any", "all",
+    "do", "does", "doing", "about", "my", "near", "area", "california", "ca", "county", "level",
+    "levels", "color", "colors", "indicator", "indicators", "results", "performing", "unified",
+    "elementary", "high school", "middle school", "i", "want", "know", "like", "would", "please",
+    "can", "you", "tell", "us", "their", "who", "whose", "group", "groups", "for the"
+}
+
+# Trailing words dropped from district names to get the short form people type
+DISTRICT_SUFFIXES = {
+    "unified", "elementary", "union", "high", "school", "schools", "district", "city", "joint",
+    "county", "office", "of", "education", "sd", "usd", "esd", "hsd"
+}
+
+# Phrase kinds, highest priority first, for phrases that mean more than one thing
+KIND_PRIORITY = ["negation", "stopword", "aggregate", "gap", "trend", "ranking", "group", "indicator", "color", "hint", "district", "county", "school"]
+
+_matcher = {'version': None, 'trie': None}
+
+def _add_phrase(trie, phrase, kind, value):
+    tokens = tokenize_name(phrase)
+    if not tokens:
+        return
+    node = trie
+    for token in tokens:
+        node = node.setdefault(token, {})
+    entries = node.setdefault('$', {})
+    # Keep the first value registered for each kind (full names are added before aliases)
+    entries.setdefault(kind, value)
+
+def _district_alias(district):
+    tokens = tokenize_name(district)
+    while len(tokens) > 1 and tokens[-1] in DISTRICT_SUFFIXES:
+        tokens.pop()
+    return ' '.join(tokens)
+
+def build_matcher(catalog):
+    """Build the token trie for a catalog (see school_catalog.py)"""
+    trie = {}
+    for phrase in STOPWORDS:
+        _add_phrase(trie, phrase, "stopword", None)
+    for phrase, code in STUDENT_GROUP_PHRASES.items():
+        _add_phrase(trie, phrase, "group", code)
+    for phrase, indicator in INDICATOR_PHRASES.items():
+        _add_phrase(trie, phrase, "indicator", indicator)
+    for phrase in NEGATION_PHRASES:
+        _add_phrase(trie, phrase, "negation", True)
+    for phrase, colors in COLOR_PHRASES.items():
+        _add_phrase(trie, phrase, "color", colors)
+    for phrase, colors in COLOR_HINT_PHRASES.items():
+        _add_phrase(trie, phrase, "hint", colors)
+    for phrase in AGGREGATE_PHRASES:
+        _add_phrase(trie, phrase, "aggregate", True)
+    for phrase in GAP_PHRASES:
+        _add_phrase(trie, phrase, "gap", True)
+    for phrase, direction in RANKING_PHRASES.items():
+        _add_phrase(trie, phrase, "ranking", direction)
+    for phrase, direction in TREND_PHRASES.items():
+        _add_phrase(trie, phrase, "trend", direction)
+
+    counties = set()
+    for district in catalog['districts']:
+        _add_phrase(trie, district, "district", district)
+    for district in catalog['districts']:
+        alias = _district_alias(district)
+        _add_phrase(trie, alias, "district", alias)
+
+    for schools in catalog['schools_by_district'].values():
+        for school in schools:
+            if school.get('county_name'):
+                counties.add(school['county_name'])
+            # Single-word school names ("Lincoln") are too ambiguous to match on
+            if len(tokenize_name(school.get('school_name', ''))) > 1:
+                _add_phrase(trie, school['school_name'], "school", school['school_name'])
+
+    for county in counties:
+        _add_phrase(trie, county, "county", county)
+        _add_phrase(trie, f"{county} county", "county", county)
+    return trie
+
+def get_matcher(catalog):
+    """Token trie for the catalog, rebuilt when the catalog's data version changes"""
+    if _matcher['trie'] is None or _matcher['version'] != catalog['version']:
+        _matcher['trie'] = build_matcher(catalog)
+        _matcher['version'] = catalog['version']
+    return _matcher['trie']
+
+def install_matcher(trie, version):
+    """Use a trie built ahead of time (e.g. from a warm-start snapshot) for a catalog version"""
+    _matcher['trie'] = trie
+    _matcher['version'] = version
+
+def _longest_match(trie, tokens, start):
+    """Longest phrase in the trie starting at tokens[start] -> (length, entries)"""
+    node = trie
+    best = (0, None)
+    for i in range(start, len(tokens)):
+        node = node.get(tokens[i])
+        if node is None:
+            break
+        if '$' in node:
+            best = (i - start + 1, node['$'])
+    return best
+
+def parse_query_locally(user_query, catalog):
+    """Parse a question without the LLM; 'confidence' is the share of words understood"""
+    parsed = {
+        "district_name": None,
+        "school_name": None,
+        "county_name": None,
+        "colors": [],
+        "indicators": [],
+        "student_groups": [],
+        "aggregate": False,
+        "gap": False,
+        "ranking": None,
+        "rank_by": "value",
+        "data_availability": "available",
+        "explanation": "Parsed locally from the school catalog",
+        "confidence": 0.0
+    }
+
+    tokens = tokenize_name(user_query)
+    if not tokens:
+        return parsed
+
+    trie = get_matcher(catalog)
+    recognized = 0
+    found_filter = False
+    negated = False
+    # Set for a second district/county/school or a school name read out of "<name> high schools"
+    ambiguous = False
+    hint_colors = []
+    i = 0
+    while i < len(tokens):
+        length, entries = _longest_match(trie, tokens, i)
+        if not length:
+            i += 1
+            continue
+
+        recognized += length
+        kind = next(k for k in KIND_PRIORITY if k in entries)
+        value = entries[kind]
+        if kind == "group" and value not in parsed["student_groups"]:
+            parsed["student_groups"].append(value)
+        elif kind == "indicator" and value not in parsed["indicators"]:
+            parsed["indicators"].append(value)
+        elif kind == "color":
+            parsed["colors"].extend(c for c in value if c not in parsed["colors"])
+        elif kind == "hint":
+            hint_colors.extend(c for c in value if c not in hint_colors)
+        elif kind == "aggregate":
+            parsed["aggregate"] = True
+        elif kind == "negation":
+            negated = True
+        elif kind == "gap":
+            parsed["aggregate"] = parsed["gap"] = True
+        elif kind == "ranking" and not parsed["ranking"]:
+            parsed["ranking"] = value
+        elif kind == "trend":
+            parsed["rank_by"] = "change"
+            parsed["ranking"] = parsed["ranking"] or value
+        elif kind in ("district", "county", "school"):
+            field = f"{kind}_name"
+            if not parsed[field]:
+                parsed[field] = value
+            elif _district_alias(parsed[field]) != _district_alias(value):
+                # "Oakland vs San Diego", "Oakland and Fresno" - only one place fits the structure
+                ambiguous = True
+            # "Fresno High" in "Fresno high schools" is a level, not the school of that name
+            if kind == "school" and tokens[i + length:i + length + 1] == ["schools"]:
+                ambiguous = True
+
+        # Words like "lowest" both rank and imply a color range
+        if kind != "hint" and "hint" in entries:
+            hint_colors.extend(c for c in entries["hint"] if c not in hint_colors)
+
+        if kind not in ("negation", "stopword", "hint", "aggregate", "gap", "ranking", "trend"):
+            found_filter = True
+        i += length
+
+    # Context-based color inference, as in parse_query_with_patterns (a ranked
+    # indicator is sorted instead, so "lowest math" lists every rated school in order)
+    if not parsed["colors"] and not (parsed["ranking"] and parsed["indicators"]):
+        parsed["colors"] = hint_colors
+
+    if found_filter and not negated and not ambiguous:
+        parsed["confidence"] = round(recognized / len(tokens), 2)
+    parsed["explanation"] = f"Parsed locally from the school catalog (confidence {parsed['confidence']})"
+    return parsed
@@ -0,0 +1,51 @@
+# profile_startup.py
+# Import-time profile of app.py: runs "import app" in fresh interpreters with
+# python -X importtime, once per AI_INIT mode, and reports the heaviest packages
+# and the app's own "Ready in" startup log line for each.
+#
+#   python profile_startup.py                 # eager vs background
+#   python profile_startup.py lazy background
+import os
+import re
+import subprocess
+import sys
+import time
+
+IMPORT_LINE = re.compile(r'^import time:\s+\d+\s+\|\s+(\d+)\s+\|\s*(\S+)')
+
+def profile_import(mode):
+    """(wall seconds, stdout, {package: cumulative us}) for one AI_INIT mode"""
+    env = dict(os.environ, AI_INIT=mode)
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                            capture_output=True, text=True, env=env,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    elapsed = time.perf_counter() - started
+
+    # Only top-level packages: a background import thread interleaves its lines with
+    # the main thread's, so the indentation -X importtime uses for nesting is unreliable
+    packages = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match and '.' not in match.group(2):
+            packages[match.group(2)] = max(packages.get(match.group(2), 0), int(match.group(1)))
+    return elapsed, result.stdout, packages
+
+def report(mode, top=8):
+    elapsed, stdout, packages = profile_import(mode)
+    print(f"\n⏱️  AI_INIT={mode}: 'import app' took {elapsed * 1000:.0f} ms (wall, including interpreter start)")
+    ready = [line for line in stdout.splitlines() if 'Ready in' in line]
+    if ready:
+        print(f"   {ready[-1].strip()}")
+    heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    for package, cumulative_us in heaviest:
+        print(f"   {cumulative_us / 1000:8.1f} ms  {package}")
+    return elapsed
+
+if __name__ == "__main__":
+    modes = sys.argv[1:] or ['eager', 'background']
+    timings = {mode: report(mode) for mode in modes}
+    if 'eager' in timings and len(timings) > 1:
+        for mode, elapsed in timings.items():
+            if mode != 'eager':
+                print(f"\n🚀 AI_INIT={mode} starts {(timings['eager'] - elapsed) * 1000:.0f} ms faster than eager")
@@ -0,0 +1,124 @@
+# query_cache.py
+# Small thread-safe LRU caches with per-entry TTL and hit/miss counters, optionally persisted to disk
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+def normalize_query_text(text):
+    """Cache key for a user question: lowercase words only, single spaced"""
+    return ' '.join(re.findall(r"[a-z0-9]+", (text or '').lower()))
+
+class TTLCache:
+    """Bounded LRU cache whose entries expire ttl_seconds after they were stored"""
+
+    def __init__(self, max_size=1000, ttl_seconds=3600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Cached value for key, or None on a miss or expired entry"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        """Store value, evicting the least recently used entry when full"""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0
+            }
+
+class DiskBackedCache(TTLCache):
+    """TTLCache that also writes entries to JSON files so they survive restarts
+
+    Keys must be safe to use as file names (e.g. hex digests). With no
+    directory it behaves exactly like TTLCache.
+    """
+
+    def __init__(self, directory=None, max_size=1000, ttl_seconds=3600):
+        super().__init__(max_size=max_size, ttl_seconds=ttl_seconds)
+        self.directory = directory
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        value = super().get(key)
+        if value is not None or not self.directory:
+            return value
+
+        path = self._path(key)
+        try:
+            if os.path.getmtime(path) + self.ttl_seconds < time.time():
+                return None
+            with open(path, 'r', encoding='utf-8') as file:
+                value = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        # Found on disk - count it as a hit and keep it in memory from now on
+        with self._lock:
+            self.misses -= 1
+            self.hits += 1
+        super().set(key, value)
+        return value
+
+    def set(self, key, value):
+        super().set(key, value)
+        if not self.directory:
+            return
+        path = self._path(key)
+        try:
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(value, file)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️  Could not write cache file {path}: {e}")
+
+    def prune(self, keep_prefix):
+        """Drop every entry (in memory and on disk) whose key does not start with keep_prefix"""
+        with self._lock:
+            for key in [k for k in self._data if not k.startswith(keep_prefix)]:
+                del self._data[key]
+        if not self.directory:
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith('.json') and not name.startswith(keep_prefix):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
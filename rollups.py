@@ -0,0 +1,146 @@
+# rollups.py
+# District and county aggregates per student group and indicator, rebuilt by the
+# importer from the schools collection and read by app.py for aggregate questions
+import statistics
+from collections import Counter
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from school_indexes import VALUE_KEYS
+from search_keys import build_name_filter, tokenize_name
+
+ROLLUP_COLLECTION = 'rollups'
+ROLLUP_STAGING_COLLECTION = 'rollups_staging'
+
+COLORS = ['Red', 'Orange', 'Yellow', 'Green', 'Blue', 'No Data']
+
+def get_rollup_index_specs():
+    """Indexes on the rollups collection, in the same form as school_indexes.get_index_specs"""
+    return [
+        {'name': 'level_name', 'keys': [('level', ASCENDING), ('name', ASCENDING)], 'options': {'unique': True}},
+        {'name': 'level_name_tokens', 'keys': [('level', ASCENDING), ('name_tokens', ASCENDING)], 'options': {}},
+    ]
+
+def _new_rollup(level, name, county_name):
+    return {'level': level, 'name': name, 'county_name': county_name, 'school_count': 0,
+            'official_cds_code': None, 'official': {}, 'groups': {}}
+
+def _add_school(rollup, student_groups):
+    rollup['school_count'] += 1
+    for group, indicators in (student_groups or {}).items():
+        for indicator, data in indicators.items():
+            if not isinstance(data, dict):
+                continue
+            acc = rollup['groups'].setdefault(group, {}).setdefault(
+                indicator, {'colors': Counter(), 'values': [], 'changes': [], 'value_key': None})
+            status = data.get('status', 'No Data')
+            acc['colors'][status] += 1
+            # Uncolored results are too small (or too new) for CDE to rate and their
+            # blank fields were imported as 0, so only colored schools feed the averages
+            if status in COLORS[:-1]:
+                key = next((k for k in VALUE_KEYS if k in data), None)
+                if key:
+                    acc['value_key'] = acc['value_key'] or key
+                    acc['values'].append(data[key])
+                acc['changes'].append(data.get('change', 0))
+
+def _summarize(acc):
+    values = acc['values']
+    return {
+        'schools': sum(acc['colors'].values()),
+        'colors': {color: acc['colors'][color] for color in COLORS if acc['colors'][color]},
+        'value_key': acc['value_key'] or 'rate',
+        'mean': round(statistics.mean(values), 1) if values else None,
+        'median': round(statistics.median(values), 1) if values else None,
+        'mean_change': round(statistics.mean(acc['changes']), 1) if acc['changes'] else None
+    }
+
+def _official(indicator_data):
+    """The district row's own figures for one indicator"""
+    key = next((k for k in VALUE_KEYS if k in indicator_data), None)
+    return {
+        'status': indicator_data.get('status'),
+        'value': indicator_data.get(key) if key else None,
+        'change': indicator_data.get('change')
+    }
+
+def build_rollup_documents(collection):
+    """One rollup document per district and per county, built from the school documents
+
+    Each group/indicator entry has the school count, color distribution, mean and
+    median status value and mean change. Districts also carry the CDE district
+    row (rtype D) figures under "official".
+    """
+    rollups = {}
+    projection = {'cds_code': 1, 'school_name': 1, 'district_name': 1, 'county_name': 1, 'student_groups': 1, '_id': 0}
+    for doc in collection.find({}, projection):
+        district = doc.get('district_name') or ''
+        county = doc.get('county_name') or ''
+
+        # District-level rows are imported like schools but have no school name
+        if not doc.get('school_name'):
+            if district:
+                rollup = rollups.setdefault(('district', district), _new_rollup('district', district, county))
+                rollup['official_cds_code'] = doc.get('cds_code')
+                rollup['official'] = {
+                    group: {indicator: _official(data) for indicator, data in indicators.items() if isinstance(data, dict)}
+                    for group, indicators in (doc.get('student_groups') or {}).items()
+                }
+            continue
+
+        if district:
+            _add_school(rollups.setdefault(('district', district), _new_rollup('district', district, county)),
+                        doc.get('student_groups'))
+        if county:
+            _add_school(rollups.setdefault(('county', county), _new_rollup('county', county, county)),
+                        doc.get('student_groups'))
+
+    documents = []
+    for rollup in rollups.values():
+        rollup['name_tokens'] = tokenize_name(rollup['name'])
+        rollup['groups'] = {
+            group: {indicator: _summarize(acc) for indicator, acc in indicators.items()}
+            for group, indicators in rollup['groups'].items()
+        }
+        documents.append(rollup)
+    return documents
+
+def rebuild_rollups(db, collection):
+    """Rebuild the rollups collection from collection and swap it in atomically"""
+    documents = build_rollup_documents(collection)
+    staging = db[ROLLUP_STAGING_COLLECTION]
+    staging.drop()
+    if documents:
+        staging.insert_many(documents)
+    staging.create_indexes([IndexModel(spec['keys'], name=spec['name'], **spec['options'])
+                            for spec in get_rollup_index_specs()])
+    staging.rename(ROLLUP_COLLECTION, dropTarget=True)
+
+    districts = sum(1 for doc in documents if doc['level'] == 'district')
+    print(f"📐 Rollups rebuilt: {districts} districts, {len(documents) - districts} counties")
+    return len(documents)
+
+def find_rollup(db, level, name, groups=None):
+    """Best rollup for a district/county name typed by a user, or None
+
+    An exact normalized name wins; otherwise the token match covering the
+    most schools (so "los angeles" finds Los Angeles Unified). groups limits
+    the student groups returned.
+    """
+    name_filter = build_name_filter('name', name)
+    if not name_filter:
+        return None
+    projection = {'_id': 0, 'level': 1, 'name': 1, 'county_name': 1, 'school_count': 1, 'name_tokens': 1}
+    if groups:
+        for group in groups:
+            projection[f"groups.{group}"] = 1
+            projection[f"official.{group}"] = 1
+    else:
+        projection.update({'groups': 1, 'official': 1})
+
+    candidates = list(db[ROLLUP_COLLECTION].find({'level': level, **name_filter}, projection)
+                      .sort('school_count', DESCENDING).limit(20))
+    if not candidates:
+        return None
+    tokens = tokenize_name(name)
+    exact = [doc for doc in candidates if doc['name_tokens'] == tokens]
+    return (exact or candidates)[0]
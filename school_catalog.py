@@ -0,0 +1,90 @@
+# school_catalog.py
+# In-memory district -> schools catalog, reloaded when the dataset version changes
+import threading
+import time
+
+from search_keys import tokenize_name
+
+# How often (seconds) to check the data source for a new data version
+CATALOG_CHECK_SECONDS = 60
+
+_catalog = {
+    'version': None,
+    'districts': [],           # sorted non-empty district names
+    'schools_by_district': {}, # district name -> [{cds_code, school_name, county_name, district_name}]
+    'district_tokens': {},     # district name -> normalized name tokens
+    'checked_at': 0.0
+}
+_lock = threading.Lock()
+
+def build_catalog(source):
+    """Build the district/school catalog from a data source (app.MongoSchoolData or school_store.SchoolStore)"""
+    version = source.data_version()
+    schools_by_district = {}
+    for doc in source.catalog_rows():
+        district = doc.get('district_name') or ''
+        schools_by_district.setdefault(district, []).append({
+            'cds_code': doc.get('cds_code', ''),
+            'school_name': doc.get('school_name', ''),
+            'county_name': doc.get('county_name', ''),
+            'district_name': district
+        })
+
+    for schools in schools_by_district.values():
+        schools.sort(key=lambda school: school['school_name'])
+
+    districts = sorted(d for d in schools_by_district if d and d.strip())
+    return {
+        'version': version,
+        'districts': districts,
+        'schools_by_district': schools_by_district,
+        'district_tokens': {d: tokenize_name(d) for d in districts}
+    }
+
+def install_catalog(catalog):
+    """Serve a catalog built by build_catalog (or restored from a warm-start snapshot)"""
+    # Swap in a whole new catalog so readers never see a half-updated one
+    global _catalog
+    _catalog = dict(catalog, checked_at=time.monotonic())
+    return _catalog
+
+def load_catalog(source):
+    """Load the district/school catalog from a data source"""
+    catalog = install_catalog(build_catalog(source))
+    print(f"📚 Catalog loaded: {len(catalog['districts'])} districts (data version {catalog['version']})")
+    return catalog
+
+def get_catalog(source):
+    """Return the catalog, reloading it if the importer has recorded a new data version"""
+    if time.monotonic() - _catalog['checked_at'] < CATALOG_CHECK_SECONDS:
+        return _catalog
+
+    with _lock:
+        # Another thread may have refreshed while we waited for the lock
+        if time.monotonic() - _catalog['checked_at'] < CATALOG_CHECK_SECONDS:
+            return _catalog
+        try:
+            version = source.data_version()
+        except Exception as e:
+            print(f"❌ Data version check failed: {e}")
+            _catalog['checked_at'] = time.monotonic()
+            return _catalog
+        if version != _catalog['version'] or not _catalog['districts']:
+            return load_catalog(source)
+        _catalog['checked_at'] = time.monotonic()
+    return _catalog
+
+def find_district_schools(catalog, district_name):
+    """Schools for an exact district name, falling back to a token match on the name"""
+    if district_name in catalog['schools_by_district']:
+        return list(catalog['schools_by_district'][district_name])
+
+    tokens = tokenize_name(district_name)
+    if not tokens:
+        return []
+    schools = []
+    for district, district_tokens in catalog['district_tokens'].items():
+        if all(token in district_tokens for token in tokens[:-1]) and \
+                any(t.startswith(tokens[-1]) for t in district_tokens):
+            schools.extend(catalog['schools_by_district'][district])
+    return schools
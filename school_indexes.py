@@ -0,0 +1,101 @@
+# school_indexes.py
+# Index definitions for ca_schools.schools, shared by the importer and app.py
+from pymongo import ASCENDING, IndexModel
+
+INDICATORS = [
+    'chronic_absenteeism', 'ela_performance', 'math_performance', 'suspension_rate',
+    'college_career', 'graduation_rate', 'english_learner_progress'
+]
+
+# Field holding each indicator's status value (the CDE "currstatus" column)
+INDICATOR_VALUE_KEYS = {
+    'chronic_absenteeism': 'rate', 'ela_performance': 'points_below_standard',
+    'math_performance': 'points_below_standard', 'suspension_rate': 'rate', 'college_career': 'rate',
+    'graduation_rate': 'rate', 'english_learner_progress': 'rate'
+}
+
+# Value fields an indicator entry may carry, in the order they are looked for
+VALUE_KEYS = ['rate', 'points_below_standard']
+
+# Indicators where a higher status value is worse for students
+LOWER_IS_BETTER = {'chronic_absenteeism', 'suspension_rate'}
+
+def get_index_specs():
+    """Every index the schools collection should have, as {name, keys, options} dicts"""
+    specs = [
+        {'name': 'cds_code_1', 'keys': [('cds_code', ASCENDING)], 'options': {'unique': True}},
+        {'name': 'district_school', 'keys': [('district_name', ASCENDING), ('school_name', ASCENDING)], 'options': {}},
+        {'name': 'school_name', 'keys': [('school_name', ASCENDING)], 'options': {}},
+        {'name': 'county_name', 'keys': [('county_name', ASCENDING)], 'options': {}},
+        # Multikey indexes over the normalized name tokens (see search_keys.py)
+        {'name': 'district_tokens', 'keys': [('district_tokens', ASCENDING)], 'options': {}},
+        {'name': 'school_tokens', 'keys': [('school_tokens', ASCENDING)], 'options': {}},
+    ]
+
+    # Overall color filters: one partial index per indicator, scanned on the status
+    # prefix. District filters match district_tokens (search_keys.build_name_filter),
+    # which this index does not cover, so "red math in <district>" checks the tokens
+    # on the documents the status scan finds. The trailing district_name key is kept
+    # so existing deployments need no index rebuild (same name, same keys)
+    for indicator in INDICATORS:
+        status_path = f"dashboard_indicators.{indicator}.status"
+        specs.append({
+            'name': f"overall_{indicator}_status",
+            'keys': [(status_path, ASCENDING), ('district_name', ASCENDING)],
+            'options': {'partialFilterExpression': {status_path: {'$exists': True}}}
+        })
+
+    # Ranked queries: walk the value (or change) in order, cds_code breaking ties,
+    # so a top-K page is read straight off the index instead of sorting every match
+    for indicator in INDICATORS:
+        for name, field in (('value', INDICATOR_VALUE_KEYS[indicator]), ('change', 'change')):
+            path = f"dashboard_indicators.{indicator}.{field}"
+            specs.append({
+                'name': f"overall_{indicator}_{name}",
+                'keys': [(path, ASCENDING), ('cds_code', ASCENDING)],
+                'options': {'partialFilterExpression': {path: {'$exists': True}}}
+            })
+
+    # 16 groups x 7 indicators is more than MongoDB's 64 indexes per collection,
+    # so student group filters share one wildcard index
+    specs.append({'name': 'student_groups_wildcard', 'keys': [('student_groups.$**', ASCENDING)], 'options': {}})
+    return specs
+
+# Query shapes produced by build_mongodb_query / get_district_schools and the index serving each
+QUERY_SHAPES = [
+    {'shape': 'cds_code equality (importer upserts)', 'index': 'cds_code_1'},
+    {'shape': 'district name token match', 'index': 'district_tokens'},
+    {'shape': 'school name token match', 'index': 'school_tokens'},
+    {'shape': 'county_name equality', 'index': 'county_name'},
+] + [
+    {'shape': f"dashboard_indicators.{indicator}.status $in / $exists", 'index': f"overall_{indicator}_status"}
+    for indicator in INDICATORS
+] + [
+    {'shape': f"ranked by dashboard_indicators.{indicator}.{field}", 'index': f"overall_{indicator}_{name}"}
+    for indicator in INDICATORS
+    for name, field in (('value', INDICATOR_VALUE_KEYS[indicator]), ('change', 'change'))
+] + [
+    {'shape': 'student_groups.<grp>.<ind>.status $in / $exists', 'index': 'student_groups_wildcard'},
+    {'shape': 'ranked by student_groups.<grp>.<ind>.<value> (top-K sort of the matches)', 'index': 'student_groups_wildcard'},
+]
+
+def ensure_indexes(collection):
+    """Create any missing indexes (existing ones with the same name are left alone)"""
+    models = [IndexModel(spec['keys'], name=spec['name'], **spec['options']) for spec in get_index_specs()]
+    return collection.create_indexes(models)
+
+def find_missing_indexes(collection):
+    """Names of expected indexes that are not on the collection"""
+    existing = set(collection.index_information().keys())
+    return [spec['name'] for spec in get_index_specs() if spec['name'] not in existing]
+
+def print_index_report(collection):
+    """Print which query shapes are covered by an index on this collection"""
+    missing = set(find_missing_indexes(collection))
+    print("🗂️  Index coverage:")
+    for query_shape in QUERY_SHAPES:
+        if query_shape['index'] in missing:
+            print(f"   ❌ {query_shape['shape']} - missing index {query_shape['index']} (collection scan)")
+        else:
+            print(f"   ✅ {query_shape['shape']} - {query_shape['index']}")
+    return not missing
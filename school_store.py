@@ -0,0 +1,293 @@
+# school_store.py
+# Read-only, in-process copy of the schools collection: NumPy arrays of color codes,
+# status values and changes per student group x indicator x school (so each
+# group/indicator column is contiguous), plus packed bitmaps per group x indicator x
+# color that filter_engine combines to answer filters and counts. Everything is
+# memory-mapped from a directory written by the importer (data_import_improved.py --store DIR).
+# SchoolStore answers the same calls as MongoSchoolData in app.py, so app.py can
+# serve every school query with no database (DATA_BACKEND=local).
+import bisect
+import hashlib
+import json
+import os
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from filter_engine import all_bits, bits_to_ordinals, build_bitmaps, build_bits, ordered, popcount, sort_keys
+from school_indexes import INDICATORS, VALUE_KEYS
+from search_keys import tokenize_name
+
+STORE_FORMAT_VERSION = 3
+
+# color_code column values; MISSING marks a group/indicator a school has no row for
+STATUS_BY_CODE = {0: 'No Data', 1: 'Red', 2: 'Orange', 3: 'Yellow', 4: 'Green', 5: 'Blue', 6: 'Unknown'}
+UNKNOWN_COLOR = 6
+MISSING = 255
+
+IDENTITY_FIELDS = ['cds_code', 'school_name', 'district_name', 'county_name', 'year']
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("numpy is required for the local school store (pip install numpy)")
+
+def _color_code(data):
+    code = str(data.get('color_code', ''))
+    return int(code) if code in ('0', '1', '2', '3', '4', '5') else UNKNOWN_COLOR
+
+def write_school_store(documents, path):
+    """Write school documents (e.g. from the schools collection) to a store directory
+
+    The version matches data_version.compute_data_version when the documents
+    carry content hashes, so a store and the collection it came from agree.
+    """
+    _require_numpy()
+    documents = sorted(documents, key=lambda doc: doc['cds_code'])
+    groups = []
+    group_names = {}
+    value_keys = {}
+    for doc in documents:
+        for group, indicators in (doc.get('student_groups') or {}).items():
+            if group not in groups:
+                groups.append(group)
+            for indicator, data in indicators.items():
+                group_names.setdefault(group, data.get('student_group_name', group))
+                key = next((k for k in VALUE_KEYS if k in data), None)
+                if key:
+                    value_keys.setdefault(indicator, key)
+
+    shape = (len(groups), len(INDICATORS), len(documents))
+    colors = np.full(shape, MISSING, dtype=np.uint8)
+    values = np.full(shape, np.nan, dtype=np.float32)
+    changes = np.full(shape, np.nan, dtype=np.float32)
+    digest = hashlib.sha256()
+    for i, doc in enumerate(documents):
+        digest.update(f"{doc.get('cds_code')}:{doc.get('content_hash')}\n".encode('utf-8'))
+        for group, indicators in (doc.get('student_groups') or {}).items():
+            g = groups.index(group)
+            for indicator, data in indicators.items():
+                if indicator not in INDICATORS or not isinstance(data, dict):
+                    continue
+                k = INDICATORS.index(indicator)
+                colors[g, k, i] = _color_code(data)
+                key = value_keys.get(indicator)
+                if key in data:
+                    values[g, k, i] = data[key]
+                changes[g, k, i] = data.get('change', 0)
+
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, 'colors.npy'), colors)
+    np.save(os.path.join(path, 'values.npy'), values)
+    np.save(os.path.join(path, 'changes.npy'), changes)
+    np.save(os.path.join(path, 'bitmaps.npy'), build_bitmaps(colors))
+    with open(os.path.join(path, 'schools.json'), 'w', encoding='utf-8') as file:
+        json.dump({field: [doc.get(field, '') for doc in documents] for field in IDENTITY_FIELDS}, file)
+
+    meta = {
+        'format': STORE_FORMAT_VERSION,
+        'version': digest.hexdigest()[:16],
+        'count': len(documents),
+        'groups': groups,
+        'group_names': group_names,
+        'indicators': INDICATORS,
+        'value_keys': value_keys
+    }
+    # meta.json is written last, so a store without it is incomplete
+    with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as file:
+        json.dump(meta, file, indent=2)
+    print(f"💾 School store written to {path}: {len(documents)} schools x {len(groups)} groups x {len(INDICATORS)} indicators")
+    return meta
+
+class TokenIndex:
+    """Token -> school ordinals for one name field, with prefix lookups on the last token"""
+
+    def __init__(self, names):
+        postings = {}
+        for i, name in enumerate(names):
+            tokens = tokenize_name(name)
+            for token in set(tokens):
+                postings.setdefault(token, []).append(i)
+        self.postings = postings
+        self.vocabulary = sorted(postings)
+
+    def match(self, text):
+        """Ordinals whose tokens match text the way search_keys.build_name_filter does"""
+        tokens = tokenize_name(text)
+        if not tokens:
+            return None
+        start = bisect.bisect_left(self.vocabulary, tokens[-1])
+        matched = set()
+        for token in self.vocabulary[start:]:
+            if not token.startswith(tokens[-1]):
+                break
+            matched.update(self.postings[token])
+        for token in tokens[:-1]:
+            matched.intersection_update(self.postings.get(token, ()))
+        return matched
+
+class SchoolStore:
+    """Memory-mapped school store written by write_school_store
+
+    name_indexes ({'district': TokenIndex, 'school': TokenIndex}, e.g. from a
+    warm_start snapshot) skips tokenizing every name at load time.
+    """
+
+    def __init__(self, path, name_indexes=None):
+        _require_numpy()
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as file:
+            self.meta = json.load(file)
+        if self.meta.get('format') != STORE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported school store format {self.meta.get('format')} in {path}")
+        with open(os.path.join(path, 'schools.json'), 'r', encoding='utf-8') as file:
+            self.schools = json.load(file)
+
+        self.path = path
+        self.colors = np.load(os.path.join(path, 'colors.npy'), mmap_mode='r')
+        self.values = np.load(os.path.join(path, 'values.npy'), mmap_mode='r')
+        self.changes = np.load(os.path.join(path, 'changes.npy'), mmap_mode='r')
+        self.bitmaps = np.load(os.path.join(path, 'bitmaps.npy'), mmap_mode='r')
+        self.groups = self.meta['groups']
+        self.indicators = self.meta['indicators']
+        self.school_count = self.meta['count']
+
+        self.cds_codes = self.schools['cds_code']
+        self.ordinal_by_cds = {cds: i for i, cds in enumerate(self.cds_codes)}
+        self.county_names = np.array(self.schools['county_name'])
+        name_indexes = name_indexes or {}
+        self.district_index = name_indexes.get('district') or TokenIndex(self.schools['district_name'])
+        self.school_index = name_indexes.get('school') or TokenIndex(self.schools['school_name'])
+        print(f"💾 School store loaded from {path}: {self.school_count} schools (data version {self.meta['version']})")
+
+    # --- Catalog ---------------------------------------------------------
+
+    def data_version(self):
+        return self.meta['version']
+
+    def catalog_rows(self):
+        """(cds_code, school_name, county_name, district_name) dicts for school_catalog.load_catalog"""
+        for i in range(self.school_count):
+            yield {field: self.schools[field][i] for field in ('cds_code', 'school_name', 'county_name', 'district_name')}
+
+    # --- Documents -------------------------------------------------------
+
+    def _indicator_data(self, i, g, k):
+        code = int(self.colors[g, k, i])
+        data = {
+            'status': STATUS_BY_CODE[code],
+            'color_code': str(code) if code != UNKNOWN_COLOR else '',
+            'student_group_name': self.meta['group_names'].get(self.groups[g], self.groups[g]),
+            # float32 holds the one-decimal CDE figures exactly enough to round back
+            'change': round(float(self.changes[g, k, i]), 4)
+        }
+        value = self.values[g, k, i]
+        if not np.isnan(value):
+            data[self.meta['value_keys'].get(self.indicators[k], 'rate')] = round(float(value), 4)
+        return data
+
+    def _group_data(self, i, g):
+        return {
+            indicator: self._indicator_data(i, g, k)
+            for k, indicator in enumerate(self.indicators)
+            if self.colors[g, k, i] != MISSING
+        }
+
+    def document(self, i, projection=None):
+        """School i as it appears in the schools collection, limited like a Mongo projection"""
+        groups_present = [group for g, group in enumerate(self.groups) if (self.colors[g, :, i] != MISSING).any()]
+        doc = {field: self.schools[field][i] for field in IDENTITY_FIELDS}
+        doc['_id'] = doc['cds_code']
+        doc['dashboard_indicators'] = self._group_data(i, self.groups.index('ALL')) if 'ALL' in groups_present else {}
+        doc['student_group_codes'] = groups_present
+        if projection is None:
+            doc['student_groups'] = {group: self._group_data(i, self.groups.index(group)) for group in groups_present}
+            return doc
+
+        # Inclusion projections only: top-level fields plus student_groups.<code> paths
+        projected = {key: value for key, value in doc.items() if projection.get(key)}
+        if projection.get('_id', 1):
+            projected['_id'] = doc['_id']
+        wanted = [key.split('.', 1)[1] for key in projection if key.startswith('student_groups.')]
+        student_groups = {group: self._group_data(i, self.groups.index(group)) for group in wanted if group in groups_present}
+        if student_groups:
+            projected['student_groups'] = student_groups
+        return projected
+
+    def find_by_cds(self, cds_codes, projection=None):
+        """Documents for the given CDS codes (unknown codes are skipped)"""
+        return [self.document(self.ordinal_by_cds[cds], projection) for cds in cds_codes if cds in self.ordinal_by_cds]
+
+    # --- Queries ---------------------------------------------------------
+
+    def _name_bits(self, index, text):
+        matched = index.match(text)
+        if matched is None:
+            return all_bits(self.school_count)
+        mask = np.zeros(self.school_count, dtype=bool)
+        mask[list(matched)] = True
+        return np.packbits(mask)
+
+    def _sort_column(self, sort):
+        """(group index, indicator index) of a build_sort field such as
+        student_groups.HI.math_performance.change, or None if the store has no such column"""
+        parts = sort['field'].split('.')
+        group, indicator = ('ALL', parts[1]) if parts[0] == 'dashboard_indicators' else (parts[1], parts[2])
+        if group not in self.groups or indicator not in self.indicators:
+            return None
+        return self.groups.index(group), self.indicators.index(indicator)
+
+    def _matching_bits(self, parsed_query, sort=None):
+        """Bitmap of schools matching parsed_query and the sort keys for a ranked query"""
+        bits = build_bits(self.bitmaps, self.groups, self.indicators, parsed_query, self.school_count)
+        if parsed_query.get("county_name"):
+            bits &= np.packbits(self.county_names == parsed_query["county_name"])
+        if parsed_query.get("district_name"):
+            bits &= self._name_bits(self.district_index, parsed_query["district_name"])
+        if parsed_query.get("school_name"):
+            bits &= self._name_bits(self.school_index, parsed_query["school_name"])
+
+        keys = None
+        if sort:
+            column = self._sort_column(sort)
+            if column is None:
+                return np.zeros_like(bits), None
+            source = self.changes if sort['field'].endswith('.change') else self.values
+            keys, rankable = sort_keys(self.bitmaps, source, *column)
+            bits &= rankable
+        return bits, keys
+
+    def _after_mask(self, ordinals, keys, after, direction):
+        """Which ordinals come after a keyset position - see app.fetch_school_page"""
+        # Ordinals are in cds_code order, so a code position is a bisection
+        if direction == 1:
+            past_code = ordinals >= bisect.bisect_right(self.cds_codes, after['after'])
+        else:
+            past_code = ordinals < bisect.bisect_left(self.cds_codes, after['after'])
+        if keys is None or after.get('after_value') is None:
+            return past_code
+        value = after['after_value']
+        key = keys[ordinals]
+        beyond = key > value if direction == 1 else key < value
+        return beyond | ((key == value) & past_code)
+
+    def search(self, parsed_query, page_size, after=None, projection=None, sort=None):
+        """One page of matches and the position to continue after - see app.fetch_school_page"""
+        bits, keys = self._matching_bits(parsed_query, sort)
+        ordinals = bits_to_ordinals(bits, self.school_count)
+        direction = sort['direction'] if sort else 1
+        if after:
+            ordinals = ordinals[self._after_mask(ordinals, keys, after, direction)]
+        page = ordered(ordinals, keys, direction)[:page_size + 1]
+
+        results = [self.document(int(i), projection) for i in page[:page_size]]
+        if len(page) <= page_size or not results:
+            return results, None
+        next_after = {'after': self.cds_codes[page[page_size - 1]]}
+        if sort:
+            next_after['after_value'] = float(keys[page[page_size - 1]])
+        return results, next_after
+
+    def count(self, parsed_query, sort=None):
+        """Number of matching schools, counted from the bitmap without reading any school"""
+        return popcount(self._matching_bits(parsed_query, sort)[0])
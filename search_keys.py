@@ -0,0 +1,41 @@
+# search_keys.py
+# Normalized district/school name tokens, written by the importer and matched by app.py
+import re
+import unicodedata
+
+def normalize_name(name):
+    """Lowercase a name, drop accents and apostrophes and turn other punctuation into spaces"""
+    if not name:
+        return ''
+    text = unicodedata.normalize('NFKD', name)
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    text = re.sub(r"['’`]", '', text.lower())
+    text = re.sub(r'[^a-z0-9]+', ' ', text)
+    return text.strip()
+
+def tokenize_name(name):
+    """Split a name into its normalized tokens"""
+    return normalize_name(name).split()
+
+def build_search_keys(doc):
+    """Search key fields stored on each school document"""
+    return {
+        'district_tokens': tokenize_name(doc.get('district_name', '')),
+        'school_tokens': tokenize_name(doc.get('school_name', ''))
+    }
+
+def build_name_filter(field, text):
+    """MongoDB filter matching every token of the user's text against <field>_tokens
+
+    All tokens but the last must match exactly; the last is a prefix so
+    partial input like "los ang" still finds "Los Angeles Unified". Both
+    are answered from the multikey index on the tokens array.
+    """
+    tokens = tokenize_name(text)
+    if not tokens:
+        return {}
+
+    condition = {'$regex': '^' + re.escape(tokens[-1])}
+    if len(tokens) > 1:
+        condition['$all'] = tokens[:-1]
+    return {f"{field}_tokens": condition}
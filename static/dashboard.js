@@ -0,0 +1,1173 @@
+    // ==============================================================================
+    // ===                           JAVASCRIPT - TABBED VERSION                ===
+    // ==============================================================================
+
+    let messageCount = 1;
+    let currentSchoolCount = 0;
+
+    document.addEventListener('DOMContentLoaded', function() {
+        console.log("DOM fully loaded. Setting up event listeners.");
+
+        const queryInput = document.getElementById('queryInput');
+        const sendQueryBtn = document.getElementById('sendQueryBtn');
+        const chatTab = document.getElementById('chatTab');
+        const resultsTab = document.getElementById('resultsTab');
+
+
+        // Tab switching
+        document.querySelectorAll('.tab-button').forEach(button => {
+            button.addEventListener('click', function() {
+                const targetTab = this.dataset.tab;
+                switchTab(targetTab);
+            });
+        });
+
+        // Send query functionality
+        if (sendQueryBtn) {
+            sendQueryBtn.addEventListener('click', sendQuery);
+        }
+
+        if (queryInput) {
+            queryInput.addEventListener('keypress', function(event) {
+                if (event.key === 'Enter') {
+                    event.preventDefault();
+                    sendQuery();
+                }
+            });
+        }
+
+        // Example query clicks
+        chatTab.addEventListener('click', function(event) {
+            if (event.target && event.target.matches('.example-query')) {
+                const queryText = event.target.dataset.query;
+                if (queryText) {
+                    setQuery(queryText);
+                    sendQuery();
+                }
+            }
+        });
+
+        // Event delegation for dynamically created results content
+        const resultsContent = document.getElementById('resultsContent');
+        if(resultsContent) {
+            resultsContent.addEventListener('click', function(event) {
+                const target = event.target;
+                if (target.matches('.view-toggle button')) {
+                    const viewType = target.dataset.view;
+                    if(viewType) toggleView(viewType, target);
+                }
+            });
+            resultsContent.addEventListener('change', function(event) {
+                const target = event.target;
+                if(target.matches('input[name="studentGroup"]')) {
+                    updateTableView();
+                }
+            });
+        }
+
+        // Pop-up chat event listeners
+        const popupChatBtn = document.getElementById('popupChatBtn');
+        if (popupChatBtn) {
+            popupChatBtn.addEventListener('click', openPopupChat);
+        }
+
+        const popupCloseBtn = document.getElementById('popupCloseBtn');
+        if (popupCloseBtn) {
+            popupCloseBtn.addEventListener('click', closePopupChat);
+        }
+
+        // Remove the overlay click listener - we don't want to close on background click
+
+        const popupSendBtn = document.getElementById('popupSendBtn');
+        if (popupSendBtn) {
+            popupSendBtn.addEventListener('click', sendPopupQuery);
+        }
+
+        const popupQueryInput = document.getElementById('popupQueryInput');
+        if (popupQueryInput) {
+            popupQueryInput.addEventListener('keypress', function(event) {
+                if (event.key === 'Enter') {
+                    event.preventDefault();
+                    sendPopupQuery();
+                }
+            });
+        }
+
+        // Close popup with Escape key
+        document.addEventListener('keydown', function(event) {
+            if (event.key === 'Escape') {
+                closePopupChat();
+            }
+        });
+
+        // Initialize dropdowns on page load
+        initializeDefaultDropdowns();
+
+    });
+
+
+    function switchTab(tabName) {
+    // Update tab buttons
+    document.querySelectorAll('.tab-button').forEach(btn => {
+        btn.classList.remove('active');
+    });
+    document.querySelector(`[data-tab="${tabName}"]`).classList.add('active');
+
+    // Update tab content - use correct mapping
+    document.querySelectorAll('.tab-content').forEach(content => {
+        content.classList.remove('active');
+    });
+
+    if (tabName === 'chat') {
+        document.getElementById('chatTab').classList.add('active');
+    } else if (tabName === 'results') {
+        document.getElementById('resultsTab').classList.add('active');
+    }
+}
+
+    function updateTabBadges() {
+        // Update chat badge with message count
+        const chatBadge = document.getElementById('chatBadge');
+        chatBadge.textContent = Math.floor(messageCount / 2); // Divide by 2 since we count both user and AI messages
+
+        // Update results badge with the server's match count (not just the loaded pages)
+        const resultsBadge = document.getElementById('resultsBadge');
+        if (currentSchoolCount > 0) {
+            resultsBadge.textContent = formatResultTotal(currentSchoolCount);
+            resultsBadge.style.display = 'inline';
+        } else {
+            resultsBadge.style.display = 'none';
+        }
+    }
+
+    function setQuery(text) {
+        document.getElementById('queryInput').value = text;
+    }
+
+    function sendQuery() {
+        const input = document.getElementById('queryInput');
+        const query = input.value.trim();
+        if (!query) return;
+
+        addMessage(query, 'user');
+        input.value = '';
+        addMessage('🤔 Analyzing...', 'ai');
+
+        // The response is newline-delimited JSON: parsed query, then schools, then
+        // the analysis in pieces - each part is rendered as soon as it arrives
+        let analysisMessage = null;
+        let analysisText = '';
+
+        function handleEvent(event) {
+            if (event.type === 'error') {
+                throw new Error(event.error);
+            } else if (event.type === 'schools') {
+                removeAnalyzingMessage();
+
+                // Store the searched district for dropdown selection
+                window.lastSearchedDistrict = event.searched_district;
+
+                // Clear any previous district selection when a new search is made
+                const districtSelect = document.getElementById('districtSelect');
+                if (districtSelect) {
+                    districtSelect.value = ''; // Reset to "All Districts"
+                }
+
+                // Handle results
+                const schools = decodeSchools(event.schools);
+                if (schools && schools.length > 0) {
+                    setNextPage('/query/page', event.next_cursor, event.total, event.total_capped);
+                    showResults(schools);
+                    // Don't auto-switch - let user manually go to results
+                } else {
+                    // Clear results if no schools found
+                    showEmptyResults();
+                }
+                updateTabBadges();
+            } else if (event.type === 'analysis') {
+                analysisText += event.text;
+                if (!analysisMessage) {
+                    removeAnalyzingMessage();
+                    analysisMessage = addMessage(analysisText, 'ai');
+                } else {
+                    updateMessage(analysisMessage, analysisText);
+                }
+            }
+        }
+
+        fetch('/query/stream', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({query: query, format: 'columnar'})
+        })
+        .then(response => {
+            if (!response.ok) throw new Error(`Network response error: ${response.statusText}`);
+            return readNdjson(response, handleEvent);
+        })
+        .catch(error => {
+            removeAnalyzingMessage();
+            addMessage('❌ An error occurred: ' + error.message, 'ai');
+            updateTabBadges();
+            console.error('Error fetching data:', error);
+        });
+    }
+
+    function readNdjson(response, onEvent) {
+        // Browsers without streaming fetch bodies get every event once the response completes
+        if (!response.body || !window.TextDecoder) {
+            return response.text().then(text => {
+                text.split('\n').filter(line => line.trim()).forEach(line => onEvent(JSON.parse(line)));
+            });
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        function pump() {
+            return reader.read().then(({done, value}) => {
+                buffer += decoder.decode(value || new Uint8Array(), {stream: !done});
+                const lines = buffer.split('\n');
+                buffer = done ? '' : lines.pop();
+                lines.filter(line => line.trim()).forEach(line => onEvent(JSON.parse(line)));
+                if (!done) return pump();
+            });
+        }
+        return pump();
+    }
+
+    function removeAnalyzingMessage() {
+        // Remove the "Analyzing..." message
+        const messages = document.querySelectorAll('#chatContainer .message');
+        const lastMessage = messages[messages.length - 1];
+        if (lastMessage && lastMessage.textContent.includes('Analyzing')) {
+            lastMessage.remove();
+            messageCount--; // Adjust count since we're removing a message
+        }
+    }
+
+    function addMessage(text, sender) {
+        const container = document.getElementById('chatContainer');
+        const message = document.createElement('div');
+        message.className = `message ${sender}-message`;
+        let formattedText = text;
+        if (sender === 'ai') {
+            formattedText = formatAiText(formattedText);
+        }
+        message.innerHTML = `<span>${formattedText}</span>`;
+        container.appendChild(message);
+
+        // Scroll to the new message
+        container.scrollTop = container.scrollHeight;
+
+        messageCount++;
+        updateTabBadges();
+        syncChatContent(); // Sync with popup if open
+        return message;
+    }
+
+    function formatAiText(text) {
+        return text
+            .replace(/\*\*(.*?)\*\*/g, '<strong>$1</strong>')
+            .replace(/\n/g, '<br>');
+    }
+
+    function updateMessage(message, text) {
+        // Replace the text of an AI message that is still streaming in
+        const container = document.getElementById('chatContainer');
+        message.innerHTML = `<span>${formatAiText(text)}</span>`;
+        container.scrollTop = container.scrollHeight;
+        syncChatContent();
+    }
+
+    function showEmptyResults() {
+        document.getElementById('emptyResults').style.display = 'block';
+        document.getElementById('resultsContent').style.display = 'none';
+        currentSchoolCount = 0;
+        updateTabBadges();
+
+    }
+
+    function showResults(schools) {
+    console.log('DEBUG - showResults called with', schools.length, 'schools');
+    currentSchoolCount = schools.length;
+
+    const emptyResults = document.getElementById('emptyResults');
+    const resultsContent = document.getElementById('resultsContent');
+
+    if (emptyResults) {
+        emptyResults.style.display = 'none';
+        console.log('DEBUG - Hidden empty results');
+    }
+
+    if (resultsContent) {
+        resultsContent.style.setProperty('display', 'block', 'important');
+        console.log('DEBUG - Showing results content with !important');
+    } else {
+        console.error('ERROR - resultsContent element not found!');
+        return;
+    }
+
+    const allIndicators = new Set();
+    const allStudentGroups = new Set(['ALL']);
+    schools.forEach(school => {
+        Object.keys(school.dashboard_indicators || {}).forEach(ind => allIndicators.add(ind));
+        (school.student_group_codes || Object.keys(school.student_groups || {})).forEach(grp => allStudentGroups.add(grp));
+        Object.values(school.student_groups || {}).forEach(groupData => {
+            Object.keys(groupData || {}).forEach(ind => allIndicators.add(ind));
+        });
+    });
+
+    const indicators = Array.from(allIndicators);
+    const studentGroups = Array.from(allStudentGroups);
+
+// Update the existing header count instead of creating a new one
+    const existingHeader = document.querySelector('.results-header h3');
+    if (existingHeader) {
+        existingHeader.textContent = `📊 School Performance Results (${formatResultTotal(schools.length)} schools)`;
+    }
+
+    let html = '';
+
+
+
+    // New Collapsible Filter System
+    html = '<div class="filter-system">';
+
+    // Student Groups Filter (Collapsible)
+    if (studentGroups.length > 1) {
+        html += `
+        <div class="filter-section">
+            <div class="filter-header" onclick="toggleFilterSection('studentGroups')">
+                <span class="filter-title">👥 Student Groups</span>
+                <span class="filter-arrow" id="studentGroupsArrow">▼</span>
+            </div>
+            <div class="filter-content collapsed" id="studentGroupsContent">
+                <div class="student-group-grid">`;
+
+        studentGroups.forEach(group => {
+            const checked = group === 'ALL' ? 'checked' : '';
+            html += `<label><input type="radio" name="studentGroup" value="${group}" ${checked}> ${getStudentGroupName(group)}</label>`;
+        });
+
+        html += `    </div>
+            </div>
+        </div>`;
+    }
+
+    // Performance Colors Filter (Collapsible)
+    html += `
+    <div class="filter-section">
+        <div class="filter-header" onclick="toggleFilterSection('performanceColors')">
+            <span class="filter-title">🎨 Performance Colors</span>
+            <span class="filter-arrow" id="performanceColorsArrow">▼</span>
+        </div>
+        <div class="filter-content collapsed" id="performanceColorsContent">
+            <div class="color-filter-grid">
+                <label class="color-filter-item">
+                    <input type="checkbox" name="colorFilter" value="Blue" onchange="updateColorFilter()">
+                    <span class="color-sample blue-sample"> Blue</span>
+                    <span class="color-description">Highest Performance</span>
+                </label>
+                <label class="color-filter-item">
+                    <input type="checkbox" name="colorFilter" value="Green" onchange="updateColorFilter()">
+                    <span class="color-sample green-sample"> Green</span>
+                    <span class="color-description">Above Average</span>
+                </label>
+                <label class="color-filter-item">
+                    <input type="checkbox" name="colorFilter" value="Yellow" onchange="updateColorFilter()">
+                    <span class="color-sample yellow-sample"> Yellow</span>
+                    <span class="color-description">Average Performance</span>
+                </label>
+                <label class="color-filter-item">
+                    <input type="checkbox" name="colorFilter" value="Orange" onchange="updateColorFilter()">
+                    <span class="color-sample orange-sample"> Orange</span>
+                    <span class="color-description">Below Average</span>
+                </label>
+                <label class="color-filter-item">
+                    <input type="checkbox" name="colorFilter" value="Red" onchange="updateColorFilter()">
+                    <span class="color-sample red-sample"> Red</span>
+                    <span class="color-description">Lowest Performance</span>
+                </label>
+            </div>
+            <div class="color-filter-actions">
+                <button onclick="selectAllColors()" class="filter-action-btn">Select All</button>
+                <button onclick="clearAllColors()" class="filter-action-btn">Clear All</button>
+                <button onclick="selectProblemsOnly()" class="filter-action-btn problems-btn">Problems Only (Red + Orange)</button>
+            </div>
+        </div>
+    </div>`;
+
+    html += '</div>'; // End filter-system
+
+    html += `<div id="tableView" class="performance-table">${generateTableView(schools, indicators, 'ALL')}</div>`;
+
+document.getElementById('dynamicContent').innerHTML = html;
+document.getElementById('dynamicContent').style.display = 'block';
+document.getElementById('emptyResults').style.display = 'none';
+
+// Update the dropdowns with the new data
+populateDropdowns(schools, window.lastSearchedDistrict);
+    console.log('DEBUG - HTML injected successfully');
+
+    populateDropdowns(schools, window.lastSearchedDistrict);
+    updateTabBadges();
+}
+
+// Toggle filter section open/closed
+function toggleFilterSection(sectionId) {
+    const content = document.getElementById(sectionId + 'Content');
+    const arrow = document.getElementById(sectionId + 'Arrow');
+
+    if (content.classList.contains('collapsed')) {
+        content.classList.remove('collapsed');
+        arrow.textContent = '▲';
+    } else {
+        content.classList.add('collapsed');
+        arrow.textContent = '▼';
+    }
+}
+
+// Color filtering functions
+function updateColorFilter() {
+    const selectedColors = Array.from(document.querySelectorAll('input[name="colorFilter"]:checked'))
+                               .map(cb => cb.value);
+
+    const tableRows = document.querySelectorAll('.performance-table tbody tr');
+
+    if (selectedColors.length === 0) {
+        // No colors selected = show all rows
+        tableRows.forEach(row => row.style.display = '');
+        return;
+    }
+
+    tableRows.forEach(row => {
+        const colorCells = row.querySelectorAll('.color-cell');
+        let shouldShow = false;
+
+        // Check if any cell in this row matches selected colors
+        colorCells.forEach(cell => {
+            const cellClasses = cell.className;
+            selectedColors.forEach(color => {
+                if (cellClasses.includes(color)) {
+                    shouldShow = true;
+                }
+            });
+        });
+
+        row.style.display = shouldShow ? '' : 'none';
+    });
+
+    updateVisibleRowCount();
+}
+
+function selectAllColors() {
+    document.querySelectorAll('input[name="colorFilter"]').forEach(cb => {
+        cb.checked = true;
+    });
+    updateColorFilter();
+}
+
+function clearAllColors() {
+    document.querySelectorAll('input[name="colorFilter"]').forEach(cb => {
+        cb.checked = false;
+    });
+    updateColorFilter();
+}
+
+function selectProblemsOnly() {
+    // Clear all first
+    clearAllColors();
+    // Select only Red and Orange
+    document.querySelector('input[name="colorFilter"][value="Red"]').checked = true;
+    document.querySelector('input[name="colorFilter"][value="Orange"]').checked = true;
+    updateColorFilter();
+}
+
+function updateVisibleRowCount() {
+    const visibleRows = document.querySelectorAll('.performance-table tbody tr[style=""], .performance-table tbody tr:not([style*="none"])').length;
+    const totalRows = document.querySelectorAll('.performance-table tbody tr').length;
+
+    // Update results header to show filtered count
+    const resultsHeader = document.querySelector('.results-header h3');
+    if (resultsHeader) {
+        const originalText = resultsHeader.textContent;
+        const baseText = originalText.split('(')[0].trim();
+        resultsHeader.textContent = `${baseText} (${visibleRows} of ${totalRows} schools shown)`;
+    }
+}
+    function toggleView(viewType, buttonElement) {
+        document.querySelectorAll('.view-toggle button').forEach(btn => btn.classList.remove('active'));
+        buttonElement.classList.add('active');
+        // Future: add card view logic here
+    }
+
+    function updateTableView() {
+    const checkedGroup = document.querySelector('input[name="studentGroup"]:checked');
+    const selectedGroup = checkedGroup ? checkedGroup.value : 'ALL';
+    const schools = window.currentSchools;
+    const indicators = window.currentIndicators;
+    if (schools && indicators) {
+        ensureGroupLoaded(schools, selectedGroup)
+            .catch(error => console.error('Error loading student group data:', error))
+            .then(() => {
+                window.currentIndicators = addIndicators(window.currentIndicators, schools);
+                document.getElementById('tableView').innerHTML = generateTableView(schools, window.currentIndicators, selectedGroup);
+                // Reapply color filters after table regeneration
+                updateColorFilter();
+            });
+    }
+}
+
+// Add any indicators found in the schools' loaded data to an indicator list
+function addIndicators(indicatorList, schools) {
+    const indicators = new Set(indicatorList || []);
+    schools.forEach(school => {
+        Object.keys(school.dashboard_indicators || {}).forEach(ind => indicators.add(ind));
+        Object.values(school.student_groups || {}).forEach(groupData => {
+            Object.keys(groupData || {}).forEach(ind => indicators.add(ind));
+        });
+    });
+    return Array.from(indicators);
+}
+
+// Results only carry the student groups the query asked about - fetch others when selected
+function ensureGroupLoaded(schools, group) {
+    if (group === 'ALL') return Promise.resolve();
+    const missing = schools.filter(school =>
+        (school.student_group_codes || []).includes(group) &&
+        !(school.student_groups && school.student_groups[group]));
+    if (missing.length === 0) return Promise.resolve();
+
+    const batches = [];
+    for (let i = 0; i < missing.length; i += 200) {
+        batches.push(missing.slice(i, i + 200));
+    }
+    return Promise.all(batches.map(batch =>
+        fetch('/school-details', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({cds_codes: batch.map(school => school.cds_code), student_groups: [group]})
+        })
+        .then(response => {
+            if (!response.ok) throw new Error(`Network response error: ${response.statusText}`);
+            return response.json();
+        })
+        .then(data => {
+            batch.forEach(school => {
+                const groups = (data.schools || {})[school.cds_code] || {};
+                school.student_groups = school.student_groups || {};
+                school.student_groups[group] = groups[group] || {};
+            });
+        })
+    ));
+}
+
+
+    function generateTableView(schools, indicators, selectedGroup) {
+    window.currentSchools = schools; // Cache for updates
+    window.currentIndicators = indicators;
+
+    let tableHtml = '<table><thead><tr><th>School</th>';
+    indicators.forEach(indicator => tableHtml += `<th>${formatIndicatorLabel(indicator)}</th>`);
+    tableHtml += '</tr></thead><tbody>';
+
+    schools.forEach(school => {
+        tableHtml += `<tr><td class="school-name-cell">${school.school_name}</td>`;
+        indicators.forEach(indicator => {
+            let data = (selectedGroup === 'ALL')
+                ? (school.dashboard_indicators || {})[indicator]
+                : ((school.student_groups || {})[selectedGroup] || {})[indicator];
+
+            const status = data?.status || 'No Data';
+            const value = data?.rate ?? data?.points_below_standard ?? 0;
+            const change = data?.change || 0;
+
+            const displayStatus = status.replace(/\s/g, '-');
+            const tooltip = data ? formatTooltip(indicator, status, value, change) : 'No data available';
+
+            // Generate trend arrow and change text
+            const trendInfo = formatTrendInfo(indicator, change);
+
+            // Generate performance value display (like "3 points above standard")
+            const performanceValue = formatPerformanceValue(indicator, value);
+
+            tableHtml += `<td>
+                <div class="performance-cell">
+                    <div class="color-cell ${displayStatus}" title="${tooltip}">${status}</div>
+                    <div class="performance-value">${performanceValue}</div>
+                    <div class="trend-info">${trendInfo}</div>
+                </div>
+            </td>`;
+        });
+        tableHtml += '</tr>';
+    });
+
+    tableHtml += '</tbody></table>';
+    if (window.nextPage && window.nextPage.cursor) {
+        tableHtml += `<p class="results-footer">Showing ${schools.length} of ${formatResultTotal(schools.length)} results.
+            <button class="filter-action-btn" id="loadMoreBtn" onclick="loadMoreSchools()">Load more</button></p>`;
+    }
+    return tableHtml;
+}
+
+// Rebuild school objects from the compact columnar format (see wire_format.py)
+function decodeSchools(payload) {
+    if (!payload || payload.format !== 'columnar') return payload;
+    const statuses = payload.dictionaries.status;
+    const groupNames = payload.dictionaries.group_name;
+
+    function decodeIndicator(columns, i) {
+        if (columns.status[i] === null) return null; // every stored entry has a status
+        const data = {
+            status: statuses[columns.status[i]],
+            color_code: columns.color_code[i],
+            student_group_name: columns.group_name[i] === null ? undefined : groupNames[columns.group_name[i]],
+            change: columns.change[i]
+        };
+        data[columns.value_key] = columns.value[i];
+        return data;
+    }
+
+    function decodeIndicators(indicators, i) {
+        const result = {};
+        Object.entries(indicators).forEach(([indicator, columns]) => {
+            const data = decodeIndicator(columns, i);
+            if (data) result[indicator] = data;
+        });
+        return result;
+    }
+
+    const schools = [];
+    for (let i = 0; i < payload.count; i++) {
+        const school = {};
+        Object.entries(payload.columns).forEach(([column, values]) => school[column] = values[i]);
+        school.student_group_codes = payload.group_codes[i];
+        school.dashboard_indicators = decodeIndicators(payload.dashboard, i);
+        school.student_groups = {};
+        Object.entries(payload.groups).forEach(([group, encoded]) => {
+            if (encoded.present[i]) school.student_groups[group] = decodeIndicators(encoded.indicators, i);
+        });
+        schools.push(school);
+    }
+    return schools;
+}
+
+// Server-side pagination: remember where the next page of the current results comes from
+function setNextPage(url, cursor, total, totalCapped) {
+    window.nextPage = {url: url, cursor: cursor || null, total: total, totalCapped: totalCapped};
+}
+
+function formatResultTotal(loadedCount) {
+    const page = window.nextPage;
+    if (!page || page.total === undefined || page.total === null) return loadedCount;
+    return page.totalCapped ? `${page.total}+` : page.total;
+}
+
+function loadMoreSchools() {
+    const page = window.nextPage;
+    if (!page || !page.cursor) return;
+    const button = document.getElementById('loadMoreBtn');
+    if (button) {
+        button.disabled = true;
+        button.textContent = 'Loading...';
+    }
+
+    fetch(page.url, {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({cursor: page.cursor, format: 'columnar'})
+    })
+    .then(response => {
+        if (!response.ok) throw new Error(`Network response error: ${response.statusText}`);
+        return response.json();
+    })
+    .then(data => {
+        page.cursor = data.next_cursor || null;
+        data.schools = decodeSchools(data.schools);
+        const schools = (window.currentSchools || []).concat(data.schools || []);
+        window.currentSchools = schools;
+
+        // New pages may include indicators the first page did not have
+        window.currentIndicators = addIndicators(window.currentIndicators, data.schools || []);
+
+        currentSchoolCount = schools.length;
+        updateTableView();
+        updateTabBadges();
+    })
+    .catch(error => {
+        console.error('Error loading more schools:', error);
+        if (button) {
+            button.disabled = false;
+            button.textContent = 'Load more';
+        }
+    });
+}
+
+function formatPerformanceValue(indicator, value) {
+    if (!value && value !== 0) {
+        return '<span class="performance-na">--</span>';
+    }
+
+    if (indicator.includes('performance')) {
+        // For ELA/Math: Show distance from standard
+        const absValue = Math.abs(value);
+        const direction = value >= 0 ? 'above' : 'below';
+        const colorClass = value >= 0 ? 'performance-above' : 'performance-below';
+
+        return `<span class="${colorClass}">${absValue.toFixed(1)} pts ${direction}</span>`;
+    } else {
+        // For percentage indicators: Show the rate
+        return `<span class="performance-rate">${value.toFixed(1)}%</span>`;
+    }
+}
+
+function formatTrendInfo(indicator, change) {
+    if (!change || change === 0) {
+        return '<span class="trend-stable">➡️ --</span>';
+    }
+
+    const absChange = Math.abs(change);
+    let arrow, changeText, cssClass;
+
+    // Arrow direction is always based on actual change direction
+    if (change > 0) {
+        arrow = '↗️';
+        changeText = `+${absChange.toFixed(1)}`;
+    } else {
+        arrow = '↘️';
+        changeText = `-${absChange.toFixed(1)}`;
+    }
+
+    // Add units based on indicator type
+    if (indicator.includes('performance')) {
+        changeText += 'pts';
+    } else {
+        changeText += '%';
+    }
+
+    // Color is based on whether the change is GOOD or BAD for that indicator
+    if (indicator === 'chronic_absenteeism' || indicator === 'suspension_rate') {
+        // For these indicators: decrease = good, increase = bad
+        cssClass = (change < 0) ? 'trend-good' : 'trend-bad';
+    } else {
+        // For graduation, college_career, english_learner_progress, and performance: increase = good, decrease = bad
+        cssClass = (change > 0) ? 'trend-good' : 'trend-bad';
+    }
+
+    return `<span class="${cssClass}">${arrow} ${changeText}</span>`;
+}
+
+function formatTooltip(indicator, status, value, change) {
+    let tooltip = '';
+
+    if (indicator.includes('performance')) {
+        const direction = value >= 0 ? 'above' : 'below';
+        tooltip = `${status}: ${Math.abs(value).toFixed(1)} points ${direction} standard`;
+    } else {
+        tooltip = `${status}: ${value.toFixed(1)}%`;
+    }
+
+    // Add change information to tooltip
+    if (change && change !== 0) {
+        const changeDirection = change > 0 ? 'increased' : 'decreased';
+        const changeAmount = Math.abs(change).toFixed(1);
+
+        if (indicator.includes('performance')) {
+            tooltip += ` | Change: ${changeDirection} by ${changeAmount} points`;
+        } else {
+            tooltip += ` | Change: ${changeDirection} by ${changeAmount}%`;
+        }
+    }
+
+    return tooltip;
+}
+
+// Keep your existing helper functions - they're still needed!
+function formatIndicatorLabel(indicator) {
+    const labels = {
+        'chronic_absenteeism': 'Attendance', 
+        'ela_performance': 'ELA', 
+        'math_performance': 'Math', 
+        'suspension_rate': 'Suspension',
+        'college_career': 'College/Career',
+        'graduation_rate': 'Graduation',
+        'english_learner_progress': 'EL Progress'
+    };
+    return labels[indicator] || indicator.replace(/_/g, ' ').replace(/\b\w/g, l => l.toUpperCase());
+}
+
+function getStudentGroupName(short_code) {
+    const map = {
+        'ALL': 'All Students',
+        'AA': 'Black/African American',
+        'AI': 'American Indian',
+        'AS': 'Asian',
+        'FI': 'Filipino',
+        'HI': 'Hispanic/Latino',
+        'PI': 'Pacific Islander',
+        'WH': 'White',
+        'MR': 'Two or More Races',
+        'EL': 'English Learners',
+        'LTEL': 'Long-Term English Learners',
+        'RFEP': 'Reclassified Fluent English Proficient',
+        'SED': 'Socioeconomically Disadvantaged',
+        'SWD': 'Students with Disabilities',
+        'HOM': 'Homeless',
+        'FOS': 'Foster Youth'
+    };
+    return map[short_code] || short_code;
+}
+
+// District list is fetched once per page and shared by every dropdown refresh
+let districtsPromise = null;
+function fetchDistricts() {
+    if (!districtsPromise) {
+        districtsPromise = fetch('/districts')
+            .then(response => {
+                if (!response.ok) throw new Error(`Network response error: ${response.statusText}`);
+                return response.json();
+            })
+            .catch(error => {
+                districtsPromise = null; // Allow a retry on the next call
+                throw error;
+            });
+    }
+    return districtsPromise;
+}
+
+// Initialize dropdowns on page load
+function initializeDefaultDropdowns() {
+    // Load all districts immediately when page loads
+    fetchDistricts()
+        .then(allDistricts => {
+            const districtSelect = document.getElementById('districtSelect');
+            if (districtSelect) {
+                districtSelect.innerHTML = '<option value="">Select a District</option>';
+                allDistricts.slice().sort().forEach(district => {
+                    districtSelect.innerHTML += `<option value="${district}">${district}</option>`;
+                });
+            }
+        })
+        .catch(error => {
+            console.error('Error loading districts on init:', error);
+        });
+}
+
+
+// Dropdown menu functions
+function populateDropdowns(schools, selectedDistrict = null) {
+    // Get ALL districts (cached after the first call)
+    fetchDistricts()
+        .then(allDistricts => {
+            const districtSelect = document.getElementById('districtSelect');
+            const schoolSelect = document.getElementById('schoolSelect');
+
+            if (districtSelect && schoolSelect) {
+                districtSelect.innerHTML = '<option value="">All Districts</option>';
+
+                // Sort and add all districts
+                allDistricts.slice().sort().forEach(district => {
+                    const selected = (selectedDistrict && district.toLowerCase().includes(selectedDistrict.toLowerCase())) ? 'selected' : '';
+                    districtSelect.innerHTML += `<option value="${district}" ${selected}>${district}</option>`;
+                });
+
+                // If a district is selected (from chat), fetch ALL schools for that district
+                if (selectedDistrict) {
+                    loadSchoolDropdown(selectedDistrict);
+                } else {
+                    // No district selected, clear schools dropdown
+                    schoolSelect.innerHTML = '<option value="">All Schools</option>';
+                }
+            }
+        })
+        .catch(error => {
+            console.error('Error loading districts:', error);
+            // Fallback to using districts from current results only if API fails
+            const districts = new Set();
+            schools.forEach(school => {
+                const district = school.district_name || 'Unknown District';
+                districts.add(district);
+            });
+
+            const districtSelect = document.getElementById('districtSelect');
+            if (districtSelect) {
+                districtSelect.innerHTML = '<option value="">All Districts</option>';
+                Array.from(districts).sort().forEach(district => {
+                    const selected = (selectedDistrict && district.toLowerCase().includes(selectedDistrict.toLowerCase())) ? 'selected' : '';
+                    districtSelect.innerHTML += `<option value="${district}" ${selected}>${district}</option>`;
+                });
+            }
+        });
+}
+
+// Fill the school dropdown with every school in a district from the in-memory catalog
+// (result pages only hold the first page of a district's schools)
+function loadSchoolDropdown(selectedDistrict) {
+    return fetch('/school-list?district=' + encodeURIComponent(selectedDistrict))
+    .then(response => response.json())
+    .then(data => {
+        if (data.schools) {
+            // Build school dropdown with ALL schools from the district
+            const schoolsByDistrict = {};
+            data.schools.forEach(school => {
+                const district = school.district_name || 'Unknown District';
+                const schoolName = school.school_name || district;
+
+                if (!schoolsByDistrict[district]) {
+                    schoolsByDistrict[district] = new Set();
+                }
+                schoolsByDistrict[district].add(schoolName);
+            });
+
+            updateSchoolDropdown(schoolsByDistrict, selectedDistrict);
+        }
+    })
+    .catch(error => {
+        console.error('Error loading all schools for district:', error);
+    });
+}
+
+function updateSchoolDropdown(schoolsByDistrict, selectedDistrict) {
+    const schoolSelect = document.getElementById('schoolSelect');
+    if (!schoolSelect) return;
+
+    schoolSelect.innerHTML = '<option value="">All Schools</option>';
+
+    if (selectedDistrict && schoolsByDistrict[selectedDistrict]) {
+        Array.from(schoolsByDistrict[selectedDistrict]).sort().forEach(school => {
+            schoolSelect.innerHTML += `<option value="${school}">${school}</option>`;
+        });
+    } else {
+        // Show all schools if no district selected
+        const allSchools = new Set();
+        Object.values(schoolsByDistrict).forEach(schoolSet => {
+            schoolSet.forEach(school => allSchools.add(school));
+        });
+        Array.from(allSchools).sort().forEach(school => {
+            schoolSelect.innerHTML += `<option value="${school}">${school}</option>`;
+        });
+    }
+}
+
+function filterByDropdowns() {
+    const selectedDistrict = document.getElementById('districtSelect').value;
+    const selectedSchool = document.getElementById('schoolSelect').value;
+    const tableRows = document.querySelectorAll('.performance-table tbody tr');
+
+    tableRows.forEach(row => {
+        let shouldShow = true;
+        const schoolNameCell = row.querySelector('.school-name-cell');
+
+        if (schoolNameCell) {
+            const schoolText = schoolNameCell.textContent.trim();
+
+            // Get the school data to check district
+            const schools = window.currentSchools || [];
+            const matchingSchool = schools.find(s => 
+                (s.school_name || s.district_name) === schoolText
+            );
+
+            if (selectedDistrict && matchingSchool) {
+                if (!matchingSchool.district_name || !matchingSchool.district_name.includes(selectedDistrict)) {
+                    shouldShow = false;
+                }
+            }
+
+            if (selectedSchool && schoolText !== selectedSchool) {
+                shouldShow = false;
+            }
+        }
+
+        row.style.display = shouldShow ? '' : 'none';
+    });
+
+    updateVisibleRowCount();
+}
+
+function handleDistrictChange() {
+    const selectedDistrict = document.getElementById('districtSelect').value;
+
+    if (!selectedDistrict) {
+        // If no district selected, hide dynamic content and show empty state
+        document.getElementById('emptyResults').style.display = 'block';
+        document.getElementById('dynamicContent').style.display = 'none';
+
+        // Reset school dropdown
+        const schoolSelect = document.getElementById('schoolSelect');
+        if (schoolSelect) {
+            schoolSelect.innerHTML = '<option value="">All Schools</option>';
+        }
+
+        // Reset count
+        currentSchoolCount = 0;
+        updateTabBadges();
+        return;
+    }
+
+    // Fetch fresh data for the selected district
+    fetch('/district-schools', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({district_name: selectedDistrict, format: 'columnar'})
+    })
+    .then(response => response.json())
+    .then(data => {
+        data.schools = decodeSchools(data.schools);
+        if (data.schools && data.schools.length > 0) {
+            // Store the schools data
+            window.currentSchools = data.schools;
+            setNextPage('/district-schools', data.next_cursor, data.total, data.total_capped);
+
+            // Update school dropdown with the whole district, not just this page
+            loadSchoolDropdown(selectedDistrict);
+
+            // Show the dynamic content area
+            showDynamicResults(data.schools);
+
+            // Hide empty state
+            document.getElementById('emptyResults').style.display = 'none';
+
+            // Update count
+            currentSchoolCount = data.schools.length;
+            updateTabBadges();
+        }
+    })
+    .catch(error => {
+        console.error('Error fetching district schools:', error);
+    });
+}
+
+function showDynamicResults(schools) {
+    const allIndicators = new Set();
+    const allStudentGroups = new Set(['ALL']);
+    schools.forEach(school => {
+        Object.keys(school.dashboard_indicators || {}).forEach(ind => allIndicators.add(ind));
+        (school.student_group_codes || Object.keys(school.student_groups || {})).forEach(grp => allStudentGroups.add(grp));
+        Object.values(school.student_groups || {}).forEach(groupData => {
+            Object.keys(groupData || {}).forEach(ind => allIndicators.add(ind));
+        });
+    });
+
+    const indicators = Array.from(allIndicators);
+    const studentGroups = Array.from(allStudentGroups);
+
+    let html = '<div class="filter-system">';
+
+    // Student Groups Filter (Collapsible)
+    if (studentGroups.length > 1) {
+        html += `
+        <div class="filter-section">
+            <div class="filter-header" onclick="toggleFilterSection('studentGroups')">
+                <span class="filter-title">👥 Student Groups</span>
+                <span class="filter-arrow" id="studentGroupsArrow">▼</span>
+            </div>
+            <div class="filter-content collapsed" id="studentGroupsContent">
+                <div class="student-group-grid">`;
+
+        studentGroups.forEach(group => {
+            const checked = group === 'ALL' ? 'checked' : '';
+            html += `<label><input type="radio" name="studentGroup" value="${group}" ${checked}> ${getStudentGroupName(group)}</label>`;
+        });
+
+        html += `    </div>
+            </div>
+        </div>`;
+    }
+
+    // Performance Colors Filter (Collapsible)
+    html += `
+    <div class="filter-section">
+        <div class="filter-header" onclick="toggleFilterSection('performanceColors')">
+            <span class="filter-title">🎨 Performance Colors</span>
+            <span class="filter-arrow" id="performanceColorsArrow">▼</span>
+        </div>
+        <div class="filter-content collapsed" id="performanceColorsContent">
+            <div class="color-filter-grid">
+                <label class="color-filter-item">
+                    <input type="checkbox" name="colorFilter" value="Blue" onchange="updateColorFilter()">
+                    <span class="color-sample blue-sample"> Blue</span>
+                    <span class="color-description">Highest Performance</span>
+                </label>
+                <label class="color-filter-item">
+                    <input type="checkbox" name="colorFilter" value="Green" onchange="updateColorFilter()">
+                    <span class="color-sample green-sample"> Green</span>
+                    <span class="color-description">Above Average</span>
+                </label>
+                <label class="color-filter-item">
+                    <input type="checkbox" name="colorFilter" value="Yellow" onchange="updateColorFilter()">
+                    <span class="color-sample yellow-sample"> Yellow</span>
+                    <span class="color-description">Average Performance</span>
+                </label>
+                <label class="color-filter-item">
+                    <input type="checkbox" name="colorFilter" value="Orange" onchange="updateColorFilter()">
+                    <span class="color-sample orange-sample"> Orange</span>
+                    <span class="color-description">Below Average</span>
+                </label>
+                <label class="color-filter-item">
+                    <input type="checkbox" name="colorFilter" value="Red" onchange="updateColorFilter()">
+                    <span class="color-sample red-sample"> Red</span>
+                    <span class="color-description">Lowest Performance</span>
+                </label>
+            </div>
+            <div class="color-filter-actions">
+                <button onclick="selectAllColors()" class="filter-action-btn">Select All</button>
+                <button onclick="clearAllColors()" class="filter-action-btn">Clear All</button>
+                <button onclick="selectProblemsOnly()" class="filter-action-btn problems-btn">Problems Only (Red + Orange)</button>
+            </div>
+        </div>
+    </div>`;
+
+    html += '</div>'; // End filter-system
+
+    html += `<div id="tableView" class="performance-table">${generateTableView(schools, indicators, 'ALL')}</div>`;
+
+    document.getElementById('dynamicContent').innerHTML = html;
+    document.getElementById('dynamicContent').style.display = 'block';
+
+    // Store indicators for updates
+    window.currentIndicators = indicators;
+}
+
+// Pop-up Chat Functionality
+function openPopupChat() {
+    const overlay = document.getElementById('popupChatOverlay');
+    const popupContent = document.getElementById('popupChatContent');
+    const mainChatContainer = document.getElementById('chatContainer');
+
+    // Sync chat content from main chat to popup
+    popupContent.innerHTML = mainChatContainer.innerHTML;
+
+    // Show the popup
+    overlay.style.display = 'block';
+
+    // Scroll to bottom
+    popupContent.scrollTop = popupContent.scrollHeight;
+}
+
+function closePopupChat() {
+    const overlay = document.getElementById('popupChatOverlay');
+    overlay.style.display = 'none';
+}
+
+function syncChatContent() {
+    // Sync content from main chat to popup if popup is open
+    const overlay = document.getElementById('popupChatOverlay');
+    if (overlay.style.display === 'block') {
+        const popupContent = document.getElementById('popupChatContent');
+        const mainChatContainer = document.getElementById('chatContainer');
+
+        popupContent.innerHTML = mainChatContainer.innerHTML;
+        popupContent.scrollTop = popupContent.scrollHeight;
+    }
+}
+
+function sendPopupQuery() {
+    const popupInput = document.getElementById('popupQueryInput');
+    const query = popupInput.value.trim();
+    if (!query) return;
+
+    // Set the main input and send query
+    document.getElementById('queryInput').value = query;
+    popupInput.value = '';
+    sendQuery();
+}
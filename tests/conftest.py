@@ -0,0 +1,114 @@
+# Shared fixtures: small CDE-style CSV files, the school documents the importer
+# builds from them, and app.py imported against an in-memory MongoDB (mongomock)
+import copy
+import csv
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CSV_COLUMNS = ['cds', 'rtype', 'countyname', 'districtname', 'schoolname', 'stugroupshort',
+               'currstatus', 'change', 'color']
+
+# (county code, district code, county, district) for the fixture districts
+FIXTURE_DISTRICTS = [
+    ('01', '61259', 'Alameda', 'Oakland Unified'),
+    ('01', '61143', 'Alameda', 'Berkeley Unified'),
+    ('10', '62166', 'Fresno', 'Fresno Unified'),
+]
+FIXTURE_SCHOOLS = ['Lincoln Elementary', 'Washington High', 'Roosevelt Middle', 'Jefferson Elementary',
+                   'Madison Park Academy', 'Hoover Elementary', 'Garfield Elementary', 'Franklin High']
+FIXTURE_GROUPS = ['ALL', 'HI', 'WH', 'AA', 'EL']
+
+def fixture_rows(indicator, seed):
+    """CSV rows for one indicator, sorted by cds like the CDE files (one district row per district)"""
+    rng = random.Random(seed)
+    rows = []
+    for county_code, district_code, county, district in FIXTURE_DISTRICTS:
+        schools = [('', f'{county_code}{district_code}0000000', 'D')] + [
+            (name, f'{county_code}{district_code}{100000 + n * 1111:07d}', 'S')
+            for n, name in enumerate(FIXTURE_SCHOOLS)
+        ]
+        for name, cds, rtype in schools:
+            groups = ['EL'] if indicator == 'english_learner_progress' else \
+                [g for g in FIXTURE_GROUPS if g == 'ALL' or rng.random() < 0.7]
+            for group in groups:
+                rows.append({
+                    'cds': cds, 'rtype': rtype, 'countyname': county, 'districtname': district,
+                    'schoolname': name, 'stugroupshort': '' if indicator == 'english_learner_progress' else group,
+                    # One decimal place, so some schools tie on value
+                    'currstatus': round(rng.uniform(-80, 40), 1) if 'performance' in indicator
+                    else round(rng.uniform(0, 40), 1),
+                    'change': round(rng.uniform(-10, 10), 1),
+                    'color': rng.choice(['0', '1', '2', '3', '4', '5'])
+                })
+    rows.sort(key=lambda row: int(row['cds']))
+    return rows
+
+def write_csv(path, rows):
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=CSV_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return str(path)
+
+@pytest.fixture(scope='session')
+def csv_files(tmp_path_factory):
+    """{indicator: path} for the importer's CSV_FILES; indicators without rows get a header-only file"""
+    import data_import_improved
+    directory = tmp_path_factory.mktemp('csv')
+    with_rows = ['math_performance', 'chronic_absenteeism', 'english_learner_progress']
+    return {
+        indicator: write_csv(directory / f'{indicator}.csv',
+                             fixture_rows(indicator, seed) if indicator in with_rows else [])
+        for seed, indicator in enumerate(data_import_improved.CSV_FILES)
+    }
+
+@pytest.fixture(scope='session')
+def school_documents(csv_files):
+    """School documents built by the importer from the fixture CSV files"""
+    import data_import_improved
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(data_import_improved, 'CSV_FILES', csv_files)
+        return data_import_improved.create_school_documents_complete()
+
+@pytest.fixture
+def mongo_client():
+    """A fresh in-memory MongoDB"""
+    mongomock = pytest.importorskip('mongomock')
+    return mongomock.MongoClient()
+
+@pytest.fixture
+def importer(csv_files, mongo_client, monkeypatch):
+    """data_import_improved reading the fixture CSVs and writing to mongo_client"""
+    import data_import_improved
+    monkeypatch.setattr(data_import_improved, 'CSV_FILES', dict(csv_files))
+    monkeypatch.setattr(data_import_improved, 'MongoClient', lambda *args, **kwargs: mongo_client)
+    return data_import_improved
+
+@pytest.fixture(scope='session')
+def app_module(school_documents, tmp_path_factory):
+    """app.py serving the fixture documents from an in-memory MongoDB"""
+    mongomock = pytest.importorskip('mongomock')
+    pytest.importorskip('flask_limiter')
+    import pymongo
+    import data_import_improved
+
+    client = mongomock.MongoClient()
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(data_import_improved, 'MongoClient', lambda *args, **kwargs: client)
+        data_import_improved.upload_to_mongodb(copy.deepcopy(school_documents))
+
+        patch.setattr(pymongo, 'MongoClient', lambda *args, **kwargs: client)
+        patch.setenv('MONGODB_URI', 'mongodb://fixture')
+        patch.setenv('DATA_BACKEND', 'mongo')
+        patch.setenv('AI_INIT', 'lazy')
+        patch.setenv('SCHOOL_STORE_PATH', str(tmp_path_factory.mktemp('no_store')))
+        patch.delenv('SCHOOL_STORE_URL', raising=False)
+        import app
+    app.app.config['TESTING'] = True
+    app.limiter.enabled = False
+    return app
@@ -0,0 +1,71 @@
+# Keyset cursors for /query/page and /district-schools (app.encode_cursor / decode_cursor)
+import base64
+import json
+
+import pytest
+
+def raw_cursor(state):
+    return base64.urlsafe_b64encode(json.dumps(state).encode('utf-8')).decode('ascii')
+
+TAMPERED = [
+    'not base64!',
+    raw_cursor(['a list']),
+    raw_cursor({}),
+    raw_cursor({'after': {'$gt': ''}}),
+    raw_cursor({'after': '0161259 OR 1'}),
+    raw_cursor({'after': 1161259}),
+    raw_cursor({'after': '1', 'after_value': {'$ne': None}}),
+    raw_cursor({'after': '1', 'after_value': 'x'}),
+    raw_cursor({'after': '1', 'after_value': True}),
+    'eyJhZnRlciI6ICIxIiwgImFmdGVyX3ZhbHVlIjogTmFOfQ==',  # {"after": "1", "after_value": NaN}
+    raw_cursor({'after': '1', 'district': {'$regex': '.'}}),
+    raw_cursor({'after': '1', 'query': 'x'}),
+    raw_cursor({'after': '1', 'query': ['x']}),
+    raw_cursor({'after': '1', 'size': '5'}),
+    raw_cursor({'after': '1', 'size': 0}),
+    raw_cursor({'after': '1', 'size': True}),
+]
+
+@pytest.mark.parametrize('cursor', TAMPERED)
+def test_decode_cursor_rejects_tampered_cursors(app_module, cursor):
+    with pytest.raises(ValueError):
+        app_module.decode_cursor(cursor)
+
+@pytest.mark.parametrize('cursor', TAMPERED)
+def test_query_page_answers_tampered_cursors_with_400(app_module, cursor):
+    response = app_module.app.test_client().post('/query/page', json={'cursor': cursor})
+    assert response.status_code == 400
+
+def test_decode_cursor_round_trips(app_module):
+    state = {'after': '01612590101110', 'after_value': -12.5, 'query': {'colors': ['Red']}, 'size': 5}
+    assert app_module.decode_cursor(app_module.encode_cursor(state)) == state
+
+def test_query_page_walks_every_match_once(app_module):
+    client = app_module.app.test_client()
+    query = app_module.sanitize_parsed_query({'indicators': ['math_performance'], 'ranking': 'worst'})
+    sort = app_module.build_sort(query)
+    results, next_after = app_module.school_data.search(query, 4, projection=app_module.build_projection(query),
+                                                        sort=sort)
+    codes = [school['cds_code'] for school in results]
+    cursor = app_module.encode_cursor({'query': query, 'size': 4, **next_after})
+    while cursor:
+        page = client.post('/query/page', json={'cursor': cursor}).get_json()
+        codes.extend(school['cds_code'] for school in page['schools'])
+        cursor = page['next_cursor']
+    assert len(codes) == len(set(codes)) == app_module.school_data.count(query, sort=sort)
+
+@pytest.mark.parametrize('district_name', [123, ['Oakland Unified'], {'$ne': None}])
+def test_district_schools_rejects_non_string_names(app_module, district_name):
+    response = app_module.app.test_client().post('/district-schools', json={'district_name': district_name})
+    assert response.status_code == 400
+
+def test_district_schools_pages_through_a_district(app_module):
+    client = app_module.app.test_client()
+    page = client.post('/district-schools', json={'district_name': 'Oakland Unified', 'page_size': 4}).get_json()
+    total = page['total']
+    codes = [school['cds_code'] for school in page['schools']]
+    while page['next_cursor']:
+        page = client.post('/district-schools', json={'cursor': page['next_cursor']}).get_json()
+        codes.extend(school['cds_code'] for school in page['schools'])
+    assert codes == sorted(codes)
+    assert len(codes) == total == 9
@@ -0,0 +1,68 @@
+# Tests for the per-school gap rows written to the equity_gaps collection (equity_gaps.py)
+import math
+
+import pytest
+
+from equity_gaps import GAP_COLLECTION, compute_school_gaps, find_largest_gaps, wants_largest_gaps
+
+def make_school(groups):
+    """School document with {group: {indicator: (status, value key, value)}}"""
+    return {
+        'cds_code': '01611920000000', 'school_name': 'Oakland High', 'district_name': 'Oakland Unified',
+        'county_name': 'Alameda', 'district_tokens': ['oakland', 'unified'],
+        'student_groups': {
+            group: {indicator: {'status': status, key: value} for indicator, (status, key, value) in indicators.items()}
+            for group, indicators in groups.items()
+        }
+    }
+
+def gaps_by_group(doc):
+    return {(row['group'], row['baseline'], row['indicator']): row for row in compute_school_gaps(doc)}
+
+def test_gap_is_positive_when_group_trails():
+    rows = gaps_by_group(make_school({
+        'ALL': {'math_performance': ('Yellow', 'points_below_standard', -20.0),
+                'suspension_rate': ('Orange', 'rate', 4.0)},
+        'HI': {'math_performance': ('Orange', 'points_below_standard', -45.5),
+               'suspension_rate': ('Red', 'rate', 6.5)}
+    }))
+    assert rows[('HI', 'ALL', 'math_performance')]['gap'] == 25.5
+    assert rows[('HI', 'ALL', 'suspension_rate')]['gap'] == 2.5
+    assert rows[('HI', 'ALL', 'suspension_rate')]['abs_gap'] == 2.5
+
+def test_equal_values_give_positive_zero():
+    rows = gaps_by_group(make_school({
+        'ALL': {'math_performance': ('Yellow', 'points_below_standard', -20.0)},
+        'AA': {'math_performance': ('Yellow', 'points_below_standard', -20.0)},
+        'WH': {'math_performance': ('Green', 'points_below_standard', -20.0)}
+    }))
+    for key in [('AA', 'ALL', 'math_performance'), ('AA', 'WH', 'math_performance')]:
+        assert rows[key]['gap'] == 0.0 and math.copysign(1.0, rows[key]['gap']) == 1.0
+        assert math.copysign(1.0, rows[key]['abs_gap']) == 1.0
+
+def test_unrated_entries_are_skipped():
+    rows = compute_school_gaps(make_school({
+        'ALL': {'math_performance': ('Yellow', 'points_below_standard', -20.0)},
+        'FOS': {'math_performance': ('No Data', 'points_below_standard', -60.0)}
+    }))
+    assert rows == []
+
+@pytest.mark.parametrize('ranking, largest', [
+    ('desc', True), ('worst', True), (None, True), ('asc', False), ('best', False)
+])
+def test_best_gaps_are_the_smallest(ranking, largest):
+    assert wants_largest_gaps(ranking) is largest
+
+def test_find_largest_gaps_orders_by_ranking():
+    mongomock = pytest.importorskip('mongomock')
+    db = mongomock.MongoClient().ca_schools
+    db[GAP_COLLECTION].insert_many([
+        {'cds_code': str(n), 'indicator': 'math_performance', 'baseline': 'ALL', 'group': 'HI',
+         'gap': gap, 'abs_gap': abs(gap), 'district_tokens': []}
+        for n, gap in enumerate([30.0, -2.0, 0.5, 12.0])
+    ])
+    def gaps(ranking):
+        rows = find_largest_gaps(db, 'math_performance', group='HI', largest=wants_largest_gaps(ranking))
+        return [row['gap'] for row in rows]
+    assert gaps('worst') == [30.0, 12.0, 0.5, -2.0]
+    assert gaps('best') == [0.5, -2.0, 12.0, 30.0]
@@ -0,0 +1,72 @@
+# Upload modes of data_import_improved.py against an in-memory MongoDB
+import copy
+import csv
+
+def load(importer):
+    """Full upload of the fixture CSVs; returns the live schools collection"""
+    importer.upload_to_mongodb(importer.create_school_documents_complete())
+    return importer.MongoClient().ca_schools.schools
+
+def test_delta_counts(importer):
+    schools = load(importer)
+    documents = importer.create_school_documents_complete()
+    live_count = len(documents)
+
+    removed = documents.pop()
+    changed = documents[3]
+    changed['dashboard_indicators']['math_performance']['points_below_standard'] += 1.0
+    added = copy.deepcopy(documents[4])
+    added.update(cds_code='01612590199999', school_name='New Charter Academy')
+    documents.append(added)
+
+    counts = importer.upload_to_mongodb_delta(documents, batch_size=3)
+    assert counts == {'inserted': 1, 'updated': 1, 'unchanged': live_count - 2, 'deleted': 1}
+    assert schools.count_documents({}) == live_count
+    assert schools.count_documents({'cds_code': removed['cds_code']}) == 0
+    assert schools.find_one({'cds_code': changed['cds_code']})['content_hash'] == changed['content_hash']
+
+    # Reloading the original files undoes each change
+    rerun = importer.upload_to_mongodb_delta(importer.create_school_documents_complete())
+    assert rerun == {'inserted': 1, 'updated': 1, 'unchanged': live_count - 2, 'deleted': 1}
+    assert importer.upload_to_mongodb_delta(importer.create_school_documents_complete()) == \
+        {'inserted': 0, 'updated': 0, 'unchanged': live_count, 'deleted': 0}
+
+def test_delta_refuses_to_delete_when_an_indicator_vanishes(importer):
+    schools = load(importer)
+    live_count = schools.count_documents({})
+    importer.CSV_FILES['math_performance'] = 'missing.csv'
+
+    # A document list, or a stream with its counts from a first pass, is checked before any write
+    assert importer.upload_to_mongodb_delta(importer.create_school_documents_complete()) is None
+    expected_counts = importer.count_documents(importer.iter_school_documents_streaming())
+    assert importer.upload_to_mongodb_delta(importer.iter_school_documents_streaming(),
+                                            expected_counts=expected_counts) is None
+    assert schools.count_documents({'dashboard_indicators.math_performance': {'$exists': True}}) == live_count
+
+    # A bare stream is checked before the deletes
+    assert importer.upload_to_mongodb_delta(importer.iter_school_documents_streaming()) is None
+    assert schools.count_documents({}) == live_count
+
+def test_stream_of_unsorted_file_leaves_live_collection(importer, tmp_path):
+    schools = load(importer)
+    live = sorted(doc['cds_code'] for doc in schools.find({}, {'cds_code': 1}))
+
+    with open(importer.CSV_FILES['math_performance'], encoding='utf-8') as file:
+        reader = csv.DictReader(file)
+        fieldnames, rows = reader.fieldnames, list(reader)
+    unsorted = tmp_path / 'unsorted.csv'
+    with open(unsorted, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows[len(rows) // 2:] + rows[:len(rows) // 2])
+    importer.CSV_FILES['math_performance'] = str(unsorted)
+
+    assert not importer.upload_to_mongodb_streaming(importer.iter_school_documents_streaming(), batch_size=2)
+    assert sorted(doc['cds_code'] for doc in schools.find({}, {'cds_code': 1})) == live
+
+def test_stream_replaces_live_collection(importer):
+    schools = load(importer)
+    before = schools.count_documents({})
+    assert importer.upload_to_mongodb_streaming(importer.iter_school_documents_streaming(), batch_size=2)
+    assert schools.count_documents({}) == before
+    assert 'district_tokens' in schools.index_information()
@@ -0,0 +1,74 @@
+# Tests for the local first-pass parser (local_parser.py)
+import pytest
+
+from local_parser import parse_query_locally
+from search_keys import tokenize_name
+
+# app.py's default LOCAL_PARSER_CONFIDENCE (importing app would connect to MongoDB)
+LOCAL_PARSER_CONFIDENCE = 0.8
+
+def make_catalog(*schools):
+    """Catalog in the shape school_catalog.build_catalog returns, from (school, district, county) tuples"""
+    schools_by_district = {}
+    for number, (school, district, county) in enumerate(schools):
+        schools_by_district.setdefault(district, []).append({
+            'cds_code': f'{number:014d}', 'school_name': school,
+            'county_name': county, 'district_name': district
+        })
+    districts = sorted(schools_by_district)
+    return {
+        'version': 'test',
+        'districts': districts,
+        'schools_by_district': schools_by_district,
+        'district_tokens': {d: tokenize_name(d) for d in districts}
+    }
+
+CATALOG = make_catalog(
+    ('Oakland High', 'Oakland Unified', 'Alameda'),
+    ('Hoover Elementary', 'San Diego Unified', 'San Diego'),
+    ('Fresno High', 'Fresno Unified', 'Fresno'),
+    ('Clovis West High', 'Clovis Unified', 'Fresno'),
+    ('Berkeley High', 'Berkeley Unified', 'Alameda')
+)
+
+def test_plain_filter_is_confident():
+    parsed = parse_query_locally('schools in Oakland that are red in math', CATALOG)
+    assert parsed['district_name'] == 'oakland'
+    assert parsed['colors'] == ['Red']
+    assert parsed['indicators'] == ['math_performance']
+    assert parsed['confidence'] >= LOCAL_PARSER_CONFIDENCE
+
+@pytest.mark.parametrize('query', [
+    'schools in Oakland that are not red in math',
+    'schools in San Diego without red math',
+    'schools in Fresno county with red math except Fresno Unified',
+    'schools in Fresno county excluding Fresno Unified',
+    'red math schools in Fresno county other than Clovis Unified',
+    'schools in Oakland with no red indicators',
+    'schools in Oakland better than San Diego in math',
+    'schools in Fresno with math worse than Clovis'
+])
+def test_negation_and_comparison_escalate(query):
+    parsed = parse_query_locally(query, CATALOG)
+    assert parsed['confidence'] == 0.0
+    assert parsed['confidence'] < LOCAL_PARSER_CONFIDENCE
+
+@pytest.mark.parametrize('query', [
+    'compare Oakland vs San Diego math',
+    'math in Oakland and Fresno',
+    'red math schools in Oakland or Berkeley',
+    'red math schools in Fresno county or Alameda county',
+    'lowest math in Fresno high schools'
+])
+def test_second_place_escalates(query):
+    assert parse_query_locally(query, CATALOG)['confidence'] < LOCAL_PARSER_CONFIDENCE
+
+def test_repeated_place_is_not_ambiguous():
+    parsed = parse_query_locally('red math in Oakland Unified schools in oakland', CATALOG)
+    assert parsed['district_name'] == 'Oakland Unified'
+    assert parsed['confidence'] >= LOCAL_PARSER_CONFIDENCE
+
+def test_single_school_name_is_kept():
+    parsed = parse_query_locally('red math at Fresno High school', CATALOG)
+    assert parsed['school_name'] == 'Fresno High'
+    assert parsed['confidence'] >= LOCAL_PARSER_CONFIDENCE
@@ -0,0 +1,56 @@
+# SchoolStore (school_store.py / filter_engine.py) must answer every query exactly as
+# build_mongodb_query does against the schools collection it was written from
+import copy
+
+import pytest
+
+from school_store import SchoolStore, write_school_store
+
+QUERIES = [
+    {},
+    {'district_name': 'oakland'},
+    {'district_name': 'fresno unif'},
+    {'county_name': 'Alameda'},
+    {'school_name': 'lincoln'},
+    {'colors': ['Red'], 'indicators': ['math_performance']},
+    {'colors': ['Red', 'Orange']},
+    {'colors': ['Blue'], 'district_name': 'berkeley'},
+    {'colors': ['Red'], 'indicators': ['math_performance'], 'student_groups': ['HI']},
+    {'colors': ['Green'], 'indicators': ['chronic_absenteeism'], 'student_groups': ['AA', 'WH']},
+    {'indicators': ['english_learner_progress']},
+    {'indicators': ['math_performance'], 'student_groups': ['WH']},
+    {'indicators': ['math_performance'], 'ranking': 'worst'},
+    {'indicators': ['chronic_absenteeism'], 'ranking': 'best', 'county_name': 'Alameda'},
+    {'indicators': ['math_performance'], 'ranking': 'desc', 'student_groups': ['HI']},
+    {'indicators': ['math_performance'], 'ranking': 'best', 'rank_by': 'change'},
+]
+
+@pytest.fixture(scope='module')
+def store(app_module, school_documents, tmp_path_factory):
+    pytest.importorskip('numpy')
+    from data_import_improved import stamp_content_hash
+    path = str(tmp_path_factory.mktemp('store'))
+    write_school_store([stamp_content_hash(copy.deepcopy(doc)) for doc in school_documents], path)
+    return SchoolStore(path)
+
+def all_pages(source, app, parsed_query, page_size=4):
+    """Every matching cds_code, read page by page as /query/page does"""
+    sort = app.build_sort(parsed_query)
+    projection = app.build_projection(parsed_query)
+    codes, after = [], None
+    while True:
+        results, after = source.search(parsed_query, page_size, after=after, projection=projection, sort=sort)
+        codes.extend(school['cds_code'] for school in results)
+        if not after:
+            return codes
+
+def test_store_has_the_collection_data_version(store, app_module):
+    assert store.data_version() == app_module.school_data.data_version()
+
+@pytest.mark.parametrize('query', QUERIES, ids=[str(q) for q in QUERIES])
+def test_store_matches_mongodb(store, app_module, query):
+    parsed_query = app_module.sanitize_parsed_query(query)
+    expected = all_pages(app_module.school_data, app_module, parsed_query)
+    assert all_pages(store, app_module, parsed_query) == expected
+    sort = app_module.build_sort(parsed_query)
+    assert store.count(parsed_query, sort=sort) == app_module.school_data.count(parsed_query, sort=sort) == len(expected)
@@ -0,0 +1,91 @@
+# warm_start.py
+# Prebuilt startup state for a school store directory: the district/school catalog,
+# the local parser's token trie and the store's name indexes, pickled next to the
+# store's memory-mapped arrays. A new instance restores them with one read instead
+# of scanning MongoDB and rebuilding them, so it can serve its first request sooner.
+# Written by the importer with --store; the directory can be baked into the image
+# or downloaded once at boot from SCHOOL_STORE_URL (see fetch_school_store).
+import json
+import os
+import pickle
+import tarfile
+import tempfile
+import urllib.request
+
+from school_catalog import build_catalog
+from local_parser import build_matcher
+from school_store import SchoolStore
+
+WARM_START_FILE = 'warm_start.pickle'
+WARM_START_FORMAT_VERSION = 1
+
+def write_warm_start(path):
+    """Build the warm-start snapshot for the store at path"""
+    store = SchoolStore(path)
+    catalog = build_catalog(store)
+    snapshot = {
+        'format': WARM_START_FORMAT_VERSION,
+        'version': store.data_version(),
+        'catalog': catalog,
+        'trie': build_matcher(catalog),
+        'name_indexes': {'district': store.district_index, 'school': store.school_index}
+    }
+    temp_path = os.path.join(path, WARM_START_FILE + '.tmp')
+    with open(temp_path, 'wb') as file:
+        pickle.dump(snapshot, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, os.path.join(path, WARM_START_FILE))
+    size = os.path.getsize(os.path.join(path, WARM_START_FILE))
+    print(f"🔥 Warm-start snapshot written to {path} ({size:,} bytes, data version {snapshot['version']})")
+    return snapshot
+
+def load_warm_start(path):
+    """The snapshot for the store at path, or None if it is missing or from other data
+
+    Only load stores you built or fetched from storage you control - the
+    snapshot is a pickle.
+    """
+    try:
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as file:
+            version = json.load(file).get('version')
+        with open(os.path.join(path, WARM_START_FILE), 'rb') as file:
+            snapshot = pickle.load(file)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"❌ Warm-start snapshot unreadable: {e}")
+        return None
+    if snapshot.get('format') != WARM_START_FORMAT_VERSION or snapshot.get('version') != version:
+        print("⚠️  Warm-start snapshot does not match the school store - rebuilding state at startup")
+        return None
+    return snapshot
+
+def fetch_school_store(url, path):
+    """Download a .tar.gz of a store directory (meta.json at its top level) into path
+
+    Does nothing if path already holds a store, so an instance fetches at most once.
+    """
+    if os.path.exists(os.path.join(path, 'meta.json')):
+        return False
+    os.makedirs(path, exist_ok=True)
+    with tempfile.TemporaryFile() as archive:
+        with urllib.request.urlopen(url, timeout=60) as response:
+            while True:
+                chunk = response.read(1 << 20)
+                if not chunk:
+                    break
+                archive.write(chunk)
+        archive.seek(0)
+        with tarfile.open(fileobj=archive, mode='r:gz') as tar:
+            # Only plain files at the top level; meta.json last, as it marks the store complete
+            members = [m for m in tar.getmembers() if m.isfile() and os.sep not in os.path.normpath(m.name)]
+            members.sort(key=lambda m: os.path.normpath(m.name) == 'meta.json')
+            for member in members:
+                with tar.extractfile(member) as source, \
+                        open(os.path.join(path, os.path.normpath(member.name)), 'wb') as target:
+                    target.write(source.read())
+    print(f"📥 School store fetched from {url} ({len(members)} files)")
+    return True
+
+if __name__ == "__main__":
+    import sys
+    write_warm_start(sys.argv[1] if len(sys.argv) > 1 else 'school_store')
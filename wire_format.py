@@ -0,0 +1,90 @@
+# wire_format.py
+# Opt-in compact encoding for school result lists: columnar arrays with
+# dictionary-encoded statuses and group names (decoded by decodeColumnarSchools
+# in the page's JavaScript), optionally packed as MessagePack
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from school_indexes import VALUE_KEYS
+
+COLUMNAR_FORMAT = 'columnar'
+MSGPACK_MIMETYPE = 'application/x-msgpack'
+
+IDENTITY_COLUMNS = ['cds_code', 'school_name', 'district_name', 'county_name', 'year']
+
+def _encode_indicator_columns(rows, statuses, group_names):
+    """Columns for one {indicator: data} mapping per school (None where a school has none)"""
+    indicators = []
+    for row in rows:
+        for indicator in row or {}:
+            if indicator not in indicators:
+                indicators.append(indicator)
+
+    encoded = {}
+    for indicator in indicators:
+        columns = {'status': [], 'color_code': [], 'group_name': [], 'value': [], 'change': []}
+        value_key = None
+        for row in rows:
+            data = (row or {}).get(indicator)
+            if not isinstance(data, dict):
+                for column in columns.values():
+                    column.append(None)
+                continue
+
+            columns['status'].append(_dictionary_index(statuses, data.get('status')))
+            columns['color_code'].append(data.get('color_code'))
+            columns['group_name'].append(_dictionary_index(group_names, data.get('student_group_name')))
+            columns['change'].append(data.get('change'))
+            key = next((k for k in VALUE_KEYS if k in data), None)
+            value_key = value_key or key
+            columns['value'].append(data.get(key) if key else None)
+        columns['value_key'] = value_key or 'rate'
+        encoded[indicator] = columns
+    return encoded
+
+def _dictionary_index(dictionary, value):
+    if value is None:
+        return None
+    if value not in dictionary:
+        dictionary.append(value)
+    return dictionary.index(value)
+
+def _encode_group(schools, group, statuses, group_names):
+    rows = [(school.get('student_groups') or {}).get(group) for school in schools]
+    # present is 1 where the school's result carried this group, so lazily loaded groups stay distinguishable
+    return {
+        'present': [1 if row is not None else 0 for row in rows],
+        'indicators': _encode_indicator_columns(rows, statuses, group_names)
+    }
+
+def encode_schools_columnar(schools):
+    """Encode school documents (as returned by /query) column by column"""
+    count = len(schools)
+    statuses = []
+    group_names = []
+
+    groups = []
+    for school in schools:
+        for group in school.get('student_groups') or {}:
+            if group not in groups:
+                groups.append(group)
+
+    return {
+        'format': COLUMNAR_FORMAT,
+        'count': count,
+        'columns': {column: [school.get(column) for school in schools] for column in IDENTITY_COLUMNS},
+        'group_codes': [school.get('student_group_codes') for school in schools],
+        'dashboard': _encode_indicator_columns(
+            [school.get('dashboard_indicators') for school in schools], statuses, group_names),
+        'groups': {group: _encode_group(schools, group, statuses, group_names) for group in groups},
+        'dictionaries': {'status': statuses, 'group_name': group_names}
+    }
+
+def wants_msgpack(accept_header):
+    """True if the client asked for MessagePack and it is installed"""
+    return msgpack is not None and MSGPACK_MIMETYPE in (accept_header or '')
+
+def pack_msgpack(payload):
+    return msgpack.packb(payload, use_bin_type=True)